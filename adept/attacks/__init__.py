@@ -25,6 +25,7 @@ the other is continuous loop
 from ._physical_loop import PhysicalLoop, DefaultPhysicalLoop
 from ._continous_loop import ContinuousLoop, DefaultContinuousLoop
 from ._attack import Attacker, FGSMAttacker, PGDAttacker
+from ._evaluation import HijackEvaluator, load_trajectory
 
 
 # ==================================================================================================
@@ -35,4 +36,5 @@ __all__ = [  # user interface and other dependent packages
     "PhysicalLoop", "DefaultPhysicalLoop",
     "ContinuousLoop", "DefaultContinuousLoop",
     "Attacker", "FGSMAttacker", "PGDAttacker",
+    "HijackEvaluator", "load_trajectory",
 ]
\ No newline at end of file
@@ -20,13 +20,18 @@ class Attacker(ABC):
 
         self.perb = None
 
-    def attack(self, target_input, target_output):
+    def attack(self, target_input, target_output, mask=None):
         """
         This is the template method describing the whole attack process
+        :param mask: the region where the perturbation is allowed, None for the whole target_input
         :return: done: True if attack succeeded, otherwise False |
                  perturbation: the optimized perturbation adding to target_input to attack
                  the target_model to output the target_output
         """
+        self.target_input = target_input
+        self.target_output = target_output
+        self.mask = mask
+
         done = False
         self.attack_init()  # initialize the perturbation before optimizing
 
@@ -70,47 +75,216 @@ class Attacker(ABC):
         self.perb = None
 
 
-class FGSMAttacker(Attacker):
-    def __init__(self, target_model):
+class PGDAttacker(Attacker):
+    """
+    This is the class for Projected Gradient Descent(PGD) attack, which is a targeted, l_inf-bounded
+    and iterative attack, optimizing the perturbations for a batch of target inputs(B, ...) at once
+    note that:
+        1. several random restarts are stacked into one tensor batch(R*B, ...) with row = r * B + b,
+        so that each iteration only needs one forward/backward pass of the target model
+        2. the first restart starts from the zero perturbation, the others from random points in the epsilon-ball
+        3. each sample stops optimizing as soon as any of its restarts succeeded,
+        and the rows of the finished samples are dropped from the batch
+
+    paper cite: Madry, Aleksander, et al. Towards deep learning models resistant to adversarial attacks.
+    International Conference on Learning Representations, 2018.
+
+    paper link: https://arxiv.org/abs/1706.06083
+    """
+
+    def __init__(self, target_model, epsilon=8 / 255, alpha=2 / 255, max_iter=40, restarts=1,
+                 tolerance=0.05, clip_min=0.0, clip_max=1.0, loss_fn=None, success_fn=None):
         super().__init__(target_model)
 
+        ## init some attack hyper-parameters
+        self.epsilon = epsilon  # l_inf bound of the perturbation
+        self.alpha = alpha  # step size
+        self.max_iter = max_iter  # max number of steps
+        self.restarts = restarts  # number of restarts for each sample
+        self.tolerance = tolerance  # max error between the model output and the target output to succeed
+        self.clip_min, self.clip_max = clip_min, clip_max  # valid range of the adversarial input
+
+        ## init per-sample loss and success criterion, both map (output, target) to tensors of shape (n,)
+        self.loss_fn = loss_fn if loss_fn is not None else self._default_loss
+        self.success_fn = success_fn if success_fn is not None else self._default_success
+
+    def _default_loss(self, output, target):
+        return (output - target).pow(2).flatten(1).mean(1)
+
+    def _default_success(self, output, target):
+        return (output - target).abs().flatten(1).max(1)[0] <= self.tolerance
+
+    def _get_device(self):
+        import torch
+        for param in self.target_model.parameters():
+            return param.device
+        return torch.device("cpu")
+
+    def _project(self, delta, x, mask):
+        ## step1: project into the epsilon-ball
+        delta = delta.clamp(-self.epsilon, self.epsilon)
+        ## step2: restrict to the perturbation region
+        if mask is not None:
+            delta = delta * mask
+        ## step3: keep the adversarial input in the valid range
+        return (x + delta).clamp(self.clip_min, self.clip_max) - x
+
     def attack_failed(self):
-        pass
+        return self.iteration > self.max_iter
 
     def attack_succeeded(self):
-        pass
+        return bool(self.success.all())
 
     def attack_retrieve(self):
-        pass
+        self.perb = self.best_perb
+        return self.perb
 
     def attack_init(self):
-        pass
-
-    def attack_update(self):
-        pass
-
-    def attack_optimizer(self):
-        pass
+        import torch
+
+        ## step1: convert the target input(B, ...) and output into tensors on the model's device
+        self.device = self._get_device()
+        x = torch.as_tensor(self.target_input, dtype=torch.float32, device=self.device)
+        self.batch_size = batch = x.shape[0]
+        y = None if self.target_output is None else self._to_target(self.target_output)
+
+        ## step2: stack the restarts into one batch(R*B, ...)
+        repeats = (self.restarts,) + (1,) * (x.dim() - 1)
+        self.x = x.repeat(*repeats)
+        self.y = None if y is None else y.repeat(self.restarts, 1)
+        self.row_mask = None if self.mask is None else torch.as_tensor(
+            self.mask, dtype=torch.float32, device=self.device).expand_as(x).repeat(*repeats)
+
+        ## step3: init the perturbations, zero for the first restart and random for the others
+        delta = torch.zeros_like(self.x)
+        delta[batch:].uniform_(-self.epsilon, self.epsilon)
+        self.delta = self._project(delta, self.x, self.row_mask)
+
+        ## step4: init the per-sample records
+        self.best_perb = torch.zeros_like(x)
+        self.best_loss = torch.full((batch,), float("inf"), device=self.device)
+        self.success = torch.zeros(batch, dtype=torch.bool, device=self.device)
+        self.active = torch.ones(self.x.shape[0], dtype=torch.bool, device=self.device)
+        self.iteration = 0
+
+        self.target_model.eval()
+
+    def _to_target(self, target_output):
+        import torch
+
+        y = torch.as_tensor(target_output, dtype=torch.float32, device=self.device)
+        y = y.reshape(-1, 1) if y.dim() <= 1 else y.reshape(y.shape[0], -1)  # scalar, (B,) or (B, K)
+        return y.expand(self.batch_size, -1) if y.shape[0] == 1 else y
+
+    def init(self, target_input, mask=None):
+        """
+        init the step-by-step attack driven from outside(e.g. by the physical loop),
+        in which each step evaluates the target model on the adversarial input captured after applying
+        the perturbation, instead of target_input + perturbation
+        note that: only the first restart(from the zero perturbation) is optimized step by step,
+        and the loop is still driven by attack_failed, attack_succeeded and attack_update
+        :return: the perturbation(B, ...) of the first restart, updated in place by each step
+        """
+        self.target_input = target_input
+        self.target_output = None  # given to each step
+        self.mask = mask
+        self.attack_init()
 
+        return self.delta[:self.batch_size]
 
-class PGDAttacker(Attacker):
-    def __init__(self, target_model):
-        super().__init__(target_model)
-
-    def attack_failed(self):
-        pass
+    def step(self, adv_input, target_output):
+        """
+        one step of the step-by-step attack, with the gradient of the loss w.r.t. the adversarial input
+        as the gradient w.r.t. the perturbation(i.e. the capture is taken as identity in the perturbed region)
+        :return: output: the model output of the active samples | loss: their losses |
+                 done: True if all the samples succeeded
+        """
+        import torch
+
+        rows = self.active[:self.batch_size].nonzero(as_tuple=True)[0]
+        x = torch.as_tensor(adv_input, dtype=torch.float32, device=self.device)[rows]
+        y = self._to_target(target_output)[rows]
+        required_step = self.iteration < self.max_iter  # the last iteration only evaluates
+
+        ## step1: evaluate the adversarial input of the active samples in one forward pass
+        x = x.clone().requires_grad_(required_step)
+        with torch.set_grad_enabled(required_step):
+            output = self.target_model(x)
+            loss = self.loss_fn(output, y)
+
+        ## step2: record the perturbation of each sample evaluated by this step
+        with torch.no_grad():
+            success = self.success_fn(output.detach(), y)
+            self._record(rows, self.delta[rows].clone(), loss.detach(), success)
+
+        ## step3: one signed gradient step for the samples not succeeded yet, then project back
+        if required_step:
+            grad, = torch.autograd.grad(loss.sum(), x)
+            with torch.no_grad():
+                rows, grad = rows[~success], grad[~success]
+                mask = None if self.row_mask is None else self.row_mask[rows]
+                self.delta[rows] = self._project(self.delta[rows] - self.alpha * grad.sign(), self.x[rows], mask)
+
+        return output.detach(), loss.detach(), self.attack_succeeded()
 
-    def attack_succeeded(self):
-        pass
+    def attack_update(self):
+        self.iteration += 1
+        ## drop all the restarts of the succeeded samples
+        self.active = ~self.success.repeat(self.restarts)
 
-    def attack_retrieve(self):
-        pass
+    def attack_optimizer(self):
+        import torch
+
+        rows = self.active.nonzero(as_tuple=True)[0]
+        x, y = self.x[rows], self.y[rows]
+        mask = None if self.row_mask is None else self.row_mask[rows]
+        required_step = self.iteration < self.max_iter  # the last iteration only evaluates
+
+        ## step1: evaluate the current perturbations of the active rows in one forward pass
+        delta = self.delta[rows].clone().requires_grad_(required_step)
+        with torch.set_grad_enabled(required_step):
+            output = self.target_model(x + delta)
+            loss = self.loss_fn(output, y)
+
+        ## step2: record the best perturbation of each sample among its restarts
+        with torch.no_grad():
+            self._record(rows, delta.detach(), loss.detach(), self.success_fn(output.detach(), y))
+
+        ## step3: one signed gradient step descending the loss, then project back
+        if required_step:
+            grad, = torch.autograd.grad(loss.sum(), delta)
+            with torch.no_grad():
+                self.delta[rows] = self._project(delta - self.alpha * grad.sign(), x, mask)
+
+    def _record(self, rows, delta, loss, success):
+        import torch
+
+        samples = rows % self.batch_size
+        key = torch.where(success, torch.full_like(loss, -float("inf")), loss)  # success beats any loss
+        for r in range(self.restarts):  # samples are unique within one restart
+            sel = (rows // self.batch_size) == r
+            b = samples[sel]
+            better = ~self.success[b] & (key[sel] < self.best_loss[b])
+            b = b[better]
+            self.best_perb[b] = delta[sel][better]
+            self.best_loss[b] = key[sel][better]
+            self.success[b] |= success[sel][better]
+
+
+class FGSMAttacker(PGDAttacker):
+    """
+    This is the class for Fast Gradient Sign Method(FGSM) attack,
+    i.e. the single-step case of PGD attack with the step size equal to epsilon
+    note that: like PGD attack, the restarts other than the first start from random points in the epsilon-ball
 
-    def attack_init(self):
-        pass
+    paper cite: Goodfellow, Ian J., Jonathon Shlens, and Christian Szegedy. Explaining and harnessing
+    adversarial examples. International Conference on Learning Representations, 2015.
 
-    def attack_update(self):
-        pass
+    paper link: https://arxiv.org/abs/1412.6572
+    """
 
-    def attack_optimizer(self):
-        pass
\ No newline at end of file
+    def __init__(self, target_model, epsilon=8 / 255, restarts=1,
+                 tolerance=0.05, clip_min=0.0, clip_max=1.0, loss_fn=None, success_fn=None):
+        super().__init__(target_model, epsilon=epsilon, alpha=epsilon, max_iter=1, restarts=restarts,
+                         tolerance=tolerance, clip_min=clip_min, clip_max=clip_max,
+                         loss_fn=loss_fn, success_fn=success_fn)
@@ -0,0 +1,161 @@
+# ==================================================================================================
+# -- imports ---------------------------------------------------------------------------------------
+# ==================================================================================================
+
+from adept.vehicles import Trajectory
+
+
+# ==================================================================================================
+# -- classes ---------------------------------------------------------------------------------------
+# ==================================================================================================
+
+class HijackEvaluator:
+    """
+    This is the class for evaluating the path hijack attack from the recorded ego trajectories,
+    by measuring how far the vehicle deviates from the reference path over time, i.e. for each step:
+        1. lateral deviation: the signed distance(m) to the reference path, positive on the left of the driving
+        direction(see left_handed)
+        2. heading error: the yaw(degree) minus the heading of the nearest path segment, in [-180,180)
+    and for each episode:
+        3. time to departure: the time(s) from the start until |lateral deviation| > departure, inf if never
+        4. success: the vehicle departs from the path(to the given side if side is not None)
+    note that:
+        1. each trajectory is projected onto the path segments around a moving cursor(SamplePath2D.project),
+        so the cost grows with the steps and the window, not with the path length
+        2. the episodes are evaluated in parallel by {processes} worker processes, each of which receives
+        the evaluator(with the path) once at start, and the episode can be given as the episode directory
+        written by EpisodeRecorder, which is then loaded in the worker
+        3. CARLA is left-handed(x forward, y right, z up), where the left of the path in the x-y plane
+        is on the right of the driving direction, so the offsets of SamplePath2D.project are negated for it
+    """
+
+    max_processes = 8  # the default number of worker processes is the cpu count but no more than this
+
+    def __init__(self, path, departure=1.5, side=None, processes=None, window=256, left_handed=True):
+        """
+        :param path: the ReferencePlanner, or its target path(SamplePath2D)
+        :param departure: the lateral deviation(m) beyond which the vehicle departs from the path
+        :param side: 1 if the attack succeeds only by departing to the left, -1 to the right, None for either
+        :param processes: the number of worker processes, None for the cpu count(at most max_processes),
+        0 for the current process
+        :param window: the number of path segments searched on each side of the cursor, see SamplePath2D.project
+        :param left_handed: whether the positions are in a left-handed frame(e.g. CARLA)
+        """
+        self.path = path.get_target_path() if hasattr(path, "get_target_path") else path
+        self.departure = departure
+        self.side = side
+        self.processes = processes
+        self.window = window
+        self.left_handed = left_handed
+
+    def evaluate(self, trajectory):
+        """
+        :param trajectory: the Trajectory, the (N,10) state array or the episode directory
+        :return: the map of the per-step metrics(arrays) and the per-episode metrics(scalars)
+        """
+        import numpy as np
+
+        trajectory = load_trajectory(trajectory)
+        if len(trajectory) == 0:
+            return {"lateral": np.empty(0), "heading_error": np.empty(0), "time_to_departure": np.inf,
+                    "success": False, "max_lateral": 0.0, "rms_lateral": 0.0, "progress": 0.0}
+
+        ## step1: project all the positions onto the path
+        lateral, segment, t = self.path.project(trajectory.positions, window=self.window)
+        if self.left_handed:
+            lateral = -lateral
+
+        ## step2: compare the yaw with the heading of the nearest segments
+        points = self.path.points
+        direction = np.diff(points, axis=0) if len(points) > 1 else np.zeros((1, 2))
+        heading = np.degrees(np.arctan2(direction[segment, 1], direction[segment, 0]))
+        heading_error = (trajectory.yaw - heading + 180.0) % 360.0 - 180.0
+
+        ## step3: find the first step departing from the path
+        departed = lateral * self.side > self.departure if self.side else np.abs(lateral) > self.departure
+        first = int(np.argmax(departed)) if departed.any() else -1
+        time_to_departure = float(trajectory.time[first] - trajectory.time[0]) if first >= 0 else np.inf
+
+        return {
+            "lateral": lateral,
+            "heading_error": heading_error,
+            "time_to_departure": time_to_departure,
+            "success": first >= 0,
+            "max_lateral": float(np.abs(lateral).max()),
+            "rms_lateral": float(np.sqrt(np.mean(lateral ** 2))),
+            "progress": float((segment[-1] + t[-1]) / max(len(direction), 1)),  # fraction of the path passed
+        }
+
+    def evaluate_all(self, trajectories):
+        """
+        evaluate the batch of episodes in parallel
+        :return: the list of metrics of each episode, and the summary of the batch
+        """
+        trajectories = list(trajectories)
+        if self.processes == 0 or len(trajectories) <= 1:
+            results = [self.evaluate(trajectory) for trajectory in trajectories]
+        else:
+            import os
+            from concurrent.futures import ProcessPoolExecutor
+            workers = min(self.processes or min(os.cpu_count() or 1, self.max_processes), len(trajectories))
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(self,)) as executor:
+                results = list(executor.map(_evaluate_in_worker, trajectories,
+                                            chunksize=max(len(trajectories) // (4 * workers), 1)))
+
+        return results, self.summarize(results)
+
+    @staticmethod
+    def summarize(results):
+        import numpy as np
+
+        if not results:
+            return {"episodes": 0, "success_rate": 0.0, "mean_time_to_departure": np.inf,
+                    "mean_max_lateral": 0.0, "mean_progress": 0.0}
+
+        success = np.array([result["success"] for result in results])
+        times = np.array([result["time_to_departure"] for result in results])
+        return {
+            "episodes": len(results),
+            "success_rate": float(success.mean()),
+            "mean_time_to_departure": float(times[success].mean()) if success.any() else np.inf,
+            "mean_max_lateral": float(np.mean([result["max_lateral"] for result in results])),
+            "mean_progress": float(np.mean([result["progress"] for result in results])),
+        }
+
+
+# ==================================================================================================
+# -- functions -------------------------------------------------------------------------------------
+# ==================================================================================================
+
+_worker_evaluator = None  # the evaluator of the worker process, set once by _init_worker
+
+
+def _init_worker(evaluator):
+    global _worker_evaluator
+    _worker_evaluator = evaluator
+
+
+def _evaluate_in_worker(trajectory):
+    return _worker_evaluator.evaluate(trajectory)
+
+
+def load_trajectory(episode):
+    """
+    :param episode: the Trajectory, the (N,10) state array, or the episode directory written by EpisodeRecorder,
+    whose valid states are sorted by frame id
+    """
+    import os
+    import numpy as np
+
+    if isinstance(episode, Trajectory):
+        return episode
+    if not isinstance(episode, str):
+        return Trajectory.from_array(episode)
+
+    states = np.load(os.path.join(episode, "states.npy"), mmap_mode='r')
+    index = os.path.join(episode, "states.index.npy")
+    if os.path.exists(index):
+        ids = np.load(index)
+        slots = np.flatnonzero(ids >= 0)
+        states = states[slots[np.argsort(ids[slots], kind="stable")]]
+    return Trajectory.from_array(states)
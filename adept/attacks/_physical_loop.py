@@ -13,12 +13,22 @@ class PhysicalLoop:
     """
     This is the abstract template class for Physical-Loop Attack,
     waiting for the derived class to implement the details
+    note that: in the incremental mode, the stages fixed for one loop(dig_scene, target_mask, dig_target)
+    are cached, and each inner loop only recomputes the bounding box of the target mask, i.e.
+        1. perb_apply and dig_replace receive the crops of their inputs in the bounding box
+        2. the adversarial digital scene is kept as a working copy of dig_scene, and only its box is rewritten
+        3. the expensive phys_replace + sensor_capture (step6~7) only run every {capture_every} inner loops,
+        and the inner loops in between use sensor_capture_proxy as an analytic surrogate
     """
 
-    def __init__(self, vehicle, attacker):
+    def __init__(self, vehicle, attacker, incremental=False, capture_every=1):
         self.vehicle = vehicle
         self.attacker = attacker
 
+        self.incremental = incremental  # if use the incremental mode for the inner loop
+        self.capture_every = max(int(capture_every), 1)  # re-capture every k inner loops in the incremental mode
+        self._cache = None  # the cached stages for the incremental mode
+
     def loop(self, phys_scene, target_output):
         """
         This is the template method describing one loop for Physical Loop Attack
@@ -38,6 +48,8 @@ class PhysicalLoop:
         adv_perb = self.perb_generate(dig_target, adv_mask)
 
         ## step4~8: inner loop (optimze adversarial perturbation)
+        if self.incremental:  # cache the fixed stages for the whole loop
+            self._cache_init(dig_scene, target_mask, dig_target, adv_mask)
         while not self.inner_loop_failed():  # if inner attack loop failed, loop end
             self._inner_loop(dig_scene, target_mask, target_output,
                              dig_target, adv_mask, adv_perb)
@@ -54,6 +66,9 @@ class PhysicalLoop:
 
     def _inner_loop(self, dig_scene, target_mask, target_output,
                     dig_target, adv_mask, adv_perb, required_optimize=True):
+        if self.incremental and self._cache is not None:
+            return self._inner_loop_incremental(target_output, adv_perb, required_optimize)
+
         ## step4: perturbation apply (adversarial perturbation => adversarial target)
         adv_target = self.perb_apply(dig_target, adv_mask, adv_perb)
         ## step5: digital replacing (adversarial target => adversarial digital scene)
@@ -69,6 +84,84 @@ class PhysicalLoop:
         else:
             return adv_phys_scene
 
+    def _cache_init(self, dig_scene, target_mask, dig_target, adv_mask):
+        import numpy as np
+
+        ## step1: get the bounding box of the target mask
+        mask = target_mask[0] if isinstance(target_mask, tuple) else target_mask
+        rows, cols = np.flatnonzero(np.any(mask, axis=1)), np.flatnonzero(np.any(mask, axis=0))
+        if len(rows) == 0:  # no target in the scene, fall back to the full inner loop
+            self._cache = None
+            return
+        box = (slice(rows[0], rows[-1] + 1), slice(cols[0], cols[-1] + 1))
+
+        ## step2: cache the crops of the fixed stages and the working copy of the digital scene
+        self._cache = {
+            "box": box,
+            "dig_scene": self._crop(dig_scene, box),
+            "target_mask": self._crop(target_mask, box),
+            "dig_target": self._crop(dig_target, box),
+            "adv_mask": self._crop(adv_mask, box),
+            "adv_dig_scene": dig_scene.copy(),
+            "captured": None,  # the last captured adversarial digital scene
+            "residual": None,  # the difference between the last captured and digital box
+            "count": 0,  # the number of inner loops
+        }
+
+    def _inner_loop_incremental(self, target_output, adv_perb, required_optimize=True):
+        cache = self._cache
+        box = cache["box"]
+
+        ## step4~5: perturbation apply and digital replacing only in the bounding box
+        adv_target = self.perb_apply(cache["dig_target"], cache["adv_mask"], self._crop(adv_perb, box))
+        adv_dig_box = self.dig_replace(cache["dig_scene"], adv_target, cache["target_mask"])
+        adv_dig_scene = cache["adv_dig_scene"]
+        adv_dig_scene[..., box[0], box[1], :] = adv_dig_box
+        if not required_optimize:
+            ## step6: physical replacing
+            return self.phys_replace(adv_dig_scene)
+
+        if cache["count"] % self.capture_every == 0:
+            ## step6~7: physical replacing and 2nd sensor capture
+            captured = self.sensor_capture(self.phys_replace(adv_dig_scene))
+            cache["captured"] = captured
+            cache["residual"] = self._crop(captured, box).astype(float) - adv_dig_box
+        else:
+            ## step6~7: analytic proxy instead of the round trip
+            captured = self.sensor_capture_proxy(adv_dig_box)
+        cache["count"] += 1
+
+        ## step8: perturbation optimization
+        return self.perb_optimize(captured, target_output)
+
+    def sensor_capture_proxy(self, adv_dig_box):
+        """
+        the analytic proxy of phys_replace + sensor_capture used between two real captures,
+        which reuses the last captured scene outside the bounding box,
+        and adds the residual of the last capture to the current adversarial digital box
+        note that: the proxy scene is a fresh copy, since the last captured scene(and any proxy scene before)
+        may still be referenced by perb_optimize
+        """
+        import numpy as np
+        cache = self._cache
+        captured = cache["captured"].copy()
+        proxy = adv_dig_box + cache["residual"]
+        if np.issubdtype(captured.dtype, np.integer):
+            info = np.iinfo(captured.dtype)
+            proxy = np.clip(np.rint(proxy), info.min, info.max)
+        captured[..., cache["box"][0], cache["box"][1], :] = proxy
+        return captured
+
+    @staticmethod
+    def _crop(x, box):
+        if x is None:
+            return None
+        if isinstance(x, tuple):
+            return tuple(PhysicalLoop._crop(m, box) for m in x)
+        if x.ndim == 2:  # (H,W) mask
+            return x[box[0], box[1]]
+        return x[..., box[0], box[1], :]  # (..., H, W, C) scene
+
     @abstractmethod
     def inner_loop_failed(self):
         failed = False
@@ -92,18 +185,32 @@ class PhysicalLoop:
 
     @abstractmethod
     def region_extract(self, scene, mask):
+        """
+        :param mask: the output of mask_target_generate
+        :return: the target region, i.e. the scene with the shape of the scene, zero outside the target mask
+        note that: the derived class may return a buffer reused frame by frame, only valid until the next frame
+        """
         target = None
 
         return target
 
     @abstractmethod
     def mask_target_generate(self, scene):
+        """
+        :return: the bool target mask(H,W), or the tuple (target mask, background mask)
+        note that: the derived class may return buffers reused frame by frame, only valid until the next frame
+        """
         mask = None
 
         return mask
 
     @abstractmethod
     def mask_adv_generate(self, scene):
+        """
+        :param scene: the target region returned by region_extract
+        :return: the bool mask of the region allowed to perturb, (H,W) or broadcastable to the target,
+        which may alias the target mask and is only valid until the next frame like it
+        """
         mask = None
 
         return mask
@@ -120,7 +227,7 @@ class PhysicalLoop:
 
     @abstractmethod
     def perb_generate(self, target, mask):
-        perb = self.attacker.init(target, mask)
+        perb = self.attacker.init(target, mask)  # updated in place by each attacker.step
         return perb
 
     @abstractmethod
@@ -130,8 +237,6 @@ class PhysicalLoop:
 
     @abstractmethod
     def perb_optimize(self, adv_dig_scene, target_output):
-        done = True
-
         output, loss, done = self.attacker.step(adv_dig_scene, target_output)
 
         return done
@@ -144,12 +249,19 @@ class DefaultPhysicalLoop(PhysicalLoop):
     capturing sensor is the front camera, attack target is the billboard in the front
     which can be located by 4 corners' coordinate(box coordinate), perturb region is the whole area
     of the attack target,
+    note that: the masks and the extracted region are written into buffers preallocated for the frame shape
+    and reused frame by frame, so the returned arrays are only valid until the next frame
     """
 
-    def __init__(self, vehicle, attacker, target_box):
-        super().__init__(vehicle, attacker)
+    def __init__(self, vehicle, attacker, target_box, incremental=False, capture_every=1):
+        super().__init__(vehicle, attacker, incremental=incremental, capture_every=capture_every)
         self.target_box = target_box
 
+        ## the reusable buffers for masks and region
+        self._mask_buffer = None  # uint8 (H,W) buffer to rasterize the target box, viewed as bool target mask
+        self._bgr_mask_buffer = None  # bool (H,W) buffer for the background mask
+        self._region_buffer = None  # (..., H, W, C) buffer for the extracted target region
+
     def inner_loop_failed(self):
         return self.attacker.attack_failed()
 
@@ -167,20 +279,26 @@ class DefaultPhysicalLoop(PhysicalLoop):
 
     def region_extract(self, scene, mask):
         import numpy as np
-        target = []
-        for m in mask:
-            target.append(
-                np.multiply(scene, m)
-            )
-        return target
+        target_mask = mask[0] if isinstance(mask, tuple) else mask
+
+        if self._region_buffer is None or self._region_buffer.shape != scene.shape \
+                or self._region_buffer.dtype != scene.dtype:
+            self._region_buffer = np.empty_like(scene)
+        np.multiply(scene, target_mask[..., np.newaxis], out=self._region_buffer)
+
+        return self._region_buffer
 
     def mask_target_generate(self, scene):
         perspective_box = self._get_perspective_target_box()
 
         import numpy as np
-        mask = np.zeros_like(scene, dtype=np.uint8)
-        target_mask = self._fill_mask_with_box(mask, perspective_box)
-        bgr_mask = self._fill_mask_with_box(mask, perspective_box, reverse=True)
+        shape = scene.shape[-3:-1]  # (H,W) of the (..., H, W, C) scene
+        if self._mask_buffer is None or self._mask_buffer.shape != shape:
+            self._mask_buffer = np.zeros(shape, dtype=np.uint8)
+            self._bgr_mask_buffer = np.zeros(shape, dtype=np.bool_)
+
+        target_mask = self._fill_mask_with_box(self._mask_buffer, perspective_box)
+        bgr_mask = np.logical_not(target_mask, out=self._bgr_mask_buffer)
         return target_mask, bgr_mask
 
     def _get_perspective_target_box(self):
@@ -194,22 +312,23 @@ class DefaultPhysicalLoop(PhysicalLoop):
         )
         return perspective_box
 
-    def _fill_mask_with_box(self, mask, box, reverse=False):
+    def _fill_mask_with_box(self, mask, box):
         import numpy as np
         import cv2
-        area = np.array([
-            box["top_left"]["c"].tolist(),
-            box["top_right"]["c"].tolist(),
-            box["bottom_right"]["c"].tolist(),
-            box["bottom_left"]["c"].tolist()
-        ])
-        cv2.fillPoly(mask, area, (1, 1, 1))
-        if reverse:
-            return np.ones_like(mask, dtype=np.uint8) - mask
+        mask.fill(0)
+        if box is not None:  # None if the target is not in front of the camera
+            area = np.array([
+                box["top_left"]["c"].tolist(),
+                box["top_right"]["c"].tolist(),
+                box["bottom_right"]["c"].tolist(),
+                box["bottom_left"]["c"].tolist()
+            ])
+            cv2.fillPoly(mask, [np.round(area).astype(np.int32)], 1)
+        return mask.view(np.bool_)
 
     def mask_adv_generate(self, scene):
         import numpy as np
-        return np.ones_like(scene, dtype=np.uint8)
+        return self._mask_buffer.view(np.bool_)  # the whole area of the attack target
 
     def dig_replace(self, dig_scene, adv_target, mask):
         pass
@@ -218,10 +337,8 @@ class DefaultPhysicalLoop(PhysicalLoop):
         pass
 
     def perb_generate(self, target, mask):
-        pass
+        import numpy as np
+        return super().perb_generate(target, mask[..., np.newaxis])  # the same mask for all the channels
 
     def perb_apply(self, target, mask, perb):
         pass
-
-    def perb_optimize(self, adv_dig_scene, target_output):
-        pass
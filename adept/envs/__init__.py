@@ -7,6 +7,8 @@ including carla, sumo, lgsvl, etc
 # -- imports ---------------------------------------------------------------------------------------
 # ==================================================================================================
 from ._env import Env, BaseCarlaEnv
+from ._replay import ReplayEnv, ReplayEgoActor
+from ._recorder import EpisodeRecorder
 
 # ==================================================================================================
 # -- all -------------------------------------------------------------------------------------------
@@ -14,4 +16,5 @@ from ._env import Env, BaseCarlaEnv
 
 __all__ = [  # user interface and other dependent packages
     "Env", "BaseCarlaEnv",
+    "ReplayEnv", "ReplayEgoActor", "EpisodeRecorder",
 ]
\ No newline at end of file
@@ -3,7 +3,8 @@
 # ==================================================================================================
 
 from abc import ABC, abstractmethod
-from adept.envs.carla import load_carla, load_client, load_world
+from adept.envs.carla import load_carla, load_client, load_world, CommandBatch, \
+    SnapshotCache
 
 
 # ==================================================================================================
@@ -37,11 +38,16 @@ class Env(ABC):
 
         return scene
 
+    def get_snapshot(self):
+        return None  # no world snapshot, the actors are queried directly
+
 
 class BaseCarlaEnv(Env, ABC):
     """
     This is the basic class for environment in carla
     which implements the necessary initial work to do
+    note that: the commands queued in self.batch(e.g. the controls by End2EndVehicle.apply_control)
+    are sent together with the next tick in one round-trip
     """
 
     def __init__(self, root, world_name, version=None,
@@ -56,11 +62,14 @@ class BaseCarlaEnv(Env, ABC):
         load_carla(root=self.carla_root, version=self.carla_version, print_path=print_path)
         self.client = load_client(ip=ip, port=port, timeout=timeout)
         self.world = load_world(self.client, world_name=self.world_name, sync=sync, delta=delta)
+        self.sync = sync
+        self.snapshot_cache = SnapshotCache(self.world, listen=not sync)  # pushed by the server if async
 
         ## step1: init others after actors, like some configurations
         self._init_before_actors()
-        ## step2: init actors
+        ## step2: init actors, which can be spawned in batch by self.batch.add_actor and self.batch.apply
         self.actor_map = {}
+        self.batch = CommandBatch(self.client, self.world, self.snapshot_cache)
         self._init_actors()
         ## step3: init others after actors, such as weather
         self._init_after_actors()
@@ -76,8 +85,12 @@ class BaseCarlaEnv(Env, ABC):
         pass
 
     def _close_actors(self):
-        for actor in self.actor_map:
-            self.actor_map[actor].destroy()
+        ## stop the sensors first, then destroy all the actors in one batch
+        for actor in self.actor_map.values():
+            if actor is not None and hasattr(actor, "stop"):
+                actor.stop()
+        self.batch.destroy(self.actor_map.values())
+        self.batch.apply()
 
     def _close_others(self):
         pass
@@ -88,6 +101,13 @@ class BaseCarlaEnv(Env, ABC):
     def get_world(self):
         return self.world
 
+    def get_snapshot(self):
+        """
+        the snapshot cache of the current frame, from which all the actors' transforms and velocities
+        are read in one request per tick(see SnapshotCache)
+        """
+        return self.snapshot_cache
+
     def get_actor(self, key):
         if key in self.actor_map:
             return self.actor_map[key]
@@ -102,11 +122,15 @@ class BaseCarlaEnv(Env, ABC):
 
     def tick(self, times=1, sleep=0.0):
         for _ in range(times):
-            self.world.tick()
+            if len(self.batch.commands) > 0:  # the queued controls are sent with the tick in one round-trip
+                self.batch.flush(do_tick=True)
+            else:
+                self.snapshot_cache.invalidate(self.world.tick())
             if sleep > 0.0:
                 import time
                 time.sleep(sleep)
 
     def close(self):
+        self.snapshot_cache.close()
         self._close_actors()
         self._close_others()
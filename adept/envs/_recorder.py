@@ -0,0 +1,163 @@
+# ==================================================================================================
+# -- imports ---------------------------------------------------------------------------------------
+# ==================================================================================================
+
+import threading
+
+
+# ==================================================================================================
+# -- classes ---------------------------------------------------------------------------------------
+# ==================================================================================================
+
+class EpisodeRecorder:
+    """
+    This is the class for recording an episode losslessly into memory-mapped files,
+    which can be replayed by ReplayEnv, and the episode directory contains:
+        1. meta.json: {"step_length": 0.05, "cameras": ["front_camera", ...], "capacity": N, ...}
+        2. {camera}.npy: the ring of raw BGR frames of each camera with shape (N,H,W,3)
+        3. {camera}.index.npy: the frame id in each slot of the camera ring, -1 for the empty slot
+        4. states.npy: the ego states with shape (N,10), each row is [time, x, y, z, pitch, yaw, roll, vx, vy, vz]
+        5. controls.npy: the control inputs with shape (N,3), each row is [steer, throttle, brake]
+        6. states.index.npy: the frame id in each slot of the state ring, -1 for the empty slot
+    note that:
+        1. all the files are preallocated with the capacity N, and the slot for the k-th record is k % N
+        2. the frame is copied into its slot directly without encoding, and so is the carla image buffer,
+        whose BGR channels are viewed(np.frombuffer) and copied into the slot at once
+        3. the states and controls are stored column by column(fortran order),
+        so that reading one quantity of the whole episode is contiguous
+        4. each record is written into its slot before its frame id is published in the index, both under the lock,
+        so a reader(get_frame, get_state) never finds a slot half-written or still holding the overwritten record
+    """
+
+    def __init__(self, episode_dir, cameras, capacity=36000, step_length=0.05):
+        """
+        :param episode_dir: the directory to save the episode, created if not existed
+        :param cameras: the map from camera name to its frame shape (height, width)
+        :param capacity: the number of slots of each ring
+        :param step_length: the time(s) of one tick
+        """
+        import os
+        import numpy as np
+        from numpy.lib.format import open_memmap
+
+        self.episode_dir = episode_dir
+        self.capacity = capacity
+        self.step_length = step_length
+        os.makedirs(episode_dir, exist_ok=True)
+
+        def allocate(name, shape, dtype, fill=None, fortran_order=False):
+            array = open_memmap(os.path.join(episode_dir, name + ".npy"), mode='w+',
+                                dtype=dtype, shape=shape, fortran_order=fortran_order)
+            if fill is not None:
+                array[:] = fill
+            return array
+
+        ## step1: allocate the frame ring and its index for each camera
+        self.frames, self.frame_ids, self.frame_counts, self.frame_index = {}, {}, {}, {}
+        for camera, (height, width) in cameras.items():
+            self.frames[camera] = allocate(camera, (capacity, height, width, 3), np.uint8)
+            self.frame_ids[camera] = allocate(camera + ".index", (capacity,), np.int64, fill=-1)
+            self.frame_counts[camera] = 0
+            self.frame_index[camera] = {}  # {frame_id: slot}
+
+        ## step2: allocate the columnar state and control rings with their index
+        self.states = allocate("states", (capacity, 10), np.float64, fill=0.0, fortran_order=True)
+        self.controls = allocate("controls", (capacity, 3), np.float64, fill=0.0, fortran_order=True)
+        self.state_ids = allocate("states.index", (capacity,), np.int64, fill=-1)
+        self.state_count = 0
+        self.state_index = {}  # {frame_id: slot}
+
+        self._lock = threading.Lock()  # the sensor callbacks may record from other threads
+        self._write_meta()
+
+    def _take_slot(self, ids, index, count):
+        """
+        unpublish the slot for the count-th record, i.e. the oldest record in it is no longer found by its id
+        """
+        slot = count % self.capacity
+        if ids[slot] >= 0:  # overwrite the oldest record
+            index.pop(int(ids[slot]), None)
+            ids[slot] = -1
+        return slot
+
+    @staticmethod
+    def _publish(ids, index, slot, frame_id):
+        ids[slot] = frame_id
+        index[frame_id] = slot
+
+    def record_frame(self, camera, frame_id, image):
+        """
+        record the BGR(A) image(H,W,C) of the camera at frame_id, only the first 3 channels are kept
+        """
+        with self._lock:
+            slot = self._take_slot(self.frame_ids[camera], self.frame_index[camera], self.frame_counts[camera])
+            self.frames[camera][slot] = image[..., :3]
+            self._publish(self.frame_ids[camera], self.frame_index[camera], slot, frame_id)
+            self.frame_counts[camera] += 1
+        return slot
+
+    def record_carla_image(self, camera, carla_image):
+        """
+        record the carla image by viewing its BGRA raw data without any intermediate copy
+        """
+        import numpy as np
+        bgra = np.frombuffer(carla_image.raw_data, dtype=np.uint8).reshape(
+            carla_image.height, carla_image.width, 4)
+        return self.record_frame(camera, carla_image.frame, bgra)
+
+    def record_state(self, frame_id, time, state, control=None):
+        """
+        record the SimpleDynamicsVehicleState and the ControlInput(zeros if None) at frame_id
+        """
+        with self._lock:
+            slot = self._take_slot(self.state_ids, self.state_index, self.state_count)
+            self.states[slot] = (time,
+                                 state["c"]["x"], state["c"]["y"], state["c"]["z"],
+                                 state["p"]["p"], state["p"]["y"], state["p"]["r"],
+                                 state["v"]["x"], state["v"]["y"], state["v"]["z"])
+            self.controls[slot] = (control["s"], control["t"], control["b"]) if control is not None else 0.0
+            self._publish(self.state_ids, self.state_index, slot, frame_id)
+            self.state_count += 1
+        return slot
+
+    def get_frame(self, camera, frame_id):
+        """
+        :return: the copy of the recorded frame at frame_id, None if not recorded or already overwritten
+        """
+        with self._lock:
+            slot = self.frame_index[camera].get(frame_id)
+            return None if slot is None else self.frames[camera][slot].copy()
+
+    def get_state(self, frame_id):
+        """
+        :return: the copies of the recorded state and control at frame_id, None if not recorded or already overwritten
+        """
+        with self._lock:
+            slot = self.state_index.get(frame_id)
+            return None if slot is None else (self.states[slot].copy(), self.controls[slot].copy())
+
+    def _write_meta(self):
+        import json
+        import os
+        with open(os.path.join(self.episode_dir, "meta.json"), 'w') as f:
+            json.dump({
+                "step_length": self.step_length,
+                "cameras": list(self.frames.keys()),
+                "capacity": self.capacity,
+                "frame_counts": self.frame_counts,
+                "state_count": self.state_count,
+            }, f)
+
+    def flush(self):
+        with self._lock:
+            for camera in self.frames:
+                self.frames[camera].flush()
+                self.frame_ids[camera].flush()
+            for array in (self.states, self.controls, self.state_ids):
+                array.flush()
+            self._write_meta()
+
+    def close(self):
+        self.flush()
+        self.frames, self.frame_ids = {}, {}
+        self.states, self.controls, self.state_ids = None, None, None
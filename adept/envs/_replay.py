@@ -0,0 +1,193 @@
+# ==================================================================================================
+# -- imports ---------------------------------------------------------------------------------------
+# ==================================================================================================
+
+from collections import namedtuple
+from adept.envs._env import Env
+from adept.transforms import WorldCoordinate, EulerAngle, SamplePath2D
+
+
+# ==================================================================================================
+# -- classes ---------------------------------------------------------------------------------------
+# ==================================================================================================
+
+ReplayTransform = namedtuple('ReplayTransform', 'location rotation')
+
+
+class ReplayEgoActor:
+    """
+    This is the class for the ego vehicle in the replay environment,
+    which mimics the interface of carla actor used by retrieve_from and apply_control
+    """
+
+    accepts_control_input = True  # apply_control takes ControlInput directly instead of carla.VehicleControl
+
+    def __init__(self, env):
+        self.env = env
+
+    def get_transform(self):
+        x, y, z, pitch, yaw, roll = self.env.ego_state[:6].tolist()
+        return ReplayTransform(location=WorldCoordinate(x=x, y=y, z=z),
+                               rotation=EulerAngle(pitch=pitch, yaw=yaw, roll=roll))
+
+    def get_location(self):
+        return self.get_transform().location
+
+    def get_velocity(self):
+        from adept.vehicles import Vector3D
+        import math
+        yaw, v = math.radians(self.env.ego_state[4]), self.env.ego_state[6]
+        return Vector3D(v * math.cos(yaw), v * math.sin(yaw), 0.0)
+
+    def apply_control(self, control_input):
+        self.env.apply_ego_control(control_input)
+
+
+class ReplayEnv(Env):
+    """
+    This is the class for offline environment, which replays a recorded episode on disk without any simulator,
+    and the episode directory contains:
+        1. meta.json: {"step_length": 0.05, "cameras": ["front_camera", ...]}
+        2. {camera}.npy: the frames of each camera with shape (T,H,W,C)
+        3. states.npy: the ego states with shape (T,10), each row is [time, x, y, z, pitch, yaw, roll, vx, vy, vz]
+        4. optional {camera}.index.npy and states.index.npy: the frame id of each row, written by EpisodeRecorder,
+        with which the frames and states are aligned by frame id and sorted in time
+    note that:
+        1. the ego state is advanced from the applied control input by the kinematic BicycleModel (closed loop),
+        and the scene is the recorded frame nearest to the current ego position (frame_policy="nearest"),
+        or the recorded frame at the current tick (frame_policy="time")
+        2. the frame files are memory-mapped, so only the served frames are read from the disk
+        3. if auto_tick, applying a control input ticks the environment once,
+        so that the continuous loop can run closed-loop as fast as possible
+        4. like the carla environments, the controller completing the vehicle's control input(e.g. the throttle)
+        is given by env.controller, set after the vehicle and the controller are built on the environment
+    """
+
+    def __init__(self, episode_dir, camera="front_camera", wheel_base=2.9, max_steer=70.0,
+                 max_accel=4.0, max_decel=8.0, frame_policy="nearest", auto_tick=True,
+                 realtime_factor=None, preprocess=None):
+        super().__init__()
+        self.episode_dir = episode_dir
+        self.camera = camera
+
+        ## init vehicle model parameters
+        self.wheel_base = wheel_base  # distance between front and rear axles (m)
+        self.max_steer = max_steer  # steering angle (degree) when steer = 1.0
+        self.max_accel = max_accel  # acceleration (m/s^2) when throttle = 1.0
+        self.max_decel = max_decel  # deceleration (m/s^2) when brake = 1.0
+        from adept.vehicles import BicycleModel
+        self.model = BicycleModel(wheel_base=wheel_base, max_steer=max_steer,
+                                  max_accel=max_accel, max_decel=max_decel)
+
+        ## init replay options
+        self.frame_policy = frame_policy
+        self.auto_tick = auto_tick
+        self.realtime_factor = realtime_factor  # None for as fast as possible, otherwise times of real time
+        self.preprocess = preprocess  # the function to process the frame before returned by scene_retrieve
+        self.controller = None  # the controller used by the vehicle, e.g. PurePursuitController
+
+        self._load_episode()
+        self.reset()
+
+    def _load_episode(self):
+        import json
+        import os
+        import numpy as np
+
+        with open(os.path.join(self.episode_dir, "meta.json"), 'r') as f:
+            self.meta = json.load(f)
+        self.step_length = self.meta.get("step_length", 0.05)
+
+        self.frames = np.load(os.path.join(self.episode_dir, self.camera + ".npy"), mmap_mode='r')
+        self.states = np.load(os.path.join(self.episode_dir, "states.npy"), mmap_mode='r')
+
+        ## align the frames and states by frame id if indexed, otherwise by row
+        frame_index = os.path.join(self.episode_dir, self.camera + ".index.npy")
+        state_index = os.path.join(self.episode_dir, "states.index.npy")
+        if os.path.exists(frame_index) and os.path.exists(state_index):
+            frame_ids, state_ids = np.load(frame_index), np.load(state_index)
+            ## skip the empty slots(-1), and the valid ids are unique in each ring
+            frame_valid, state_valid = np.flatnonzero(frame_ids >= 0), np.flatnonzero(state_ids >= 0)
+            _, frame_slots, state_slots = np.intersect1d(
+                frame_ids[frame_valid], state_ids[state_valid], return_indices=True)  # sorted by frame id
+            self._frame_slots, self._state_slots = frame_valid[frame_slots], state_valid[state_slots]
+        else:
+            self._frame_slots = self._state_slots = np.arange(min(len(self.frames), len(self.states)))
+        self.length = len(self._frame_slots)
+        self.states = np.asarray(self.states)[self._state_slots]  # the states are small, load them in order
+        self.path = SamplePath2D(self.states[:, 1:3])  # recorded ego positions
+
+        self.ego_actor = ReplayEgoActor(self)
+
+    def reset(self):
+        import numpy as np
+
+        ## the ego state [x, y, z, pitch, yaw, roll, v] starts from the first recorded state
+        first = np.asarray(self.states[0], dtype=np.float64)
+        self.ego_state = np.concatenate([first[1:7], [np.linalg.norm(first[7:10])]])
+        self.ego_control = (0.0, 0.0, 0.0)  # (steer, throttle, brake)
+
+        self.frame = 0  # the number of ticks
+        self.time = float(first[0])
+        self._frame_idx = 0  # the index of the recorded frame to serve
+        self._wall_start = None
+
+    def apply_ego_control(self, control_input):
+        self.ego_control = (float(control_input["s"]), float(control_input["t"]), float(control_input["b"]))
+        if self.auto_tick:
+            self.tick()
+
+    def _step(self, dt):
+        import numpy as np
+
+        x, y, z, pitch, yaw, roll, v = self.ego_state.tolist()
+        x, y, yaw, v = self.model.step([x, y, np.radians(yaw), v], self.ego_control, dt=dt)[0].tolist()
+        self.ego_state[:] = (x, y, z, pitch, (np.degrees(yaw) + 180.0) % 360.0 - 180.0, roll, v)
+
+    def _update_frame_idx(self):
+        if self.frame_policy == "time":
+            self._frame_idx = min(self.frame, self.length - 1)
+        else:  # search forward from the last served frame for the nearest recorded position
+            x, y = self.ego_state[0], self.ego_state[1]
+            _, idx = self.path.get_nearest_point(x, y, start=self._frame_idx)
+            self._frame_idx = max(idx, self._frame_idx)
+
+    def run(self):
+        ## replay the whole episode with the last applied control
+        while not self.finished():
+            self.tick()
+
+    def finished(self):
+        return self._frame_idx >= self.length - 1 or \
+               (self.frame_policy == "time" and self.frame >= self.length - 1)
+
+    def tick(self, times=1):
+        import time
+
+        if self._wall_start is None:
+            self._wall_start = time.perf_counter() - self.frame * self.step_length / (self.realtime_factor or 1.0)
+
+        for _ in range(times):
+            self._step(self.step_length)
+            self.frame += 1
+            self.time += self.step_length
+            self._update_frame_idx()
+
+            if self.realtime_factor:  # pace the ticks against the wall clock
+                ahead = self._wall_start + self.frame * self.step_length / self.realtime_factor \
+                        - time.perf_counter()
+                if ahead > 0:
+                    time.sleep(ahead)
+
+    def close(self):
+        self.frames, self.states = None, None
+
+    def scene_retrieve(self):
+        frame = self.frames[self._frame_slots[self._frame_idx]]
+        return self.preprocess(frame) if self.preprocess is not None else frame
+
+    def get_recorded_state(self):
+        return self.states[self._frame_idx]
+
+    def get_ego_actor(self):
+        return self.ego_actor
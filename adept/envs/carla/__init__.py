@@ -8,10 +8,13 @@ such as loading world, spawning actors, changing weather, etc
 # ==================================================================================================
 
 from ._load import load_carla, load_client, load_world
-from ._setter import set_weather, set_spectator, add_actor, apply_control
+from ._setter import set_weather, set_spectator, add_actor, apply_control, \
+    get_actor_blueprint, get_vehicle_control
 from ._getter import get_blueprint, get_color, get_transform, \
     get_location_relative_to, get_rotation_relative_to, get_raw_image, \
-    retrieve_from
+    get_raw_image_shape, get_raw_images, retrieve_from
+from ._batch import CommandBatch
+from ._snapshot import SnapshotCache
 from ._enum import CarlaVersion, WorldName, ActorAttr, CameraAttr, \
     VehicleType, SensorType, WeatherType, \
     ActorAddMode, TransformAddMode
@@ -24,9 +27,11 @@ from ._enum import CarlaVersion, WorldName, ActorAttr, CameraAttr, \
 __all__ = [  # user interface and other dependent packages
     "load_carla", "load_client", "load_world",
     "set_weather", "set_spectator", "add_actor", "apply_control",
+    "get_actor_blueprint", "get_vehicle_control",
     "get_blueprint", "get_color", "get_transform",
     "get_location_relative_to", "get_rotation_relative_to", "get_raw_image",
-    "retrieve_from",
+    "get_raw_image_shape", "get_raw_images", "retrieve_from",
+    "CommandBatch", "SnapshotCache",
     "CarlaVersion", "WorldName", "ActorAttr", "CameraAttr",
     "VehicleType", "SensorType", "WeatherType",
     "ActorAddMode", "TransformAddMode",
@@ -0,0 +1,166 @@
+# ==================================================================================================
+# -- imports ---------------------------------------------------------------------------------------
+# ==================================================================================================
+
+from ._getter import get_transform
+from ._setter import get_actor_blueprint, get_vehicle_control
+
+
+# ==================================================================================================
+# -- classes ---------------------------------------------------------------------------------------
+# ==================================================================================================
+
+class CommandBatch:
+    """
+    This is the class for batching carla commands, which collects the spawns, controls,
+    transform updates and destroys, and applies them by client.apply_batch_sync in as few round-trips as possible
+    note that:
+        1. the actor attached to another actor in the same batch(attach_to is the name of that actor)
+        is spawned in the next round, since the parent id is known only after the parent is spawned,
+        so the ego vehicle with its cameras takes two round-trips instead of one for each actor
+        2. the spawned actors are fetched by one world.get_actors call,
+        and the sensors start listening only after all the rounds are applied
+        3. the failed commands are printed and kept in {errors}, without stopping the other commands
+        4. the commands without response(e.g. the controls queued every tick) can be sent alone by flush,
+        which BaseCarlaEnv.tick calls with the tick, so all the controls of one tick take one round-trip
+    """
+
+    def __init__(self, client, world, snapshot_cache=None):
+        self.client = client
+        self.world = world
+        self.snapshot_cache = snapshot_cache  # invalidated if the batch ticks the world
+
+        self.spawns = []  # [(name, blueprint, transform, attach_to, listen)]
+        self.commands = []  # the commands without response, like controls, transforms and destroys
+        self.errors = []
+
+    def __len__(self):
+        return len(self.spawns) + len(self.commands)
+
+    def add_actor(self, name, key, mode="filter", choose="random", transform="random",
+                  color=None, specific_attrs=dict, attach_to=None, listen=None, **kwargs):
+        """
+        queue the spawn of the actor named {name}, with the same arguments as add_actor,
+        except that attach_to can also be the name of the actor queued before
+        :return: True if queued, otherwise False(the blueprint or the transform is not found)
+        """
+        bp = get_actor_blueprint(world=self.world, key=key, mode=mode, choose=choose,
+                                 color=color, specific_attrs=specific_attrs, **kwargs)
+        if bp is None:
+            return False
+
+        transform = get_transform(world=self.world, mode=transform, **kwargs)
+        if transform is None:
+            return False
+
+        self.spawns.append((name, bp, transform, attach_to, listen))
+        return True
+
+    def apply_control(self, vehicle, control_input):
+        if getattr(vehicle, "accepts_control_input", False):  # non-carla actor, applied at once
+            vehicle.apply_control(control_input)
+            return
+
+        import carla
+        self.commands.append(carla.command.ApplyVehicleControl(vehicle.id, get_vehicle_control(control_input)))
+
+    def apply_transform(self, actor, transform):
+        import carla
+        self.commands.append(carla.command.ApplyTransform(actor.id, transform))
+
+    def destroy(self, actors):
+        import carla
+        for actor in actors:
+            if actor is not None:
+                self.commands.append(carla.command.DestroyActor(actor.id))
+
+    def flush(self, do_tick=False, sync=True):
+        """
+        send the queued commands without response(controls, transforms, destroys) in one call,
+        by client.apply_batch_sync if {sync}, whose failed commands are kept in {errors},
+        otherwise by client.apply_batch without waiting for the responses(and without tick)
+        :return: the number of the commands sent
+        """
+        commands, self.commands = self.commands, []
+        if not sync:
+            if commands:
+                self.client.apply_batch(commands)
+            return len(commands)
+
+        if commands:
+            for response in self.client.apply_batch_sync(commands, do_tick):
+                if response.error:
+                    self._error("command", response.error)
+        elif do_tick:
+            self.world.tick()
+        if do_tick and self.snapshot_cache is not None:
+            self.snapshot_cache.invalidate()
+        return len(commands)
+
+    def apply(self, do_tick=False):
+        """
+        apply all the queued commands, and tick the world after the last round if {do_tick}
+        :return: the map from name to the spawned actor, None for the failed spawn
+        """
+        import carla
+
+        listens = [(spawn[0], spawn[4]) for spawn in self.spawns]
+        ids, pending, ticked = {}, self.spawns, False
+        commands, self.spawns, self.commands = self.commands, [], []
+
+        ## step1: apply the commands round by round, and each round spawns the actors whose parents are ready
+        while commands or pending:
+            spawns, waiting = [], []
+            for spawn in pending:
+                name, bp, transform, attach_to, _ = spawn
+                if attach_to is None:
+                    commands.append(carla.command.SpawnActor(bp, transform))
+                elif not isinstance(attach_to, str):
+                    commands.append(carla.command.SpawnActor(bp, transform, attach_to.id))
+                elif ids.get(attach_to) is not None:
+                    commands.append(carla.command.SpawnActor(bp, transform, ids[attach_to]))
+                elif attach_to in ids or not any(attach_to == other[0] for other in pending):
+                    self._error(name, "the parent {} is not spawned".format(attach_to))
+                    ids[name] = None
+                    continue
+                else:
+                    waiting.append(spawn)
+                    continue
+                spawns.append(spawn)
+
+            if not commands and not spawns:  # the remaining actors wait for each other
+                for spawn in waiting:
+                    self._error(spawn[0], "the parent {} is not spawned".format(spawn[3]))
+                    ids[spawn[0]] = None
+                break
+
+            ## the spawn commands are the last ones, so their responses are the last ones
+            ticked = do_tick and not waiting
+            responses = self.client.apply_batch_sync(commands, ticked)
+            for response in responses[:len(responses) - len(spawns)]:
+                if response.error:
+                    self._error("command", response.error)
+            for spawn, response in zip(spawns, responses[len(responses) - len(spawns):]):
+                if response.error:
+                    self._error(spawn[0], response.error)
+                ids[spawn[0]] = None if response.error else response.actor_id
+
+            commands, pending = [], waiting
+        if do_tick and not ticked:
+            self.world.tick()
+        if do_tick and self.snapshot_cache is not None:
+            self.snapshot_cache.invalidate()
+
+        ## step2: fetch all the spawned actors at once, and let the sensors listen
+        spawned = [actor_id for actor_id in ids.values() if actor_id is not None]
+        actors = {actor.id: actor for actor in self.world.get_actors(spawned)} if spawned else {}
+        actor_map = {name: actors.get(actor_id) for name, actor_id in ids.items()}
+        for name, listen in listens:
+            if actor_map.get(name) is not None and callable(listen):
+                actor_map[name].listen(listen)
+
+        return actor_map
+
+    def _error(self, name, error):
+        print("~~the carla command for {} got something wrong~~".format(name), error)
+        self.errors.append((name, error))
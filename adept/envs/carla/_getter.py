@@ -99,29 +99,90 @@ def get_rotation_relative_to(ref_actor=None, dpitch=0.0, dyaw=0.0, droll=0.0):
         return dpitch, dyaw, droll
 
 
-def get_raw_image(carla_image, format="bgr"):
+_RAW_IMAGE_CHANNELS = {"bgra": 4, "bgr": 3, "rgb": 3, "gray": None, "hsv": 3, "yuv": 3}
+
+
+def get_raw_image(carla_image, format="bgr", roi=None, out=None):
+    """
+    decode the carla image into the numpy image(H,W,C) of the format
+    :param roi: the region of interest (top, bottom, left, right) cropped before the conversion,
+    where None for any of them means the image border, e.g. (75, 141, None, None) for rows 75-141
+    :param out: the reusable buffer to write the converted image into, whose shape is given by get_raw_image_shape,
+    if None, a new array is allocated (except for "bgra", which is a read-only view of the raw data)
+    note that: the raw data is viewed(np.frombuffer) without copy, and only the roi is converted,
+    and the unknown format gets the BGRA image
+    """
     import numpy as np
     import cv2
 
-    raw_img = np.array(carla_image.raw_data)  # take raw data from carla image
-    raw_img = np.reshape(raw_img, newshape=(carla_image.height, carla_image.width, 4))  # 4 channels: BGRA
-    if format == "bgr":
-        return cv2.cvtColor(raw_img, cv2.BGRA2BGR)  # BGRA => RGB
+    raw_img = np.frombuffer(carla_image.raw_data, dtype=np.uint8).reshape(
+        carla_image.height, carla_image.width, 4)  # 4 channels: BGRA, no copy
+    if roi is not None:
+        top, bottom, left, right = roi
+        raw_img = raw_img[top:bottom, left:right]  # still a view
+
+    if format == "bgra" or format not in _RAW_IMAGE_CHANNELS:  # BGRA for the unknown format, as before
+        if out is None:
+            return raw_img  # BGRA
+        np.copyto(out, raw_img)
+        return out
+    if out is None:
+        out = np.empty(get_raw_image_shape(raw_img.shape[0], raw_img.shape[1], format), dtype=np.uint8)
+
+    if format == "gray":
+        return cv2.cvtColor(raw_img, cv2.COLOR_BGRA2GRAY, dst=out)  # BGRA => GRAY
     elif format == "rgb":
-        return cv2.cvtColor(raw_img, cv2.BGRA2RGB)  # BGRA => BGR
-    elif format == "gray":
-        return cv2.cvtColor(raw_img, cv2.BGRA2GRAY)  # BGRA => GRAY
-    elif format == "hsv":
-        return cv2.cvtColor(raw_img, cv2.BGRA2HSV)  # BGRA => HSV
-    elif format == "yuv":
-        return cv2.cvtColor(raw_img, cv2.BGRA2YUV)  # BGRA => YUV
-
-    return raw_img  # BGRA
+        np.copyto(out, raw_img[..., 2::-1])  # BGRA => RGB, by viewing the channels reversely
+        return out
 
-
-def retrieve_from(actor, about="transform"):
+    np.copyto(out, raw_img[..., :3])  # BGRA => BGR, by viewing the first 3 channels
+    if format == "hsv":
+        return cv2.cvtColor(out, cv2.COLOR_BGR2HSV, dst=out)  # BGR => HSV, in place
+    elif format == "yuv":
+        return cv2.cvtColor(out, cv2.COLOR_BGR2YUV, dst=out)  # BGR => YUV, in place
+    return out  # BGR
+
+
+def get_raw_image_shape(height, width, format="bgr", roi=None):
+    """
+    the shape of the image decoded by get_raw_image, used to allocate the reusable buffer
+    """
+    if roi is not None:
+        top, bottom, left, right = roi
+        height = len(range(height)[top:bottom])
+        width = len(range(width)[left:right])
+    channels = _RAW_IMAGE_CHANNELS.get(format, 4)  # BGRA for the unknown format
+    return (height, width) if channels is None else (height, width, channels)
+
+
+def get_raw_images(carla_images, format="bgr", rois=None, outs=None):
+    """
+    decode the images of the whole camera set in one call
+    :param carla_images: the map from camera name to its carla image
+    :param format: the format for all cameras, or the map from camera name to its format
+    :param rois: the map from camera name to its roi, the camera not in it is not cropped
+    :param outs: the map from camera name to its reusable buffer, the camera not in it gets a new array
+    :return: the map from camera name to its decoded image
+    """
+    rois, outs = rois or {}, outs or {}
+    return {
+        camera: get_raw_image(carla_image,
+                              format=format if isinstance(format, str) else format[camera],
+                              roi=rois.get(camera), out=outs.get(camera))
+        for camera, carla_image in carla_images.items()
+    }
+
+
+def retrieve_from(actor, about="transform", snapshot=None):
+    """
+    retrieve the transform, location, rotation or velocity of the actor
+    :param snapshot: the world snapshot(world.get_snapshot()) or the SnapshotCache, if given and the actor is in it,
+    the value is read from the snapshot without any request to the server
+    """
     if actor is not None:
-        if about == "tranform":
+        if snapshot is not None and hasattr(actor, "id"):
+            actor = snapshot.find(actor.id) or actor
+        if about == "transform":
             return actor.get_transform()
         elif about == "location":
             return actor.get_transform().location
@@ -1,7 +1,7 @@
 # ==================================================================================================
 # -- imports ---------------------------------------------------------------------------------------
 # ==================================================================================================
-from adept.envs.carla import get_blueprint, get_color, get_transform
+from ._getter import get_blueprint, get_color, get_transform
 
 
 # ==================================================================================================
@@ -23,17 +23,25 @@ def set_spectator(world, transform, **kwargs):
 
 
 def apply_control(vehicle, control_input):
+    if getattr(vehicle, "accepts_control_input", False):  # non-carla actor, such as the replay ego actor
+        vehicle.apply_control(control_input)
+        return
+
+    vehicle.apply_control(get_vehicle_control(control_input))
+
+
+def get_vehicle_control(control_input):
     import carla
     control = carla.VehicleControl()
     control.steer, control.throttle, control.brake = \
         control_input["s"], control_input["t"], control_input["b"]
     control.manual_gear_shift = False
 
-    vehicle.apply_control(control)
+    return control
 
 
-def add_actor(world, key, mode="filter", choose="random", transform="random",
-              color=None, specific_attrs=dict, attach_to=None, listen=None, **kwargs):
+def get_actor_blueprint(world, key, mode="filter", choose="random",
+                        color=None, specific_attrs=dict, **kwargs):
     bp = get_blueprint(world=world, key=key, mode=mode, choose=choose, **kwargs)
     if bp is None:
         return None
@@ -49,6 +57,16 @@ def add_actor(world, key, mode="filter", choose="random", transform="random",
                     and bp.get_attribute(attr).is_modifiable:
                 bp.set_attribute(attr, specific_attrs[attr])
 
+    return bp
+
+
+def add_actor(world, key, mode="filter", choose="random", transform="random",
+              color=None, specific_attrs=dict, attach_to=None, listen=None, **kwargs):
+    bp = get_actor_blueprint(world=world, key=key, mode=mode, choose=choose,
+                             color=color, specific_attrs=specific_attrs, **kwargs)
+    if bp is None:
+        return None
+
     transform = get_transform(world=world, mode=transform, **kwargs)
     if transform is None:
         return None
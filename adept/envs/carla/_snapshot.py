@@ -0,0 +1,76 @@
+# ==================================================================================================
+# -- imports ---------------------------------------------------------------------------------------
+# ==================================================================================================
+
+import threading
+
+
+# ==================================================================================================
+# -- classes ---------------------------------------------------------------------------------------
+# ==================================================================================================
+
+class SnapshotCache:
+    """
+    This is the class for caching the world snapshot of the current frame,
+    which can be passed to retrieve_from as the snapshot, so that all the modules reading the actors
+    in the same frame(vehicle state, control input, controller, ...) share one request to the server
+    note that:
+        1. the cache is keyed by the frame id, and invalidated by invalidate(frame),
+        which BaseCarlaEnv.tick calls with the frame id returned by world.tick
+        2. if listen, the snapshot is pushed by world.on_tick for every server frame instead,
+        which keeps the cache fresh in the asynchronous mode without any request
+        3. hits and misses count the reads served by the cached snapshot and by the server respectively
+    """
+
+    def __init__(self, world, listen=False):
+        self.world = world
+        self.snapshot = None
+        self.frame = None  # the frame id of the cached snapshot, or the expected one after invalidate
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._callback_id = world.on_tick(self.update) if listen else None
+
+    def invalidate(self, frame=None):
+        with self._lock:
+            if frame is None or self.snapshot is None or self.snapshot.frame != frame:
+                self.snapshot = None
+            self.frame = frame
+
+    def update(self, snapshot):
+        with self._lock:
+            if self.snapshot is None or snapshot.frame > self.snapshot.frame:
+                self.snapshot, self.frame = snapshot, snapshot.frame
+
+    def get(self):
+        with self._lock:
+            if self.snapshot is not None:
+                self.hits += 1
+                return self.snapshot
+            self.misses += 1
+
+        snapshot = self.world.get_snapshot()
+        self.update(snapshot)
+        return snapshot
+
+    def find(self, actor_id):
+        """
+        the actor snapshot in the cached world snapshot, the same as WorldSnapshot.find
+        """
+        return self.get().find(actor_id)
+
+    def close(self):
+        if self._callback_id is not None:
+            self.world.remove_on_tick(self._callback_id)
+            self._callback_id = None
+        self.invalidate()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "frame": self.frame,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
@@ -2,13 +2,22 @@
 the sumo package contains all functions corresponding to sumo (current version is 1.14.1)
 such as net-edit, net-convert, traci and so on,
 used for traffic-flow-generation, co-simulation-with-carla, etc
+note that: the co-simulation modules(_sumo_simulation, _bridge_helper, _constants) need carla, traci and sumolib,
+so they are not imported here, and are imported directly by the scripts after finding those modules
 """
 
+# ==================================================================================================
+# -- imports ---------------------------------------------------------------------------------------
+# ==================================================================================================
+from ._scheduler import TickScheduler
+from ._synchronization import DoubleBufferedSteps, SumoControlledActors
 
 # ==================================================================================================
 # -- all -------------------------------------------------------------------------------------------
 # ==================================================================================================
 
 __all__ = [  # user interface and other dependent packages
-
+    "TickScheduler",
+    "DoubleBufferedSteps",
+    "SumoControlledActors",
 ]
\ No newline at end of file
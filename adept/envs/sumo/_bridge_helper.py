@@ -17,10 +17,11 @@ import math
 import os
 import random
 
+import numpy as np
 import carla  # pylint: disable=import-error
 import traci  # pylint: disable=import-error
 
-from .sumo_simulation import SumoSignalState, SumoVehSignal
+from ._sumo_simulation import SumoSignalState, SumoVehSignal
 
 # ==================================================================================================
 # -- Bridge helper (SUMO <=> CARLA) ----------------------------------------------------------------
@@ -35,10 +36,20 @@ class BridgeHelper(object):
     blueprint_library = []
     offset = (0, 0)
 
-    _vtypes_path = os.path.join(os.path.dirname(os.path.realpath(__file__)), "../..", "data",
-                                "vtypes.json")
-    with open(_vtypes_path) as f:
-        _VTYPES = json.load(f)['carla_blueprints']
+    # The vtypes of the carla blueprints, read at the first use from the data folder of the carla
+    # Co-Simulation/Sumo directory, where the co-simulation scripts are run.
+    vtypes_path = os.path.join('data', 'vtypes.json')
+    _VTYPES = None
+
+    @staticmethod
+    def _get_vtypes():
+        """
+        Returns the vtypes of the carla blueprints, read once from vtypes_path.
+        """
+        if BridgeHelper._VTYPES is None:
+            with open(BridgeHelper.vtypes_path) as f:
+                BridgeHelper._VTYPES = json.load(f)['carla_blueprints']
+        return BridgeHelper._VTYPES
 
     @staticmethod
     def get_carla_transform(in_sumo_transform, extent):
@@ -95,17 +106,110 @@ class BridgeHelper(object):
 
         return out_transform
 
+    @staticmethod
+    def get_carla_transforms(locations, rotations, extents):
+        """
+        Returns carla locations and rotations based on sumo ones, for all the given actors at once
+        (the array version of get_carla_transform).
+
+            :param locations: (N, 3) array of sumo locations (x, y, z).
+            :param rotations: (N, 3) array of sumo rotations (pitch, yaw, roll).
+            :param extents: (N, 3) array of extents, or (N,) array of their x (i.e., half lengths).
+            :return: (N, 3) arrays of carla locations and rotations.
+        """
+        offset = BridgeHelper.offset
+        locations = np.asarray(locations, dtype=np.float64).reshape(-1, 3)
+        rotations = np.asarray(rotations, dtype=np.float64).reshape(-1, 3)
+        extents = np.asarray(extents, dtype=np.float64)
+        half_lengths = extents[:, 0] if extents.ndim == 2 else extents
+
+        # From front-center-bumper to center (sumo reference system), then applying offset sumo-carla
+        # net and transforming to carla reference system (left-handed system).
+        yaw = np.radians(90.0 - rotations[:, 1])
+        pitch = np.radians(rotations[:, 0])
+        out_locations = np.empty_like(locations)
+        out_locations[:, 0] = locations[:, 0] - np.cos(yaw) * half_lengths - offset[0]
+        out_locations[:, 1] = -(locations[:, 1] - np.sin(yaw) * half_lengths - offset[1])
+        out_locations[:, 2] = locations[:, 2] - np.sin(pitch) * half_lengths
+
+        out_rotations = rotations.copy()
+        out_rotations[:, 1] -= 90.0
+        return out_locations, out_rotations
+
+    @staticmethod
+    def get_sumo_transforms(locations, rotations, extents):
+        """
+        Returns sumo locations and rotations based on carla ones, for all the given actors at once
+        (the array version of get_sumo_transform).
+
+            :param locations: (N, 3) array of carla locations (x, y, z).
+            :param rotations: (N, 3) array of carla rotations (pitch, yaw, roll).
+            :param extents: (N, 3) array of extents, or (N,) array of their x (i.e., half lengths).
+            :return: (N, 3) arrays of sumo locations and rotations.
+        """
+        offset = BridgeHelper.offset
+        locations = np.asarray(locations, dtype=np.float64).reshape(-1, 3)
+        rotations = np.asarray(rotations, dtype=np.float64).reshape(-1, 3)
+        extents = np.asarray(extents, dtype=np.float64)
+        half_lengths = extents[:, 0] if extents.ndim == 2 else extents
+
+        # From center to front-center-bumper (carla reference system), then applying offset
+        # carla-sumo net and transforming to sumo reference system.
+        yaw = np.radians(-rotations[:, 1])
+        pitch = np.radians(rotations[:, 0])
+        out_locations = np.empty_like(locations)
+        out_locations[:, 0] = locations[:, 0] + np.cos(yaw) * half_lengths + offset[0]
+        out_locations[:, 1] = -(locations[:, 1] - np.sin(yaw) * half_lengths - offset[1])
+        out_locations[:, 2] = locations[:, 2] - np.sin(pitch) * half_lengths
+
+        out_rotations = rotations.copy()
+        out_rotations[:, 1] += 90.0
+        return out_locations, out_rotations
+
+    @staticmethod
+    def get_transform_arrays(transforms):
+        """
+        Returns (N, 3) arrays of the locations and rotations (pitch, yaw, roll) of the given transforms.
+        """
+        locations = np.array([(t.location.x, t.location.y, t.location.z) for t in transforms],
+                             dtype=np.float64).reshape(-1, 3)
+        rotations = np.array([(t.rotation.pitch, t.rotation.yaw, t.rotation.roll) for t in transforms],
+                             dtype=np.float64).reshape(-1, 3)
+        return locations, rotations
+
+    @staticmethod
+    def get_transforms(locations, rotations):
+        """
+        Returns the list of carla transforms built from (N, 3) arrays of locations and rotations.
+        """
+        return [
+            carla.Transform(carla.Location(x, y, z), carla.Rotation(pitch, yaw, roll))
+            for (x, y, z), (pitch, yaw, roll) in zip(locations.tolist(), rotations.tolist())
+        ]
+
+    @staticmethod
+    def get_apply_transform_commands(actor_ids, locations, rotations):
+        """
+        Returns the batch of carla.command.ApplyTransform moving the given carla actors to the
+        (N, 3) arrays of locations and rotations, e.g. returned by get_carla_transforms.
+        """
+        transforms = BridgeHelper.get_transforms(locations, rotations)
+        return [
+            carla.command.ApplyTransform(actor_id, transform)
+            for actor_id, transform in zip(actor_ids, transforms)
+        ]
+
     @staticmethod
     def _get_recommended_carla_blueprint(sumo_actor):
         """
         Returns an appropriate blueprint based on the given sumo actor.
         """
         vclass = sumo_actor.vclass.value
+        vtypes = BridgeHelper._get_vtypes()
 
         blueprints = []
         for blueprint in BridgeHelper.blueprint_library:
-            if blueprint.id in BridgeHelper._VTYPES and \
-               BridgeHelper._VTYPES[blueprint.id]['vClass'] == vclass:
+            if blueprint.id in vtypes and vtypes[blueprint.id]['vClass'] == vclass:
                 blueprints.append(blueprint)
 
         if not blueprints:
@@ -171,13 +275,14 @@ class BridgeHelper(object):
         else:
             traci.vehicletype.copy('DEFAULT_VEHTYPE', type_id)
 
-        if type_id in BridgeHelper._VTYPES:
-            if 'vClass' in BridgeHelper._VTYPES[type_id]:
-                _class = BridgeHelper._VTYPES[type_id]['vClass']
+        vtypes = BridgeHelper._get_vtypes()
+        if type_id in vtypes:
+            if 'vClass' in vtypes[type_id]:
+                _class = vtypes[type_id]['vClass']
                 traci.vehicletype.setVehicleClass(type_id, _class)
 
-            if 'guiShape' in BridgeHelper._VTYPES[type_id]:
-                shape = BridgeHelper._VTYPES[type_id]['guiShape']
+            if 'guiShape' in vtypes[type_id]:
+                shape = vtypes[type_id]['guiShape']
                 traci.vehicletype.setShapeClass(type_id, shape)
 
         if 'color' in attrs:
@@ -0,0 +1,134 @@
+# ==================================================================================================
+# -- imports ---------------------------------------------------------------------------------------
+# ==================================================================================================
+
+import bisect
+import time
+
+
+# ==================================================================================================
+# -- classes ---------------------------------------------------------------------------------------
+# ==================================================================================================
+
+class TickScheduler(object):
+    """
+    TickScheduler paces the synchronization ticks against the wall clock.
+
+    In the real-time mode, the k-th tick is due at start + k * step_length, so that short and long
+    ticks do not accumulate drift. When a tick overruns and the loop falls behind its deadline, the
+    catch-up policy decides what to do:
+
+        * none: realign the deadlines to now, i.e. the simulation silently falls behind the wall clock.
+        * burst: run the next ticks back to back until the loop catches up, or realign if the lag
+          exceeds max_lag.
+        * skip: drop the missed deadlines (counted as skipped frames) and wait for the next one.
+
+    Whatever the policy, the on_lag callback is called with True when a tick ends after its
+    deadline and with False when a tick ends in time again, e.g. to switch off rendering meanwhile.
+    In the as-fast-as-possible mode (realtime=False), the ticks never wait nor lag.
+
+    The clock and sleep functions can be replaced, e.g. by a fake clock in the tests.
+    """
+    OVERRUN_BINS_MS = (1.0, 2.0, 5.0, 10.0, 20.0, 50.0, 100.0, 200.0, 500.0)
+
+    def __init__(self, step_length, realtime=True, catch_up='none', max_lag=None, on_lag=None,
+                 clock=time.perf_counter, sleep=time.sleep):
+        self.step_length = step_length
+        self.realtime = realtime
+        self.catch_up = catch_up
+        self.max_lag = max_lag if max_lag is not None else 10 * step_length
+        self.on_lag = on_lag
+        self.clock = clock
+        self.sleep = sleep
+
+        self.start = None
+        self.deadline = None
+        self.lagging = False
+
+        self.ticks = 0
+        self.overruns = 0  # Ticks longer than step_length.
+        self.skipped = 0  # Deadlines dropped by the skip policy.
+        self.realigned = 0  # Times the deadlines were realigned to now.
+        self.max_drift = 0.0
+        self.overrun_histogram = [0] * (len(self.OVERRUN_BINS_MS) + 1)
+
+    @property
+    def drift(self):
+        """
+        Wall time elapsed minus simulation time elapsed (seconds), positive when behind.
+        """
+        if self.start is None:
+            return 0.0
+        return self.clock() - self.start - self.ticks * self.step_length
+
+    def _set_lagging(self, lagging):
+        if lagging != self.lagging:
+            self.lagging = lagging
+            if self.on_lag is not None:
+                self.on_lag(lagging)
+
+    def run(self, tick, max_ticks=None):
+        """
+        Calls tick() paced by the scheduler, forever or max_ticks times.
+        """
+        while max_ticks is None or self.ticks < max_ticks:
+            tick_start = self.clock()
+            if self.start is None:
+                self.start, self.deadline = tick_start, tick_start
+
+            tick()
+
+            self.wait(tick_start)
+
+    def wait(self, tick_start):
+        """
+        Accounts for the tick started at tick_start and waits for the next deadline.
+        """
+        now = self.clock()
+        self.ticks += 1
+        self.deadline += self.step_length
+
+        overrun = now - tick_start - self.step_length
+        if overrun > 0:
+            self.overruns += 1
+            self.overrun_histogram[bisect.bisect_right(self.OVERRUN_BINS_MS, 1000.0 * overrun)] += 1
+        self.max_drift = max(self.max_drift, now - self.start - self.ticks * self.step_length)
+
+        if not self.realtime:
+            return
+
+        lag = now - self.deadline
+        self._set_lagging(lag > 0)
+        if lag <= 0:
+            self.sleep(-lag)
+        elif self.catch_up == 'burst' and lag <= self.max_lag:
+            pass  # Tick again right away.
+        elif self.catch_up == 'skip':
+            missed = int(lag // self.step_length) + 1
+            self.skipped += missed
+            self.deadline += missed * self.step_length
+            self.sleep(self.deadline - now)
+        else:
+            self.realigned += 1
+            self.deadline = now
+
+    def metrics(self):
+        """
+        Returns the pacing metrics, including the overrun histogram {'<1ms': n, ..., '>=500ms': n}.
+        """
+        bins = self.OVERRUN_BINS_MS
+        labels = ['<{:g}ms'.format(bins[0])] + \
+                 ['{:g}-{:g}ms'.format(lo, hi) for lo, hi in zip(bins[:-1], bins[1:])] + \
+                 ['>={:g}ms'.format(bins[-1])]
+        wall_time = self.clock() - self.start if self.start is not None else 0.0
+        return {
+            'ticks': self.ticks,
+            'wall_time': wall_time,
+            'realtime_factor': self.ticks * self.step_length / wall_time if wall_time else 0.0,
+            'drift': self.drift,
+            'max_drift': self.max_drift,
+            'overruns': self.overruns,
+            'skipped': self.skipped,
+            'realigned': self.realigned,
+            'overrun_histogram': dict(zip(labels, self.overrun_histogram)),
+        }
@@ -16,13 +16,12 @@ import enum
 import logging
 import os
 
+import numpy as np
 import carla  # pylint: disable=import-error
 import sumolib  # pylint: disable=import-error
 import traci  # pylint: disable=import-error
 
-from .constants import INVALID_ACTOR_ID
-
-import lxml.etree as ET  # pylint: disable=import-error
+from ._constants import INVALID_ACTOR_ID
 
 # ==================================================================================================
 # -- sumo definitions ------------------------------------------------------------------------------
@@ -280,6 +279,147 @@ class SumoTLManager(object):
                     self._current_phase[tl_id] = current_phase
 
 
+# ==================================================================================================
+# -- sumo vehicle states ---------------------------------------------------------------------------
+# ==================================================================================================
+
+
+class SumoVehicleStates(object):
+    """
+    SumoVehicleStates keeps the state of every sumo vehicle in numpy arrays, one row per vehicle.
+
+    The row of a vehicle (its index) is assigned at departure and stays the same until its arrival,
+    after which the row is reused by the next departed vehicle. The static fields (type, class, color
+    and extent) are read only once at departure, while the dynamic fields (location, rotation,
+    speeds and signals) are decoded every step from one bulk result of all the vehicles.
+    """
+    # Dynamic variables read every step.
+    DYNAMIC_VARIABLES = (
+        traci.constants.VAR_POSITION3D, traci.constants.VAR_ANGLE, traci.constants.VAR_SLOPE,
+        traci.constants.VAR_SPEED, traci.constants.VAR_SPEED_LAT, traci.constants.VAR_SIGNALS
+    )
+
+    def __init__(self, capacity=256):
+        self.index = {}  # {actor_id: row}
+        self.actor_ids = []  # [actor_id or None]
+        self._free = []
+
+        # Static fields.
+        self.type_ids = []
+        self.vclasses = []
+        self.colors = []
+        self.extents = np.zeros((0, 3))  # half of (length, width, height)
+
+        # Dynamic fields.
+        self.locations = np.zeros((0, 3))  # (x, y, z)
+        self.rotations = np.zeros((0, 3))  # (pitch, yaw, roll), i.e. (slope, angle, 0)
+        self.speeds = np.zeros((0, 2))  # (speed, lateral speed)
+        self.signals = np.zeros(0, dtype=np.int64)
+        self.alive = np.zeros(0, dtype=bool)
+
+        self._reserve(capacity)
+
+    def __len__(self):
+        return len(self.index)
+
+    def _reserve(self, capacity):
+        size = len(self.alive)
+        if capacity <= size:
+            return
+        capacity = max(capacity, 2 * size)
+
+        def grow(array):
+            grown = np.zeros((capacity,) + array.shape[1:], dtype=array.dtype)
+            grown[:size] = array
+            return grown
+
+        self.extents, self.locations = grow(self.extents), grow(self.locations)
+        self.rotations, self.speeds = grow(self.rotations), grow(self.speeds)
+        self.signals, self.alive = grow(self.signals), grow(self.alive)
+        for fields in (self.actor_ids, self.type_ids, self.vclasses, self.colors):
+            fields.extend([None] * (capacity - size))
+        self._free.extend(range(capacity - 1, size - 1, -1))  # the lower rows are reused first
+
+    def register(self, actor_id):
+        """
+        Assigns a row to the given actor and reads its static fields.
+
+            :return: the row of the actor.
+        """
+        if actor_id in self.index:
+            return self.index[actor_id]
+        if not self._free:
+            self._reserve(len(self.alive) + 1)
+
+        row = self._free.pop()
+        self.index[actor_id] = row
+        self.actor_ids[row] = actor_id
+        self.alive[row] = True
+
+        type_id = traci.vehicle.getTypeID(actor_id)
+        self.type_ids[row] = type_id
+        self.vclasses[row] = SumoActorClass(traci.vehicle.getVehicleClass(actor_id))
+        self.colors[row] = traci.vehicle.getColor(actor_id)
+        self.extents[row] = (traci.vehicle.getLength(actor_id) / 2.0,
+                             traci.vehicle.getWidth(actor_id) / 2.0,
+                             traci.vehicle.getHeight(actor_id) / 2.0)
+        return row
+
+    def release(self, actor_id):
+        """
+        Frees the row of the given actor.
+        """
+        row = self.index.pop(actor_id, None)
+        if row is None:
+            return
+        self.actor_ids[row] = self.type_ids[row] = self.vclasses[row] = self.colors[row] = None
+        self.alive[row] = False
+        self._free.append(row)
+
+    def update(self, results):
+        """
+        Decodes the bulk results, i.e. {actor_id: {variable: value}}, into the dynamic fields.
+        """
+        if not results:
+            return
+        for actor_id in results:
+            if actor_id not in self.index:  # e.g. departed before the bulk subscription
+                self.register(actor_id)
+
+        rows = np.fromiter((self.index[actor_id] for actor_id in results), dtype=np.int64,
+                           count=len(results))
+        values = list(results.values())
+        self.locations[rows] = [value[traci.constants.VAR_POSITION3D] for value in values]
+        self.rotations[rows, 0] = [value[traci.constants.VAR_SLOPE] for value in values]
+        self.rotations[rows, 1] = [value[traci.constants.VAR_ANGLE] for value in values]
+        self.speeds[rows, 0] = [value[traci.constants.VAR_SPEED] for value in values]
+        self.speeds[rows, 1] = [value[traci.constants.VAR_SPEED_LAT] for value in values]
+        self.signals[rows] = [value[traci.constants.VAR_SIGNALS] for value in values]
+
+    def read(self, actor_id):
+        """
+        Reads the dynamic fields of the given actor directly, e.g. before its first bulk result.
+        """
+        row = self.register(actor_id)
+        self.locations[row] = traci.vehicle.getPosition3D(actor_id)
+        self.rotations[row, :2] = (traci.vehicle.getSlope(actor_id), traci.vehicle.getAngle(actor_id))
+        self.speeds[row] = (traci.vehicle.getSpeed(actor_id), traci.vehicle.getLateralSpeed(actor_id))
+        self.signals[row] = traci.vehicle.getSignals(actor_id)
+        return row
+
+    def get_actor(self, actor_id):
+        """
+        Returns the SumoActor of the given actor.
+        """
+        row = self.index[actor_id]
+        location, rotation = self.locations[row].tolist(), self.rotations[row].tolist()
+        transform = carla.Transform(carla.Location(location[0], location[1], location[2]),
+                                    carla.Rotation(rotation[0], rotation[1], rotation[2]))
+        extent = carla.Vector3D(*self.extents[row].tolist())
+        return SumoActor(self.type_ids[row], self.vclasses[row], transform, int(self.signals[row]),
+                         extent, self.colors[row])
+
+
 # ==================================================================================================
 # -- sumo simulation -------------------------------------------------------------------------------
 # ==================================================================================================
@@ -291,6 +431,8 @@ def _get_sumo_net(cfg_file):
     This method reads the sumo configuration file and retrieve the sumo net filename to create the
     net.
     """
+    import lxml.etree as ET  # pylint: disable=import-error
+
     cfg_file = os.path.join(os.getcwd(), cfg_file)
 
     tree = ET.parse(cfg_file)
@@ -309,8 +451,13 @@ def _get_sumo_net(cfg_file):
 class SumoSimulation(object):
     """
     SumoSimulation is responsible for the management of the sumo simulation.
+
+    In the bulk mode, the dynamic variables of every vehicle are read in one context subscription per
+    step (around one junction, with a range covering the whole net) instead of one subscription per
+    vehicle, and decoded into the numpy arrays of SumoVehicleStates (see vehicle_states).
     """
-    def __init__(self, cfg_file, step_length, host=None, port=None, sumo_gui=False, client_order=1):
+    def __init__(self, cfg_file, step_length, host=None, port=None, sumo_gui=False, client_order=1,
+                 bulk=False):
         if sumo_gui is True:
             sumo_binary = sumolib.checkBinary('sumo-gui')
         else:
@@ -350,14 +497,43 @@ class SumoSimulation(object):
         # Traffic light manager.
         self.traffic_light_manager = SumoTLManager()
 
+        # Bulk state of all the vehicles.
+        self.bulk = bulk
+        self.vehicle_states = SumoVehicleStates() if bulk else None
+        self._context_id = None
+        if bulk:
+            self._subscribe_context()
+
+    def _subscribe_context(self):
+        """
+        Subscribes the dynamic variables of all the vehicles by one context subscription around the
+        first junction, whose range covers the whole net.
+        """
+        junction_ids = traci.junction.getIDList()
+        if not junction_ids:
+            logging.warning('No junction to subscribe the vehicles in bulk, falling back to '
+                            'per-vehicle subscriptions')
+            self.bulk, self.vehicle_states = False, None
+            return
+
+        if self.net is not None:
+            (xmin, ymin), (xmax, ymax) = self.net.getBBoxXY()
+            context_range = 2.0 * ((xmax - xmin)**2 + (ymax - ymin)**2)**0.5 + 1000.0
+        else:
+            context_range = 1e7
+
+        self._context_id = junction_ids[0]
+        traci.junction.subscribeContext(self._context_id, traci.constants.CMD_GET_VEHICLE_VARIABLE,
+                                        context_range, list(SumoVehicleStates.DYNAMIC_VARIABLES))
+
     @property
     def traffic_light_ids(self):
         return self.traffic_light_manager.get_all_landmarks()
 
-    @staticmethod
-    def subscribe(actor_id):
+    def subscribe(self, actor_id):
         """
-        Subscribe the given actor to the following variables:
+        Subscribe the given actor to the following variables (in the bulk mode, the actor is already
+        subscribed by the context subscription):
 
             * Type.
             * Vehicle class.
@@ -369,6 +545,8 @@ class SumoSimulation(object):
             * Lateral speed.
             * Signals.
         """
+        if self.bulk:
+            return
         traci.vehicle.subscribe(actor_id, [
             traci.constants.VAR_TYPE, traci.constants.VAR_VEHICLECLASS, traci.constants.VAR_COLOR,
             traci.constants.VAR_LENGTH, traci.constants.VAR_WIDTH, traci.constants.VAR_HEIGHT,
@@ -376,11 +554,12 @@ class SumoSimulation(object):
             traci.constants.VAR_SPEED, traci.constants.VAR_SPEED_LAT, traci.constants.VAR_SIGNALS
         ])
 
-    @staticmethod
-    def unsubscribe(actor_id):
+    def unsubscribe(self, actor_id):
         """
         Unsubscribe the given actor from receiving updated information each step.
         """
+        if self.bulk:
+            return
         traci.vehicle.unsubscribe(actor_id)
 
     def get_net_offset(self):
@@ -391,11 +570,15 @@ class SumoSimulation(object):
             return (0, 0)
         return self.net.getLocationOffset()
 
-    @staticmethod
-    def get_actor(actor_id):
+    def get_actor(self, actor_id):
         """
         Accessor for sumo actor.
         """
+        if self.bulk:
+            if actor_id not in self.vehicle_states.index:
+                self.vehicle_states.read(actor_id)
+            return self.vehicle_states.get_actor(actor_id)
+
         results = traci.vehicle.getSubscriptionResults(actor_id)
 
         type_id = results[traci.constants.VAR_TYPE]
@@ -511,6 +694,14 @@ class SumoSimulation(object):
         self.spawned_actors = set(traci.simulation.getDepartedIDList())
         self.destroyed_actors = set(traci.simulation.getArrivedIDList())
 
+        if self.bulk:
+            for actor_id in self.destroyed_actors:
+                self.vehicle_states.release(actor_id)
+            for actor_id in self.spawned_actors - self.destroyed_actors:
+                self.vehicle_states.register(actor_id)
+            self.vehicle_states.update(
+                traci.junction.getContextSubscriptionResults(self._context_id))
+
     @staticmethod
     def close():
         """
@@ -0,0 +1,94 @@
+# ==================================================================================================
+# -- imports ---------------------------------------------------------------------------------------
+# ==================================================================================================
+
+import concurrent.futures
+
+
+# ==================================================================================================
+# -- classes ---------------------------------------------------------------------------------------
+# ==================================================================================================
+
+class DoubleBufferedSteps(object):
+    """
+    DoubleBufferedSteps runs the sumo and carla steps of a synchronization tick, each one applying
+    the snapshot of the other side and returning its own snapshot:
+
+        * sumo step: carla snapshot --> sumo snapshot.
+        * carla step: sumo snapshot --> carla snapshot.
+
+    With staleness 0 the steps run one after the other, as carla is synchronized with the sumo
+    snapshot of the same tick. With staleness 1 the steps run concurrently (the sumo step on a worker
+    thread), each one applying the snapshot of the other side from the previous tick. The snapshots
+    are double-buffered: the steps only write their new snapshot, which replaces the one being read
+    after both steps have finished. Before the first tick, both snapshots are None.
+    """
+    def __init__(self, sumo_step, carla_step, staleness=0):
+        self.sumo_step = sumo_step
+        self.carla_step = carla_step
+        self.staleness = staleness
+
+        self.sumo_snapshot = None
+        self.carla_snapshot = None
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=1) if staleness else None
+
+    def tick(self):
+        """
+        Runs both steps once and swaps in their snapshots.
+        """
+        if self.staleness == 0:
+            self.sumo_snapshot = self.sumo_step(self.carla_snapshot)
+            self.carla_snapshot = self.carla_step(self.sumo_snapshot)
+        else:
+            future = self._executor.submit(self.sumo_step, self.carla_snapshot)
+            carla_snapshot = self.carla_step(self.sumo_snapshot)
+            self.sumo_snapshot, self.carla_snapshot = future.result(), carla_snapshot
+
+    def close(self):
+        """
+        Waits for the worker thread, if any.
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+
+
+class SumoControlledActors(object):
+    """
+    SumoControlledActors keeps the ids of the sumo actors not controlled by carla, and is owned by
+    the sumo step, as the only one using traci.
+
+    The carla step rejects the sumo actors which it cannot spawn (i.e., without any carla
+    blueprint) through its snapshot, so a rejection is applied by the next sumo step reading that
+    snapshot: in the same tick with staleness 0, and one tick later with staleness 1.
+    """
+    def __init__(self, unsubscribe):
+        self.unsubscribe = unsubscribe
+        self.actor_ids = set()
+
+    def __contains__(self, actor_id):
+        return actor_id in self.actor_ids
+
+    def __len__(self):
+        return len(self.actor_ids)
+
+    def __iter__(self):
+        return iter(self.actor_ids)
+
+    def update(self, spawned_actors, destroyed_actors):
+        """
+        Adds the spawned sumo actors and removes the destroyed ones.
+        """
+        self.actor_ids.update(spawned_actors)
+        self.actor_ids.difference_update(destroyed_actors)
+
+    def reject(self, actor_ids):
+        """
+        Removes and unsubscribes the given sumo actors, skipping the ones already gone.
+
+            :return: the list of the removed actors.
+        """
+        rejected = [actor_id for actor_id in actor_ids if actor_id in self.actor_ids]
+        for actor_id in rejected:
+            self.actor_ids.discard(actor_id)
+            self.unsubscribe(actor_id)
+        return rejected
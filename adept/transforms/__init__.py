@@ -12,6 +12,8 @@ from ._coordinate import Coordinate, Coordinate2D, Coordinate3D, \
 from ._pose import Pose, EulerAngle, Quaternion, PoseTransformer
 from ._entity import CoordinateEntity, Point, Line, Box2D, Box3D, SamplePath2D
 from ._image_process import ColorSpace, img_transfer
+from ._image_transform import ImageTransform, RandomPerspective, RandomBrightnessContrast, \
+    RandomGaussianBlur, RandomNoise, PrintabilityMap, TransformStack
 
 # ==================================================================================================
 # -- all -------------------------------------------------------------------------------------------
@@ -23,5 +25,7 @@ __all__ = [  # user interface and other dependent packages
     "ImagePlaneCoordinate", "ImagePixelCoordinate",
     "Pose", "PoseTransformer", "EulerAngle", "Quaternion",
     "CoordinateEntity", "Point", "Line", "Box2D", "Box3D", "SamplePath2D",
-    "ColorSpace", "img_transfer"
+    "ColorSpace", "img_transfer",
+    "ImageTransform", "RandomPerspective", "RandomBrightnessContrast",
+    "RandomGaussianBlur", "RandomNoise", "PrintabilityMap", "TransformStack",
 ]
\ No newline at end of file
@@ -2,30 +2,24 @@
 # -- imports ---------------------------------------------------------------------------------------
 # ==================================================================================================
 
-from abc import ABC, abstractmethod
-from adept.transforms import Point, Box2D
+from abc import ABC
+from adept.utils._record import _SlotsRecord
 
 
 # ==================================================================================================
 # -- classes ---------------------------------------------------------------------------------------
 # ==================================================================================================
 
-class Coordinate(ABC):
+class Coordinate(_SlotsRecord, ABC):
     """
     This is the abstract class for Coordination,
     which consists of a pair/tuple/list/map of base elements to locate an entity,
     and so, it has to be iterative
     """
 
-    def __init__(self):
-        pass
+    __slots__ = ()
 
-    @abstractmethod
-    def __getitem__(self, key):
-        pass
-
-    @abstractmethod
-    def tolist(self):
+    def __init__(self):
         pass
 
 
@@ -34,53 +28,28 @@ class Coordinate2D(Coordinate):
     This is the base class for 2-dim(x,y) Coordination
     """
 
+    __slots__ = ("x", "y")
+    _keys = {0: "x", 'x': "x", 'X': "x",
+             1: "y", 'y': "y", 'Y': "y"}
+
     def __init__(self, x=0, y=0):
         super().__init__()
         self.x = x
         self.y = y
 
-    def _is_key_for_x(self, key):
-        return key == 0 or key == 'x' or key == 'X'
-
-    def _is_key_for_y(self, key):
-        return key == 1 or key == 'y' or key == 'Y'
-
-    def __getitem__(self, key):
-        if self._is_key_for_x(key):
-            return self.x
-        elif self._is_key_for_y(key):
-            return self.y
-        else:
-            raise KeyError("The key " + key + " is unsupported")
-
-    def tolist(self):
-        return [self.x, self.y]
-
 
 class Coordinate3D(Coordinate2D):
     """
     This is the base class for 3-dim(x,y,z) Coordination
     """
 
+    __slots__ = ("z",)
+    _keys = {**Coordinate2D._keys, 2: "z", 'z': "z", 'Z': "z"}
+
     def __init__(self, x=0, y=0, z=0):
         super().__init__(x, y)
         self.z = z
 
-    def _is_key_for_z(self, key):
-        return key == 2 or key == 'z' or key == 'Z'
-
-    def __getitem__(self, key):
-        try:
-            return super().__getitem__(key)
-        except KeyError:
-            if self._is_key_for_z(key):
-                return self.z
-            else:
-                raise KeyError("The key " + key + " is unsupported")
-
-    def tolist(self):
-        return super().tolist().append(self.z)
-
 
 class WorldCoordinate(Coordinate3D):
     """
@@ -92,6 +61,8 @@ class WorldCoordinate(Coordinate3D):
         2. if the world coordination belongs to Cartesian Coordinates, then its direction is often right-handed
     """
 
+    __slots__ = ()
+
     def __init__(self, x=0, y=0, z=0):
         super().__init__(x, y, z)
 
@@ -106,6 +77,9 @@ class VehicleCoordinate(Coordinate3D):
         3. the vehicle coordinate can be transformed from world coordination
         through rotation matrix R and translation vector T, and vise versa
     """
+
+    __slots__ = ()
+
     def __init__(self, x=0, y=0, z=0):
         super().__init__(x, y, z)
 
@@ -127,6 +101,8 @@ class CameraCoordinate(Coordinate3D):
         through rotation matrix R, translation vector T, and z-dim reverse, and vise versa
     """
 
+    __slots__ = ()
+
     def __init__(self, x=0, y=0, z=0):
         super().__init__(x, y, z)
 
@@ -148,6 +124,8 @@ class ImagePlaneCoordinate(Coordinate2D):
         through focal scaling F and z-dim normalization,  and vice versa
     """
 
+    __slots__ = ()
+
     def __init__(self, x=0, y=0):
         super().__init__(x, y)
 
@@ -169,6 +147,8 @@ class ImagePixelCoordinate(Coordinate2D):
         through translation vector T, scaling factor S and y-dim reverse
     """
 
+    __slots__ = ()
+
     def __init__(self, x=0, y=0):
         super().__init__(x, y)
 
@@ -183,6 +163,9 @@ class CoordinateTransformer:
     """
     This is the functional class, defining a useful function: transform(fro, to)
     in which it will transform any coordinate 'fro' to any coordinate 'to'
+    note that: the world-to-pixel transform also has a batch mode (batch=True),
+    which projects an (N,3) array of world points for one or more (M) ego poses in one matrix operation
+    and returns the pixel array together with a visibility mask instead of Point entities
     """
 
     def __init__(self):
@@ -190,6 +173,11 @@ class CoordinateTransformer:
 
     def transform(self, entity, fro, to, **kwargs):
         if fro == "world" and to == "pixel":
+            if kwargs.get("batch", False):
+                return self._transform_world2pixel_batch(
+                    entity=entity, state=kwargs["state"],
+                    h=kwargs["image_height"], w=kwargs["image_width"]
+                )
             return self._transform_world2pixel(
                 entity=entity,
                 x=kwargs["state"]["c"]["x"], y=kwargs["state"]["c"]["y"], z=kwargs["state"]["c"]["z"],
@@ -201,57 +189,117 @@ class CoordinateTransformer:
         pass
 
     def _transform_world2pixel(self, entity, x, y, z, pitch, yaw, roll, h, w):
-        import math
-        import numpy as np
-        front_vec, left_vec, up_vec = [1, 0, 0], [0, 1, 0], [0, 0, 1]
-
-        def trans_vector(vector, pitch, yaw, roll):
-            def trans_pitch(x, y, z, pitch):
-                newx = x * math.cos(pitch) - z * math.sin(pitch)
-                newy = y
-                newz = x * math.sin(pitch) + z * math.cos(pitch)
-                return newx, newy, newz
-
-            def trans_yaw(x, y, z, yaw):
-                newx = x * math.cos(yaw) - y * math.sin(yaw)
-                newy = x * math.sin(yaw) + y * math.cos(yaw)
-                newz = z
-                return newx, newy, newz
-
-            def trans_roll(x, y, z, roll):
-                newx = x
-                newy = z * math.sin(roll) + y * math.cos(roll)
-                newz = z * math.cos(roll) - y * math.sin(roll)
-                return newx, newy, newz
-
-            x, y, z = vector[0], vector[1], vector[2]
-            x, y, z = trans_pitch(x, y, z, pitch)
-            x, y, z = trans_yaw(x, y, z, yaw)
-            x, y, z = trans_roll(x, y, z, roll)
-            return [x, y, z]
-
-        pitch, yaw, roll = pitch / 180 * math.pi, yaw / 180 * math.pi, roll / 180 * math.pi
-        front_vec = trans_vector(front_vec, pitch, yaw, roll)
-        left_vec = trans_vector(left_vec, pitch, yaw, roll)
-        up_vec = trans_vector(up_vec, pitch, yaw, roll)
-
-        points = []
-        for point in entity:
-            coord = point["c"]
-            point_vec = [coord["x"]-x, coord["y"]-y, coord["z"]-z]
-
-            tmp_f, tmp_x, tmp_y = np.dot(point_vec, front_vec), \
-                      np.dot(point_vec, left_vec), np.dot(point_vec, up_vec)
-            if tmp_f < 0:
-                return None
-
-            tan_x = tmp_x / tmp_f
-            tan_y = tmp_y / tmp_f
-
-            px = (tan_x * 0.5 * w) + w / 2
-            py = -(tan_y * 0.5 * h) + h / 2
-
-            points.append(Point(Coordinate2D(x=px, y=py)))
+        from ._entity import Point, Box2D
+
+        pixels, visible = self.project_world2pixel(
+            points=self._entity_to_array(entity),
+            poses=[x, y, z, pitch, yaw, roll], h=h, w=w
+        )
+        if not visible.all():  # some point is behind the camera
+            return None
+
+        points = [Point(Coordinate2D(x=px, y=py)) for px, py in pixels[0].tolist()]
 
         if len(points) == 4:  # box
             return Box2D(*points)
+
+    def _transform_world2pixel_batch(self, entity, state, h, w):
+        poses = self._state_to_poses(state)
+        pixels, visible = self.project_world2pixel(
+            points=self._entity_to_array(entity), poses=poses, h=h, w=w
+        )
+        if poses.ndim == 1:  # single pose => drop the pose dimension
+            return pixels[0], visible[0]
+        return pixels, visible
+
+    def project_world2pixel(self, points, poses, h, w):
+        """
+        project world points into the pixel plane of the camera(s) located at the given pose(s)
+        :param points: the world points, array-like with shape (N,3)
+        :param poses: the camera poses [x,y,z,pitch,yaw,roll] (angles in degree), array-like with shape (6,) or (M,6)
+        :param h: the image height
+        :param w: the image width
+        :return: pixels: the pixel coordinates with shape (M,N,2), nan for the invisible points |
+                 visible: the visibility mask with shape (M,N), False for the points behind the camera
+        note that: a point exactly on the camera plane (front == 0) has no finite projection,
+        so it is also marked invisible, while the old per-point transform let it through as inf/nan pixels
+        """
+        import numpy as np
+
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        poses = np.asarray(poses, dtype=np.float64).reshape(-1, 6)
+
+        ## step1: build the rotated basis vectors(front, left, up) of each pose as the columns of R
+        pitch, yaw, roll = np.radians(poses[:, 3:]).T
+        basis = self._rotation_basis(pitch, yaw, roll)  # (M,3,3)
+        ## step2: project the relative vectors onto the basis vectors => (front, left, up) components
+        rel = points[np.newaxis, :, :] - poses[:, np.newaxis, :3]  # (M,N,3)
+        cam = np.matmul(rel, basis)  # (M,N,3)
+        ## step3: perspective division, and the points behind or on the camera plane are marked invisible
+        front = cam[..., 0]
+        visible = front > 0
+        with np.errstate(divide="ignore", invalid="ignore"):
+            tan = cam[..., 1:] / front[..., np.newaxis]
+        ## step4: scale and shift the tangents into the pixel plane
+        pixels = np.empty_like(tan)
+        pixels[..., 0] = (tan[..., 0] * 0.5 * w) + w / 2
+        pixels[..., 1] = -(tan[..., 1] * 0.5 * h) + h / 2
+        pixels[~visible] = np.nan
+
+        return pixels, visible
+
+    @staticmethod
+    def _rotation_basis(pitch, yaw, roll):
+        """
+        the rotation R = R_roll @ R_yaw @ R_pitch (rotate by pitch, then yaw, then roll) for each angle triple,
+        whose columns are the rotated front, left and up vectors
+        """
+        import numpy as np
+
+        cp, sp = np.cos(pitch), np.sin(pitch)
+        cy, sy = np.cos(yaw), np.sin(yaw)
+        cr, sr = np.cos(roll), np.sin(roll)
+        zeros, ones = np.zeros_like(pitch), np.ones_like(pitch)
+
+        r_pitch = np.stack([cp, zeros, -sp,
+                            zeros, ones, zeros,
+                            sp, zeros, cp], axis=-1).reshape(-1, 3, 3)
+        r_yaw = np.stack([cy, -sy, zeros,
+                          sy, cy, zeros,
+                          zeros, zeros, ones], axis=-1).reshape(-1, 3, 3)
+        r_roll = np.stack([ones, zeros, zeros,
+                           zeros, cr, sr,
+                           zeros, -sr, cr], axis=-1).reshape(-1, 3, 3)
+
+        return r_roll @ r_yaw @ r_pitch
+
+    @staticmethod
+    def _entity_to_array(entity):
+        import numpy as np
+
+        if isinstance(entity, np.ndarray):
+            return entity.astype(np.float64, copy=False).reshape(-1, 3)
+
+        coords = [entity[i]["c"] for i in range(len(entity))]
+        return np.array([
+            [c["x"], c["y"], c["z"] if isinstance(c, Coordinate3D) else 0.0] for c in coords
+        ], dtype=np.float64)
+
+    @staticmethod
+    def _state_to_poses(state):
+        """
+        the state can be an array of poses with shape (6,) or (M,6),
+        a list/tuple of vehicle states, or a single vehicle state
+        """
+        import numpy as np
+
+        if isinstance(state, np.ndarray):
+            return state.astype(np.float64, copy=False)
+
+        def to_pose(s):
+            return [s["c"]["x"], s["c"]["y"], s["c"]["z"],
+                    s["p"]["p"], s["p"]["y"], s["p"]["r"]]
+
+        if isinstance(state, (list, tuple)):
+            return np.array([to_pose(s) for s in state], dtype=np.float64)
+        return np.array(to_pose(state), dtype=np.float64)
@@ -2,6 +2,7 @@
 # -- imports ---------------------------------------------------------------------------------------
 # ==================================================================================================
 
+import numbers
 from abc import ABC, abstractmethod
 from ._coordinate import Coordinate, Coordinate2D, Coordinate3D
 from typing import List, Union
@@ -111,6 +112,9 @@ class Box2D(CoordinateEntity):
         else:
             raise KeyError("The key " + key + " is unsupported")
 
+    def __len__(self):
+        return 4
+
 
 class Box3D(CoordinateEntity):
     """
@@ -141,42 +145,192 @@ class Box3D(CoordinateEntity):
 class SamplePath2D(CoordinateEntity):
     """
     This is the class for a sampled path, which needs a list of points in order to describe
+    note that: the points are stored in a (N,2) float array (growing by doubling when appended),
+    so that the nearest point queries can be answered by vectorized distance computation,
+    and the given array(e.g. a strided memory map) or the sliced path is viewed without copying
     """
 
-    def __init__(self, plist: List[Point]):
+    def __init__(self, plist: Union[List[Point], "np.ndarray"] = None):
         super().__init__()
-        self.plist = plist
+        import numpy as np
+
+        if plist is None or len(plist) == 0:
+            points = np.empty((0, 2), dtype=np.float64)
+        elif isinstance(plist, np.ndarray):
+            points = np.asarray(plist, dtype=np.float64)
+            points = points[:, :2] if points.ndim == 2 else points.reshape(-1, 2)
+        else:
+            points = np.array([[p["c"]["x"], p["c"]["y"]] for p in plist], dtype=np.float64)
+
+        self._buffer = points  # the underlying array, whose capacity may exceed the size
+        self._size = len(points)
+
+    @property
+    def points(self):
+        return self._buffer[:self._size]
+
+    @property
+    def plist(self):
+        """
+        the read-only tuple of the points, which are built as new Points on each access,
+        so modify the path by append/extend or the points array instead
+        """
+        return tuple(self._make_point(i) for i in range(self._size))
+
+    def _make_point(self, idx):
+        px, py = self._buffer[idx].tolist()
+        return Point(Coordinate2D(px, py))
+
+    def _reserve(self, capacity):
+        if capacity <= len(self._buffer):
+            return
+        import numpy as np
+        buffer = np.empty((max(capacity, 2 * len(self._buffer), 16), 2), dtype=np.float64)
+        buffer[:self._size] = self._buffer[:self._size]
+        self._buffer = buffer
 
     def append(self, p: Union[Point, list, tuple]):
+        self._reserve(self._size + 1)
         if isinstance(p, Point):
-            self.plist.append(p)
+            self._buffer[self._size] = (p["c"]["x"], p["c"]["y"])
+        else:
+            self._buffer[self._size] = p[:2]
+        self._size += 1
+
+    def extend(self, points):
+        import numpy as np
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        if len(points) == 0:  # the viewed array may be read-only
+            return
+        self._reserve(self._size + len(points))
+        self._buffer[self._size:self._size + len(points)] = points
+        self._size += len(points)
+
+    def get_nearest_point(self, x, y, away_from=0, start=None, window=256):
+        """
+        get the nearest point to (x,y) among the points whose distance is not less than away_from
+        :param start: if None, search the whole path at once,
+        otherwise search forward from the start index (monotone cursor) chunk by chunk,
+        and stop at the first chunk containing any qualified point
+        :param window: the chunk size of the forward search
+        :return: the nearest point and its index in the path (idx = -1 if no qualified point)
+        """
+        import numpy as np
+
+        if start is None:
+            start, window = 0, self._size
+        window = max(int(window), 1)
+
+        for lo in range(max(start, 0), self._size, window):
+            chunk = self._buffer[lo:min(lo + window, self._size)]
+            d = np.hypot(chunk[:, 0] - x, chunk[:, 1] - y)
+            d[d < away_from] = np.inf
+            i = int(np.argmin(d))
+            if np.isfinite(d[i]):
+                return self._make_point(lo + i), lo + i
+
+        return Point(Coordinate2D(0, 0)), -1
+
+    def _get_segments(self):
+        """
+        :return: the starts(M,2), directions(M,2) and squared lengths(M,) of the non-degenerate segments,
+        and their indices(M,) among all the segments
+        """
+        import numpy as np
+
+        path = self.points if self._size > 1 else np.repeat(self.points, 2, axis=0)  # one point as a segment
+        start, direction = path[:-1], np.diff(path, axis=0)
+        length2 = np.einsum("ij,ij->i", direction, direction)
+        keep = np.flatnonzero(length2 > 0)  # skip the degenerate segments between the duplicated points
+        if len(keep) == 0:  # all the points are the same, so project onto the first one
+            return start[:1], direction[:1], np.full(1, np.inf), np.zeros(1, dtype=np.int64)
+        return start[keep], direction[keep], length2[keep], keep
+
+    @staticmethod
+    def _project_onto(points, start, direction, length2):
+        """
+        project the points(n,2) onto all the given segments(m,2) at once
+        :return: the signed offset(n,), the nearest segment(n,) among the given ones and t(n,)
+        """
+        import numpy as np
+
+        q = points[:, None, :] - start  # (n,m,2)
+        t = np.clip(np.einsum("nmj,mj->nm", q, direction) / length2, 0.0, 1.0)
+        r = q - t[..., None] * direction  # from the projection to the point
+        i = np.argmin(np.einsum("nmj,nmj->nm", r, r), axis=1)
+
+        rows = np.arange(len(i))
+        ri, di = r[rows, i], direction[i]
+        sign = np.where(di[:, 0] * ri[:, 1] - di[:, 1] * ri[:, 0] < 0, -1.0, 1.0)
+        return sign * np.hypot(ri[:, 0], ri[:, 1]), i, t[rows, i]
+
+    def project(self, points, window=256, start=None, chunk=1024):
+        """
+        project the points onto the path as a polyline
+        :param points: the points to project, array-like with shape (N,2)
+        :param window: if not None, the points are taken as a sequence along the path(e.g. a trajectory),
+        and each point is projected onto the segments within the window around the last nearest segment
+        (monotone cursor, see get_nearest_point), so the cost is N * window instead of N * len(path),
+        otherwise each point is projected onto all the segments, chunk by chunk
+        :param start: the segment index to start the cursor from, if None, the first point is projected
+        onto all the segments to locate the cursor
+        :param chunk: the number of points projected onto all the segments at once(window=None),
+        which bounds the memory to chunk * len(path)
+        :return: offset: the signed distance(N,) to the nearest segment, positive on the left of the path
+                 in a right-handed frame(i.e. on the right of the path in a left-handed frame like CARLA) |
+                 segment: the index(N,) of the nearest segment, i.e. the one from point i to point i+1 |
+                 t: the position(N,) of the projection along the nearest segment in [0,1]
+        """
+        import numpy as np
+
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        seg_start, direction, length2, keep = self._get_segments()
+        n, m = len(points), len(keep)
+        offset, segment, t = np.empty(n), np.empty(n, dtype=np.int64), np.empty(n)
+
+        if window is None:
+            chunk = max(int(chunk), 1)
+            for lo in range(0, n, chunk):
+                offset[lo:lo + chunk], i, t[lo:lo + chunk] = \
+                    self._project_onto(points[lo:lo + chunk], seg_start, direction, length2)
+                segment[lo:lo + chunk] = keep[i]
+            return offset, segment, t
+
+        ## step1: locate the cursor by the first point, among the kept segments
+        window = max(int(window), 1)
+        if n == 0:
+            return offset, segment, t
+        if start is None:
+            cursor = int(self._project_onto(points[:1], seg_start, direction, length2)[1][0])
         else:
-            self.plist.append(Point(Coordinate2D(*p)))
+            cursor = min(int(np.searchsorted(keep, start)), m - 1)
 
-    def get_nearest_point(self, x, y, away_from=0):
-        nd, npx, npy, idx = float('inf'), 0, 0, -1
-        for i, p in enumerate(self.plist):
-            d = p.distance_from(x, y)
-            if away_from <= d < nd:
-                nd, npx, npy, idx = d, p["c"]["x"], p["c"]["y"], i
+        ## step2: move the cursor along the path, searching the window around it for each point
+        for k in range(n):
+            lo, hi = max(cursor - window, 0), min(cursor + window + 1, m)
+            o, i, tt = self._project_onto(points[k:k + 1], seg_start[lo:hi], direction[lo:hi], length2[lo:hi])
+            cursor = lo + int(i[0])
+            offset[k], segment[k], t[k] = o[0], keep[cursor], tt[0]
 
-        return Point(Coordinate2D(npx, npy)), idx
+        return offset, segment, t
 
     def _is_key_for_start(self, key):
         return key == 0 or key == 'begin' or key == 'start'
 
     def _is_key_for_end(self, key):
-        return key == len(self.plist) - 1 or key == -1 or key == 'end' or key == 'last'
+        return key == self._size - 1 or key == -1 or key == 'end' or key == 'last'
 
     def __getitem__(self, key):
-        if self._is_key_for_start(key):
-            return self.plist[0]
+        if isinstance(key, slice):
+            return SamplePath2D(self.points[key])
+        elif self._is_key_for_start(key):
+            return self._make_point(0)
         elif self._is_key_for_end(key):
-            return self.plist[-1]
-        elif 1 <= key < len(self.plist):
-            return self.plist[key]
+            return self._make_point(self._size - 1)
+        elif isinstance(key, numbers.Integral) and -self._size <= key < self._size:
+            return self._make_point(int(key) % self._size)
         else:
-            raise KeyError("The key " + key + " is unsupported")
+            raise KeyError("The key " + str(key) + " is unsupported")
 
     def __len__(self):
-        return len(self.plist)
+        return self._size
@@ -0,0 +1,220 @@
+# ==================================================================================================
+# -- imports ---------------------------------------------------------------------------------------
+# ==================================================================================================
+
+from abc import ABC, abstractmethod
+
+
+# ==================================================================================================
+# -- classes ---------------------------------------------------------------------------------------
+# ==================================================================================================
+
+class ImageTransform(ABC):
+    """
+    This is the abstract class for differentiable image transform in torch,
+    which simulates one physical-to-digital(camera capture) or digital-to-physical(print) effect
+    note that:
+        1. the images are the float tensors in [0,1] with shape (N,C,H,W),
+        and each of the N images gets its own randomly sampled transform parameters
+        2. the transform is differentiable w.r.t. the images, so the perturbation can be optimized
+        through the expectation over the sampled transforms(EOT) in one tensor pass
+    """
+
+    def __init__(self):
+        pass
+
+    @abstractmethod
+    def __call__(self, images, generator=None):
+        pass
+
+    @staticmethod
+    def _uniform(n, low, high, images, generator=None):
+        import torch
+        return (torch.rand(n, generator=generator) * (high - low) + low).to(images)
+
+
+class RandomPerspective(ImageTransform):
+    """
+    This is the class for random perspective warp, which simulates the camera viewing the target
+    from different poses, by moving each corner of the image randomly within {distortion} of the image size
+    """
+
+    def __init__(self, distortion=0.1, padding_mode="border"):
+        super().__init__()
+        self.distortion = distortion
+        self.padding_mode = padding_mode
+
+    def __call__(self, images, generator=None):
+        import torch
+        import torch.nn.functional as F
+        n, _, h, w = images.shape
+
+        ## step1: sample the moved corners in the normalized coordinate [-1,1]
+        src = images.new_tensor([[-1., -1.], [1., -1.], [1., 1.], [-1., 1.]]).expand(n, 4, 2)
+        dst = src + (torch.rand(n, 4, 2, generator=generator).to(images) * 2 - 1) * 2 * self.distortion
+
+        ## step2: solve the homography mapping the output corners(dst) to the input corners(src)
+        homography = self._solve_homography(dst, src)  # (N,3,3)
+
+        ## step3: sample the input images with the warped grid
+        ys, xs = torch.meshgrid(torch.linspace(-1, 1, h).to(images),
+                                torch.linspace(-1, 1, w).to(images), indexing="ij")
+        base = torch.stack([xs, ys, torch.ones_like(xs)], dim=-1).reshape(1, h * w, 3)
+        warped = base @ homography.transpose(1, 2)  # (N,H*W,3)
+        grid = (warped[..., :2] / warped[..., 2:]).reshape(n, h, w, 2)
+
+        return F.grid_sample(images, grid, mode="bilinear",
+                             padding_mode=self.padding_mode, align_corners=True)
+
+    @staticmethod
+    def _solve_homography(fro, to):
+        import torch
+        x, y = fro[..., 0], fro[..., 1]
+        u, v = to[..., 0], to[..., 1]
+        zeros, ones = torch.zeros_like(x), torch.ones_like(x)
+
+        a = torch.cat([
+            torch.stack([x, y, ones, zeros, zeros, zeros, -u * x, -u * y], dim=-1),
+            torch.stack([zeros, zeros, zeros, x, y, ones, -v * x, -v * y], dim=-1)
+        ], dim=1)  # (N,8,8)
+        b = torch.cat([u, v], dim=1)  # (N,8)
+
+        h = torch.linalg.solve(a, b)
+        return torch.cat([h, torch.ones_like(h[:, :1])], dim=1).reshape(-1, 3, 3)
+
+
+class RandomBrightnessContrast(ImageTransform):
+    """
+    This is the class for random brightness and contrast change, which simulates the lighting and exposure,
+    i.e. image = (image - mean) * contrast + mean + brightness
+    """
+
+    def __init__(self, brightness=0.1, contrast=0.1):
+        super().__init__()
+        self.brightness = brightness
+        self.contrast = contrast
+
+    def __call__(self, images, generator=None):
+        n = images.shape[0]
+        brightness = self._uniform(n, -self.brightness, self.brightness, images, generator)
+        contrast = self._uniform(n, 1 - self.contrast, 1 + self.contrast, images, generator)
+
+        mean = images.mean(dim=(1, 2, 3), keepdim=True)
+        return (images - mean) * contrast.view(n, 1, 1, 1) + mean + brightness.view(n, 1, 1, 1)
+
+
+class RandomGaussianBlur(ImageTransform):
+    """
+    This is the class for random gaussian blur, which simulates the defocus and the motion of the camera,
+    with the sigma(in pixels) sampled in [min_sigma, max_sigma] and applied as a separable convolution
+    """
+
+    def __init__(self, min_sigma=0.1, max_sigma=1.0):
+        super().__init__()
+        self.min_sigma = min_sigma
+        self.max_sigma = max_sigma
+
+    def __call__(self, images, generator=None):
+        import math
+        import torch
+        import torch.nn.functional as F
+        n, c, h, w = images.shape
+
+        ## step1: build one normalized 1-dim gaussian kernel for each image
+        radius = max(int(math.ceil(3 * self.max_sigma)), 1)
+        sigma = self._uniform(n, self.min_sigma, self.max_sigma, images, generator).clamp_min(1e-3)
+        offsets = torch.arange(-radius, radius + 1).to(images)
+        kernel = torch.exp(-offsets.view(1, -1) ** 2 / (2 * sigma.view(-1, 1) ** 2))
+        kernel = (kernel / kernel.sum(dim=1, keepdim=True)).repeat_interleave(c, dim=0)  # (N*C,K)
+
+        ## step2: convolve all the channels of all the images at once as groups
+        x = F.pad(images.reshape(1, n * c, h, w), (radius, radius, radius, radius), mode="replicate")
+        x = F.conv2d(x, kernel.view(n * c, 1, 1, -1), groups=n * c)
+        x = F.conv2d(x, kernel.view(n * c, 1, -1, 1), groups=n * c)
+
+        return x.reshape(n, c, h, w)
+
+
+class RandomNoise(ImageTransform):
+    """
+    This is the class for random gaussian noise, which simulates the sensor noise of the camera
+    """
+
+    def __init__(self, std=0.02):
+        super().__init__()
+        self.std = std
+
+    def __call__(self, images, generator=None):
+        import torch
+        return images + torch.randn(images.shape, generator=generator).to(images) * self.std
+
+
+class PrintabilityMap(ImageTransform):
+    """
+    This is the class for printability color map, which simulates the printer
+    by softly mapping each pixel to the printable colors in the palette(P,3),
+    with the weights softmax(-distance^2 / temperature), so it tends to the nearest color as temperature -> 0
+
+    paper cite: Sharif, Mahmood, et al. Accessorize to a crime: Real and stealthy attacks on
+    state-of-the-art face recognition. Proceedings of the 2016 ACM SIGSAC Conference on Computer
+    and Communications Security, 2016.
+
+    paper link: https://dl.acm.org/doi/10.1145/2976749.2978392
+    """
+
+    def __init__(self, palette, temperature=0.01):
+        super().__init__()
+        self.palette = palette  # printable colors in [0,1], with the same channel order as the images
+        self.temperature = temperature
+
+    def _distance(self, images):
+        import torch
+        palette = torch.as_tensor(self.palette).to(images)  # (P,C)
+        pixels = images.permute(0, 2, 3, 1).unsqueeze(-2)  # (N,H,W,1,C)
+        return ((pixels - palette) ** 2).sum(dim=-1), palette  # (N,H,W,P)
+
+    def __call__(self, images, generator=None):
+        distance, palette = self._distance(images)
+        weights = (-distance / self.temperature).softmax(dim=-1)
+        return (weights @ palette).permute(0, 3, 1, 2)
+
+    def score(self, images):
+        """
+        the non-printability score(NPS) of each image, i.e. the sum over pixels of
+        the product of the distances to all the printable colors, which can be added into the attack loss
+        """
+        distance, _ = self._distance(images)
+        return distance.sqrt().prod(dim=-1).flatten(1).sum(dim=1)
+
+
+class TransformStack:
+    """
+    This is the class for a stack of image transforms applied in order,
+    such as the print transforms(for phys_replace) followed by the camera transforms(for sensor_capture),
+    which evaluates {n} sampled transformations of each image in one tensor pass
+    note that: the images are (B,H,W,C) if channels_last else (B,C,H,W),
+    and the output is (n*B, ...) in the same layout, with the row = i * B + b
+    """
+
+    def __init__(self, transforms, channels_last=True, seed=None):
+        self.transforms = transforms
+        self.channels_last = channels_last
+        self.generator = None
+        if seed is not None:
+            import torch
+            self.generator = torch.Generator().manual_seed(seed)
+
+    def __call__(self, images, n=1):
+        ## step1: repeat the images for the n samples in the channels-first layout
+        x = images.permute(0, 3, 1, 2) if self.channels_last else images
+        x = x.repeat(n, 1, 1, 1)
+
+        ## step2: apply the transforms in order, keeping the images in the valid range
+        for transform in self.transforms:
+            x = transform(x, generator=self.generator)
+        x = x.clamp(0.0, 1.0)
+
+        return x.permute(0, 2, 3, 1) if self.channels_last else x
+
+    def __len__(self):
+        return len(self.transforms)
@@ -3,6 +3,7 @@
 # ==================================================================================================
 
 from abc import ABC, abstractmethod
+from adept.utils._record import _SlotsRecord
 
 
 # ==================================================================================================
@@ -17,6 +18,8 @@ class Pose(ABC):
     and so, it has to be iterative
     """
 
+    __slots__ = ()
+
     def __init__(self):
         pass
 
@@ -25,7 +28,7 @@ class Pose(ABC):
         pass
 
 
-class EulerAngle(Pose):
+class EulerAngle(_SlotsRecord, Pose):
     """
     This the class for Euler Angle
     which consists of three dimensions: pitch, roll, yaw and describes an entity(rigid body)'s pose by three rotates
@@ -35,31 +38,17 @@ class EulerAngle(Pose):
         3. the yaw is to describe the rotation on the z-axis
     """
 
+    __slots__ = ("pitch", "roll", "yaw")
+    _keys = {0: "pitch", 'pitch': "pitch", 'p': "pitch", 'P': "pitch",
+             1: "roll", 'roll': "roll", 'r': "roll", 'R': "roll",
+             2: "yaw", 'yaw': "yaw", 'y': "yaw", 'Y': "yaw"}
+
     def __init__(self, pitch=0.0, roll=0.0, yaw=0.0):
         super().__init__()
         self.pitch = pitch
         self.roll = roll
         self.yaw = yaw
 
-    def _is_key_for_pitch(self, key):
-        return key == 0 or key == 'pitch' or key == 'p' or key == 'P'
-
-    def _is_key_for_roll(self, key):
-        return key == 1 or key == 'roll' or key == 'r' or key == 'R'
-
-    def _is_key_for_yaw(self, key):
-        return key == 2 or key == 'yaw' or key == 'y' or key == 'Y'
-
-    def __getitem__(self, key):
-        if self._is_key_for_pitch(key):
-            return self.pitch
-        elif self._is_key_for_roll(key):
-            return self.roll
-        elif self._is_key_for_yaw(key):
-            return self.yaw
-        else:
-            raise KeyError("The key " + key + " is unsupported")
-
 
 class Quaternion(Pose):
     """
@@ -72,6 +61,8 @@ class Quaternion(Pose):
         3. q1q2 = (w1w2 - v1v2) + w1v2 + w2v1 + v1xv2, which represents rotate by q2 and then by q1
     """
 
+    __slots__ = ("w", "v")
+
     def __init__(self, w=0.0, x=0.0, y=0.0, z=0.0):
         super().__init__()
         self.w = w  # real part
@@ -2,11 +2,15 @@
 the utils package contains some helpful auxiliary functions
 """
 
+# ==================================================================================================
+# -- imports ---------------------------------------------------------------------------------------
+# ==================================================================================================
+from ._latency import LatencyCounter
 
 # ==================================================================================================
 # -- all -------------------------------------------------------------------------------------------
 # ==================================================================================================
 
 __all__ = [  # user interface and other dependent packages
-
+    "LatencyCounter",
 ]
\ No newline at end of file
@@ -0,0 +1,47 @@
+# ==================================================================================================
+# -- imports ---------------------------------------------------------------------------------------
+# ==================================================================================================
+
+import collections
+import threading
+
+
+# ==================================================================================================
+# -- classes ---------------------------------------------------------------------------------------
+# ==================================================================================================
+
+class LatencyCounter:
+    """
+    This is the class for counting the latency(s) of one stage,
+    which keeps the total count and the recent {window} latencies for percentiles
+    """
+
+    def __init__(self, window=1000):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.recent = collections.deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def add(self, latency):
+        with self._lock:
+            self.count += 1
+            self.total += latency
+            self.max = max(self.max, latency)
+            self.recent.append(latency)
+
+    def percentile(self, q):
+        with self._lock:
+            recent = sorted(self.recent)
+        if not recent:
+            return 0.0
+        return recent[min(int(q / 100 * len(recent)), len(recent) - 1)]
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "mean_ms": 1000 * self.total / self.count if self.count else 0.0,
+            "p50_ms": 1000 * self.percentile(50),
+            "p95_ms": 1000 * self.percentile(95),
+            "max_ms": 1000 * self.max,
+        }
@@ -0,0 +1,75 @@
+# ==================================================================================================
+# -- classes ---------------------------------------------------------------------------------------
+# ==================================================================================================
+
+class _SlotsRecord:
+    """
+    This is the mixin class for the __slots__ records(e.g. coordinates, euler angles, vectors, control inputs,
+    vehicle states), whose keys are dispatched by one dict lookup(_keys),
+    and a sequence of them can be stored as one structured numpy array with the dtype of get_dtype()
+    note that:
+        1. the fields are the __slots__ of the class and its bases in the definition order,
+        and the constructor has to take them as positional arguments in the same order
+        2. each field of the dtype is titled by its first one-character key(if it differs from the field name),
+        e.g. ("p", "pitch"), so the structured array can also be indexed by the short keys
+        3. the fields in _types are nested records of the given record classes, and the others are float64
+    """
+
+    __slots__ = ()
+    _keys = {}  # {key: field name}
+    _types = {}  # {field name: record class} for the nested fields
+    _fields = ()  # the field names in order, collected from __slots__
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        fields = []
+        for klass in reversed(cls.__mro__):
+            slots = klass.__dict__.get("__slots__", ())
+            slots = (slots,) if isinstance(slots, str) else slots
+            fields.extend(slot for slot in slots if not slot.startswith("__") and slot not in fields)
+        cls._fields = tuple(fields)
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, self._keys[key])
+        except (KeyError, TypeError):
+            raise KeyError("The key " + str(key) + " is unsupported")
+
+    def __setitem__(self, key, value):
+        try:
+            setattr(self, self._keys[key], value)
+        except (KeyError, TypeError):
+            raise KeyError("The key " + str(key) + " is unsupported")
+
+    def tolist(self):
+        return list(self.astuple())
+
+    def astuple(self):
+        return tuple(getattr(self, field).astuple() if field in self._types else getattr(self, field)
+                     for field in self._fields)
+
+    @classmethod
+    def _get_title(cls, field):
+        for key, name in cls._keys.items():
+            if name == field and isinstance(key, str) and len(key) == 1:
+                return key if key != field else None
+        return None
+
+    @classmethod
+    def get_dtype(cls):
+        import numpy as np
+
+        descr = []
+        for field in cls._fields:
+            title = cls._get_title(field)
+            dtype = cls._types[field].get_dtype() if field in cls._types else np.float64
+            descr.append(((title, field) if title is not None else field, dtype))
+        return np.dtype(descr)
+
+    @classmethod
+    def from_record(cls, record):
+        """
+        build the record from a row of the structured array, or any sequence in the field order
+        """
+        return cls(*(cls._types[field].from_record(value) if field in cls._types else float(value)
+                     for field, value in zip(cls._fields, record)))
@@ -9,9 +9,11 @@ such as geometry, architecture, kinematics, dynamics, control, etc
 
 from ._vehicle import Vehicle, VehicleState, BaseVehicleState, SimpleDynamicsVehicleState, \
     load_vehicle_model, End2EndVehicle
-from ._plan import Planner, ReferencePlanner
-from ._control import Controller, ControlInput, PurePursuitController
-from ._dynamics import Vector, Vector2D, Vector3D
+from ._plan import Planner, ReferencePlanner, load_ref_path
+from ._control import Controller, ControlInput, PurePursuitController, ILQRController
+from ._dynamics import Vector, Vector2D, Vector3D, BicycleModel
+from ._trajectory import Trajectory
+from ._inference import InferenceEngine
 
 
 # ==================================================================================================
@@ -21,7 +23,9 @@ from ._dynamics import Vector, Vector2D, Vector3D
 __all__ = [  # user interface and other dependent packages
     "Vehicle", "VehicleState", "SimpleDynamicsVehicleState",
     "load_vehicle_model", "End2EndVehicle",
-    "Planner", "ReferencePlanner",
-    "Controller", "ControlInput", "PurePursuitController",
-    "Vector", "Vector2D", "Vector3D"
+    "Planner", "ReferencePlanner", "load_ref_path",
+    "Controller", "ControlInput", "PurePursuitController", "ILQRController",
+    "Vector", "Vector2D", "Vector3D", "BicycleModel",
+    "Trajectory",
+    "InferenceEngine",
 ]
\ No newline at end of file
@@ -2,7 +2,9 @@
 # -- imports ---------------------------------------------------------------------------------------
 # ==================================================================================================
 
+import numbers
 from abc import ABC, abstractmethod
+from adept.utils._record import _SlotsRecord
 
 
 # ==================================================================================================
@@ -43,7 +45,7 @@ class PurePursuitController(Controller):
     paper link: https://apps.dtic.mil/sti/pdfs/ADA255524.pdf
     """
 
-    def __init__(self, vehicle, planner, ld=2.6, lf_gain=0.0, ):
+    def __init__(self, vehicle, planner, ld=2.6, lf_gain=0.0, window=256):
         super().__init__()
 
         ## hold the vehicle and the planner
@@ -53,6 +55,7 @@ class PurePursuitController(Controller):
         ## init some control hyper-parameters
         self.ld = ld  # lookahead distance
         self.lf_gain = lf_gain  # look forward gain
+        self.window = window  # chunk size of the forward search for the key point
 
         ## the start idx of the key point in the reference path
         self.start = 0
@@ -63,66 +66,368 @@ class PurePursuitController(Controller):
     def path_following(self):
         ## step0: get the necessary state(x,y,yaw,v) components of the vehicle
         state = self.vehicle.get_state()
-        x, y, yaw, v = state['coord']['x'], state['coord']['y'], state['pose']['yaw'], state['v']
-        ## step1: calculate the look-forward distance
-        ## considering lookahead distance and velocity
+        velocity = state['v']
+        x, y, yaw = state['coord']['x'], state['coord']['y'], state['pose']['yaw']
+        v = (velocity['x'] ** 2 + velocity['y'] ** 2) ** 0.5
+        ## step1: follow the path as a batch of one state, going forward from the last key point
+        controls, idx = self.path_following_batch(
+            [[x, y, yaw, v]], starts=None if self.start == 0 else [self.start]
+        )
+        self.start = int(idx[0])
+
+        return self.get_control_from(float(controls["s"][0]), v)
+
+    def path_following_batch(self, states, starts=None, wheel_base=None):
+        """
+        compute the pure pursuit control inputs for N vehicles, or N hypothetical states of one vehicle, at once
+        :param states: the (N,4) array of [x, y, yaw(degree), speed], the structured array of
+        SimpleDynamicsVehicleState dtype, or the Trajectory
+        :param starts: the (N,) start indices of the forward search for the key points(monotone cursors),
+        None to start from the nearest point to each state
+        :param wheel_base: the scalar or (N,) wheel bases, None for the vehicle's config
+        :return: controls: the (N,) structured array of ControlInput dtype, whose throttles follow
+                 the same rule(get_throttle) as get_control_from |
+                 idx: the (N,) indices of the key points, which can be the starts of the next call
+        """
+        import numpy as np
+
+        ## step0: get the necessary state(x,y,yaw,v) components of the vehicles
+        x, y, yaw, v = self._states_to_columns(states)
+        path = self.planner.get_target_path().points
+        n, m = len(x), len(path)
+        if wheel_base is None:
+            wheel_base = self.vehicle.get_config("wheel_base")
+
+        ## step1: calculate the look-forward distances
         lf = self.lf_gain * v + self.ld
-        ## step2: find the target key point(x_ref, y_ref) in the reference path
-        if self.start == 0:  # init start point
-            ref_path = self.planner.get_target_path_from(self.start)
-            p, self.start = ref_path.get_nearest_point(x, y)
-        ref_path = self.planner.get_target_path_from(self.start)
-        p, self.start = ref_path.get_nearest_point(x, y, away_from=lf)
-        xr, yr = p["c"]["x"], p["c"]["y"]
-        ## step3: calculate the look-forward angle alpha
-        from math import atan2, sin
-        alpha = atan2(yr - y, xr - x) - yaw
-        ## step4: calculate the target steering angle theta
-        wheel_base = self.vehicle.get_config("wheel_base")
-        theta = atan2(2 * wheel_base * sin(alpha), lf)
-
-        return self.get_control_from(steer=theta, velocity=v)
+
+        ## step2: find the target key points in the reference path
+        ## by searching forward from the starts window by window, only for the vehicles not found yet
+        if starts is None:
+            starts = self._nearest_indices(path, x, y)
+        lo = np.asarray(starts, dtype=np.int64).copy()
+        idx = np.full(n, -1, dtype=np.int64)
+        pending = np.flatnonzero(lo < m)
+        offsets = np.arange(max(int(self.window), 1))
+        while len(pending) > 0:
+            window = lo[pending, None] + offsets  # (n,W)
+            valid = window < m
+            window = np.minimum(window, m - 1)
+            d = np.hypot(path[window, 0] - x[pending, None], path[window, 1] - y[pending, None])
+            d[~valid | (d < lf[pending, None])] = np.inf
+            j = np.argmin(d, axis=1)
+            found = np.isfinite(d[np.arange(len(pending)), j])
+            idx[pending[found]] = window[found, j[found]]
+
+            lo[pending] += len(offsets)
+            pending = pending[~found]
+            pending = pending[lo[pending] < m]
+        idx[idx < 0] = m - 1  # no key point ahead beyond the look-forward distance, keep heading to the last one
+
+        ## step3: calculate the look-forward angles alpha
+        alpha = np.arctan2(path[idx, 1] - y, path[idx, 0] - x) - np.radians(yaw)
+        ## step4: calculate the target steering angles theta
+        theta = np.arctan2(2 * wheel_base * np.sin(alpha), lf)
+
+        controls = np.empty(n, dtype=ControlInput.get_dtype())
+        controls["s"] = np.clip(theta, -1.0, 1.0)
+        controls["t"] = self.get_throttle(v)
+        controls["b"] = 0.0
+        return controls, idx
+
+    @staticmethod
+    def _states_to_columns(states):
+        import numpy as np
+
+        if hasattr(states, "speed"):  # Trajectory
+            return states.x, states.y, states.yaw, states.speed()
+        states = np.asarray(states)
+        if states.dtype.names is not None:  # SimpleDynamicsVehicleState dtype
+            return states["c"]["x"], states["c"]["y"], states["p"]["y"], \
+                   np.hypot(states["v"]["x"], states["v"]["y"])
+        states = states.astype(np.float64, copy=False).reshape(-1, 4)
+        return states[:, 0], states[:, 1], states[:, 2], states[:, 3]
+
+    @staticmethod
+    def _nearest_indices(path, x, y, chunk=1024):
+        import numpy as np
+
+        nearest = np.empty(len(x), dtype=np.int64)
+        for lo in range(0, len(x), chunk):  # bound the memory to chunk * len(path)
+            d = np.hypot(path[:, 0] - x[lo:lo + chunk, None], path[:, 1] - y[lo:lo + chunk, None])
+            nearest[lo:lo + chunk] = np.argmin(d, axis=1)
+        return nearest
 
     def trajectory_following(self):
         pass
 
     def get_control_from(self, steer, velocity):
-        throttle = 0.0
+        throttle = self.get_throttle(velocity)
         brake = 0.0
-        if velocity < 1.0:
-            throttle = 0.3
-        else:
-            throttle = 0.2
 
         return ControlInput(steer, throttle, brake)
 
+    @staticmethod
+    def get_throttle(velocity):
+        """
+        the throttle rule keeping a low speed, for one speed or an array of speeds
+        """
+        import numpy as np
+        throttle = np.where(np.less(velocity, 1.0), 0.3, 0.2)
+        return throttle if throttle.ndim else float(throttle)
+
 
-class ControlInput:
+class ILQRController(Controller):
     """
-    This is the record class to describe the control input
+    This is the class for model-predictive controller, which tracks the reference trajectory
+    by solving the optimal control over a short horizon with iterative LQR(iLQR) on the kinematic bicycle model
+    at every tick, and applying only the first control of the solution, i.e.
+        state: [x, y, yaw, v], control: [delta(steering angle), a(acceleration)]
+        cost: sum_t (x_t - r_t)^T Q (x_t - r_t) + u_t^T R u_t + (x_H - r_H)^T Qf (x_H - r_H)
+    note that:
+        1. the reference trajectory is sampled from the planner's path ahead of the vehicle at the target speed,
+        which is lowered at the curves to keep the lateral acceleration below max_lateral_accel
+        2. the solver is warm-started from the previous solution shifted by one step,
+        and stops when converged, after max_iter iterations, or when the next iteration would exceed the budget(s),
+        so the compute per tick is bounded (the default budget is within one step_length of 0.05s)
+        3. the solve time of each tick is reported by self.latency and stats()
+
+    paper cite: Li, Weiwei, and Emanuel Todorov. Iterative linear quadratic regulator design for
+    nonlinear biological movement systems. ICINCO, 2004.
+
+    paper link: https://homes.cs.washington.edu/~todorov/papers/LiICINCO04.pdf
     """
 
-    def __init__(self, steer=0.0, throttle=0.0, brake=0.0):
+    def __init__(self, vehicle, planner, target_speed=5.0, horizon=20, dt=0.05,
+                 max_steer=70.0, max_accel=4.0, max_decel=8.0, max_lateral_accel=3.0,
+                 budget=0.03, max_iter=10, tolerance=1e-4, window=256, resolution=0.5,
+                 q=(1.0, 1.0, 0.5, 0.1), r=(0.1, 0.01), qf=(2.0, 2.0, 1.0, 0.1), wheel_base=None):
+        super().__init__()
+        import numpy as np
+        from adept.utils import LatencyCounter
+
+        ## hold the vehicle and the planner
+        self.vehicle = vehicle
+        self.planner = planner
+
+        ## init the model and the limits
+        self.target_speed = target_speed  # the speed(m/s) on the straight path
+        self.horizon = horizon  # the number of steps predicted
+        self.dt = dt  # the time(s) of one step
+        self.max_steer = max_steer  # steering angle (degree) when steer = 1.0
+        self.max_accel = max_accel  # acceleration (m/s^2) when throttle = 1.0
+        self.max_decel = max_decel  # deceleration (m/s^2) when brake = 1.0
+        self.max_lateral_accel = max_lateral_accel
+        self.wheel_base = wheel_base if wheel_base is not None else vehicle.get_config("wheel_base")
+        if self.wheel_base is None:
+            raise ValueError("The wheel base is missing in the vehicle's config, please give it by wheel_base")
+
+        ## init the solver
+        self.budget = budget
+        self.max_iter = max_iter
+        self.tolerance = tolerance  # the relative cost reduction to stop
+        self.window = window  # chunk size of the forward search for the nearest point
+        self.resolution = resolution  # the spacing(m) of the resampled reference path
+        self.Q, self.R, self.Qf = np.diag(q), np.diag(r), np.diag(qf)
+
+        self.start = 0  # the start idx of the nearest point in the reference path
+        self._u = np.zeros((horizon, 2))  # the previous solution for warm start
+        self._arc = None  # (path, arc length, resampled arc length, resampled points, heading) of the path
+
+        ## init the report
+        self.latency = LatencyCounter()
+        self.iterations = 0
+        self.cost = None
+
+    def path_following(self):
+        return self.trajectory_following()
+
+    def trajectory_following(self, reference=None):
+        """
+        :param reference: the (horizon+1,4) reference trajectory of [x, y, yaw(degree), v],
+        None to sample it from the planner's path
+        """
+        import time
         import numpy as np
-        self.steer = np.clip(steer, -1.0, 1.0)
-        self.throttle = np.clip(throttle, 0.0, 1.0)
-        self.brake = np.clip(brake, 0.0, 1.0)
-
-    def _is_key_for_steer(self, key):
-        return key == 0 or key == 's' or key == 'steer' or key == 'angle' or key == 'theta'
-
-    def _is_key_for_throttle(self, key):
-        return key == 1 or key == 't' or key == 'throttle'
-
-    def _is_key_for_brake(self, key):
-        return key == 2 or key == 'b' or key == 'brake'
-
-    def __getitem__(self, key):
-        if self._is_key_for_steer(key):
-            return self.steer
-        elif self._is_key_for_throttle(key):
-            return self.throttle
-        elif self._is_key_for_brake(key):
-            return self.brake
+
+        ## step0: get the necessary state(x,y,yaw,v) components of the vehicle
+        state = self.vehicle.get_state()
+        velocity = state['v']
+        x0 = np.array([state['coord']['x'], state['coord']['y'], np.radians(state['pose']['yaw']),
+                       (velocity['x'] ** 2 + velocity['y'] ** 2) ** 0.5])
+        ## step1: get the reference trajectory
+        if reference is None:
+            reference = self._sample_reference(x0)
         else:
-            raise KeyError("The key " + key + " is unsupported")
+            reference = np.array(reference, dtype=np.float64)
+            reference[:, 2] = np.radians(reference[:, 2])
+        ## step2: solve the controls from the warm start
+        start = time.perf_counter()
+        self._solve(x0, reference, start)
+        self.latency.add(time.perf_counter() - start)
+        ## step3: apply the first control, and shift the solution for the next tick
+        delta, a = self._u[0]
+        self._u[:-1] = self._u[1:].copy()
+
+        return ControlInput(steer=np.degrees(delta) / self.max_steer,
+                            throttle=a / self.max_accel if a > 0 else 0.0,
+                            brake=-a / self.max_decel if a < 0 else 0.0)
+
+    def stats(self):
+        return dict(self.latency.summary(), iterations=self.iterations, cost=self.cost)
+
+    def _sample_reference(self, x0):
+        import numpy as np
+
+        path = self.planner.get_target_path()
+        if self._arc is None or self._arc[0] is not path:
+            ## resample the path uniformly by arc length, so the heading is not disturbed by the dense points
+            arc = np.zeros(len(path))
+            np.cumsum(np.hypot(*np.diff(path.points, axis=0).T), out=arc[1:])
+            grid = np.append(np.arange(0.0, arc[-1], self.resolution), arc[-1])
+            points = np.stack([np.interp(grid, arc, path.points[:, 0]),
+                               np.interp(grid, arc, path.points[:, 1])], axis=1)
+            heading = np.unwrap(np.arctan2(*np.gradient(points, axis=0)[:, ::-1].T)) \
+                if len(points) > 1 else np.zeros(len(points))
+            self._arc = (path, arc, grid, points, heading)
+        _, arc, grid, points, heading = self._arc
+
+        ## the nearest point searched forward from the last one (monotone cursor)
+        _, idx = path.get_nearest_point(x0[0], x0[1], start=self.start, window=self.window)
+        self.start = max(idx, self.start)
+
+        ## the speed is limited by the curvature(heading change per meter) ahead
+        speed, s0 = self.target_speed, arc[self.start]
+        ahead = (grid >= s0) & (grid <= s0 + self.target_speed * self.dt * self.horizon + self.resolution)
+        if ahead.sum() > 1:
+            curvature = np.abs(np.diff(heading[ahead])).max() / self.resolution
+            if curvature > 0:
+                speed = min(speed, np.sqrt(self.max_lateral_accel / curvature))
+
+        s = s0 + speed * self.dt * np.arange(self.horizon + 1)
+        return np.stack([np.interp(s, grid, points[:, 0]), np.interp(s, grid, points[:, 1]),
+                         np.interp(s, grid, heading), np.where(s < grid[-1], speed, 0.0)], axis=1)
+
+    def _step(self, x, u):
+        import numpy as np
+        return x + self.dt * np.array([x[3] * np.cos(x[2]), x[3] * np.sin(x[2]),
+                                       x[3] / self.wheel_base * np.tan(u[0]), u[1]])
+
+    def _jacobians(self, xs, us):
+        import numpy as np
+        wheel_base = self.wheel_base
+        n = len(us)
+        yaw, v, delta = xs[:n, 2], xs[:n, 3], us[:, 0]
+
+        A = np.tile(np.eye(4), (n, 1, 1))
+        A[:, 0, 2], A[:, 0, 3] = -self.dt * v * np.sin(yaw), self.dt * np.cos(yaw)
+        A[:, 1, 2], A[:, 1, 3] = self.dt * v * np.cos(yaw), self.dt * np.sin(yaw)
+        A[:, 2, 3] = self.dt * np.tan(delta) / wheel_base
+        B = np.zeros((n, 4, 2))
+        B[:, 2, 0] = self.dt * v / (wheel_base * np.cos(delta) ** 2)
+        B[:, 3, 1] = self.dt
+        return A, B
+
+    @staticmethod
+    def _error(xs, reference):
+        import numpy as np
+        e = xs - reference
+        e[..., 2] = (e[..., 2] + np.pi) % (2 * np.pi) - np.pi
+        return e
+
+    def _cost(self, xs, us, reference):
+        import numpy as np
+        e = self._error(xs, reference)
+        return float(np.einsum("ti,ij,tj->", e[:-1], self.Q, e[:-1]) + e[-1] @ self.Qf @ e[-1]
+                     + np.einsum("ti,ij,tj->", us, self.R, us))
+
+    def _rollout(self, x0, us, xs=None, k=None, K=None, alpha=1.0):
+        import numpy as np
+        limit = np.array([np.radians(self.max_steer), self.max_accel])
+        new_xs, new_us = np.empty((len(us) + 1, 4)), np.empty_like(us)
+        new_xs[0] = x0
+        for t in range(len(us)):
+            u = us[t]
+            if k is not None:  # the feedback update of the controls
+                u = u + alpha * k[t] + K[t] @ self._error(new_xs[t], xs[t])
+            new_us[t] = np.clip(u, [-limit[0], -self.max_decel], limit)
+            new_xs[t + 1] = self._step(new_xs[t], new_us[t])
+        return new_xs, new_us
+
+    def _solve(self, x0, reference, start):
+        import time
+        import numpy as np
+
+        xs, us = self._rollout(x0, self._u)
+        cost, mu = self._cost(xs, us, reference), 1e-6
+        self.iterations = 0
+        while self.iterations < self.max_iter:
+            elapsed = time.perf_counter() - start
+            if self.iterations > 0 and elapsed * (self.iterations + 1) / self.iterations > self.budget:
+                break  # the next iteration would exceed the budget
+            self.iterations += 1
+
+            ## step1: backward pass, computing the feedforward k and the feedback K
+            A, B = self._jacobians(xs, us)
+            e = self._error(xs, reference)
+            Vx, Vxx = 2 * self.Qf @ e[-1], 2 * self.Qf
+            k, K = np.empty_like(us), np.empty((len(us), 2, 4))
+            for t in reversed(range(len(us))):
+                Qx = 2 * self.Q @ e[t] + A[t].T @ Vx
+                Qu = 2 * self.R @ us[t] + B[t].T @ Vx
+                Qxx = 2 * self.Q + A[t].T @ Vxx @ A[t]
+                Quu = 2 * self.R + B[t].T @ Vxx @ B[t] + mu * np.eye(2)
+                Qux = B[t].T @ Vxx @ A[t]
+                k[t], K[t] = -np.linalg.solve(Quu, Qu), -np.linalg.solve(Quu, Qux)
+                Vx = Qx + K[t].T @ Quu @ k[t] + K[t].T @ Qu + Qux.T @ k[t]
+                Vxx = Qxx + K[t].T @ Quu @ K[t] + K[t].T @ Qux + Qux.T @ K[t]
+                Vxx = (Vxx + Vxx.T) / 2
+
+            ## step2: forward pass with line search
+            for alpha in (1.0, 0.5, 0.25, 0.1):
+                new_xs, new_us = self._rollout(x0, us, xs, k, K, alpha)
+                new_cost = self._cost(new_xs, new_us, reference)
+                if new_cost < cost:
+                    break
+            else:  # no improvement, regularize more
+                mu *= 10
+                if mu > 1e3:
+                    break
+                continue
+
+            converged = cost - new_cost < self.tolerance * cost
+            xs, us, cost, mu = new_xs, new_us, new_cost, max(mu / 10, 1e-6)
+            if converged:
+                break
+
+        self._u, self.cost = us, cost
+
+
+class ControlInput(_SlotsRecord):
+    """
+    This is the record class to describe the control input
+    """
+
+    __slots__ = ("steer", "throttle", "brake")
+    _keys = {0: "steer", 's': "steer", 'steer': "steer", 'angle': "steer", 'theta': "steer",
+             1: "throttle", 't': "throttle", 'throttle': "throttle",
+             2: "brake", 'b': "brake", 'brake': "brake"}
+
+    def __init__(self, steer=0.0, throttle=0.0, brake=0.0):
+        self.steer = _clip(steer, -1.0, 1.0)
+        self.throttle = _clip(throttle, 0.0, 1.0)
+        self.brake = _clip(brake, 0.0, 1.0)
+
+
+# ==================================================================================================
+# -- functions -------------------------------------------------------------------------------------
+# ==================================================================================================
+
+def _clip(value, low, high):
+    """
+    clip the scalar by min/max without the numpy overhead, and the arrays(or tensors) by np.clip
+    """
+    if isinstance(value, numbers.Real):
+        return min(max(value, low), high)
+    import numpy as np
+    return np.clip(value, low, high)
@@ -2,25 +2,24 @@
 # -- imports ---------------------------------------------------------------------------------------
 # ==================================================================================================
 
-from abc import ABC, abstractmethod
+from abc import ABC
+from adept.utils._record import _SlotsRecord
 
 
 # ==================================================================================================
 # -- classes ---------------------------------------------------------------------------------------
 # ==================================================================================================
 
-class Vector(ABC):
+class Vector(_SlotsRecord, ABC):
     """
     This is the abstract class for any vector in Vehicle Dynamics,
     which consists of a pair/tuple/list/map of scalar components,
     and so, it is iterative
     """
 
-    def __init__(self):
-        pass
+    __slots__ = ()
 
-    @abstractmethod
-    def __getitem__(self, key):
+    def __init__(self):
         pass
 
 
@@ -29,43 +28,151 @@ class Vector2D(Vector):
     This is the base class for 2-dim(x,y) Vector
     """
 
+    __slots__ = ("x", "y")
+    _keys = {0: "x", 'x': "x", 'X': "x",
+             1: "y", 'y': "y", 'Y': "y"}
+
     def __init__(self, x=0, y=0):
         super().__init__()
         self.x = x
         self.y = y
 
-    def _is_key_for_x(self, key):
-        return key == 0 or key == 'x' or key == 'X'
-
-    def _is_key_for_y(self, key):
-        return key == 1 or key == 'y' or key == 'Y'
-
-    def __getitem__(self, key):
-        if self._is_key_for_x(key):
-            return self.x
-        elif self._is_key_for_y(key):
-            return self.y
-        else:
-            raise KeyError("The key " + key + " is unsupported")
-
 
 class Vector3D(Vector2D):
     """
     This is the base class for 3-dim(x,y,z) Vector
     """
 
+    __slots__ = ("z",)
+    _keys = {**Vector2D._keys, 2: "z", 'z': "z", 'Z': "z"}
+
     def __init__(self, x=0, y=0, z=0):
         super().__init__(x, y)
         self.z = z
 
-    def _is_key_for_z(self, key):
-        return key == 2 or key == 'z' or key == 'Z'
-
-    def __getitem__(self, key):
-        try:
-            return super().__getitem__(key)
-        except KeyError:
-            if self._is_key_for_z(key):
-                return self.z
-            else:
-                raise KeyError("The key " + key + " is unsupported")
+
+class BicycleModel:
+    """
+    This is the class for bicycle model of vehicle motion, which steps N vehicles at once
+    by the fixed-step 4th-order Runge-Kutta(RK4) integration, as a fast surrogate of the simulator physics
+        1. "kinematic": the state is [x, y, yaw, v], assuming no tire slip, i.e.
+            x' = v cos(yaw), y' = v sin(yaw), yaw' = v tan(delta) / L, v' = a
+        2. "dynamic": the state is [x, y, yaw, vx, vy, r] with the velocity (vx, vy) in the vehicle frame
+        and the yaw rate r, and the lateral tire forces are linear in the slip angles
+        (the slip angles are computed with vx no less than min_speed to avoid the singularity at rest)
+    note that:
+        1. the control is the ControlInput(s), i.e. steer, throttle and brake in [-1,1], [0,1] and [0,1],
+        mapped to the steering angle delta = steer * max_steer and the acceleration a = throttle * max_accel -
+        brake * max_decel, and the brake never drives the vehicle backwards
+        2. the yaw is in radian inside the model, while the states of vehicles and environments are in degree
+    """
+
+    def __init__(self, wheel_base=2.9, model="kinematic", max_steer=70.0, max_accel=4.0, max_decel=8.0,
+                 front_ratio=0.5, mass=1500.0, inertia=2500.0, front_stiffness=8e4, rear_stiffness=8e4,
+                 min_speed=1.0):
+        self.wheel_base = wheel_base  # distance between front and rear axles (m)
+        self.model = model
+        self.max_steer = max_steer  # steering angle (degree) when steer = 1.0
+        self.max_accel = max_accel  # acceleration (m/s^2) when throttle = 1.0
+        self.max_decel = max_decel  # deceleration (m/s^2) when brake = 1.0
+
+        ## the parameters of the dynamic model
+        self.lf = front_ratio * wheel_base  # distance from the mass center to the front axle (m)
+        self.lr = wheel_base - self.lf  # distance from the mass center to the rear axle (m)
+        self.mass = mass  # (kg)
+        self.inertia = inertia  # yaw moment of inertia (kg*m^2)
+        self.front_stiffness = front_stiffness  # cornering stiffness of the front tires (N/rad)
+        self.rear_stiffness = rear_stiffness  # cornering stiffness of the rear tires (N/rad)
+        self.min_speed = min_speed
+
+    @classmethod
+    def from_vehicle(cls, vehicle, **kwargs):
+        """
+        build the model with the wheel base from the vehicle's config
+        """
+        wheel_base = vehicle.get_config("wheel_base")
+        if wheel_base is not None:
+            kwargs["wheel_base"] = wheel_base
+        return cls(**kwargs)
+
+    @property
+    def state_dim(self):
+        return 4 if self.model == "kinematic" else 6
+
+    def get_inputs(self, controls):
+        """
+        :param controls: the ControlInput, the structured array of ControlInput dtype, or the (N,3) array
+        of [steer, throttle, brake]
+        :return: the steering angles delta(N,) in radian and the accelerations a(N,)
+        """
+        import numpy as np
+
+        if hasattr(controls, "astuple"):  # ControlInput
+            controls = np.array([controls.astuple()])
+        controls = np.asarray(controls)
+        if controls.dtype.names is not None:  # ControlInput dtype
+            steer, throttle, brake = controls["s"], controls["t"], controls["b"]
+        else:
+            controls = controls.astype(np.float64, copy=False).reshape(-1, 3)
+            steer, throttle, brake = controls[:, 0], controls[:, 1], controls[:, 2]
+
+        delta = np.radians(np.clip(steer, -1.0, 1.0) * self.max_steer)
+        accel = np.clip(throttle, 0.0, 1.0) * self.max_accel - np.clip(brake, 0.0, 1.0) * self.max_decel
+        return delta, accel
+
+    def derivative(self, states, delta, accel):
+        import numpy as np
+
+        if self.model == "kinematic":
+            x, y, yaw, v = states.T
+            accel = np.where((v <= 0) & (accel < 0), 0.0, accel)  # the brake stops the vehicle only
+            return np.stack([v * np.cos(yaw), v * np.sin(yaw), v * np.tan(delta) / self.wheel_base, accel], axis=1)
+
+        x, y, yaw, vx, vy, r = states.T
+        vx_safe = np.maximum(vx, self.min_speed)
+        force_front = self.front_stiffness * (delta - np.arctan2(vy + self.lf * r, vx_safe))
+        force_rear = -self.rear_stiffness * np.arctan2(vy - self.lr * r, vx_safe)
+        accel = np.where((vx <= 0) & (accel < 0), 0.0, accel)
+        return np.stack([
+            vx * np.cos(yaw) - vy * np.sin(yaw),
+            vx * np.sin(yaw) + vy * np.cos(yaw),
+            r,
+            accel - force_front * np.sin(delta) / self.mass + vy * r,
+            (force_front * np.cos(delta) + force_rear) / self.mass - vx * r,
+            (self.lf * force_front * np.cos(delta) - self.lr * force_rear) / self.inertia,
+        ], axis=1)
+
+    def step(self, states, controls, dt=0.05, substeps=1):
+        """
+        :param states: the (N,state_dim) states
+        :param controls: the controls of the N vehicles, held during the step
+        :param dt: the time(s) of the step, integrated by {substeps} RK4 steps
+        :return: the (N,state_dim) states after dt
+        """
+        import numpy as np
+
+        states = np.array(states, dtype=np.float64).reshape(-1, self.state_dim)
+        delta, accel = self.get_inputs(controls)
+        h = dt / substeps
+        for _ in range(substeps):
+            k1 = self.derivative(states, delta, accel)
+            k2 = self.derivative(states + 0.5 * h * k1, delta, accel)
+            k3 = self.derivative(states + 0.5 * h * k2, delta, accel)
+            k4 = self.derivative(states + h * k3, delta, accel)
+            states += h / 6.0 * (k1 + 2 * k2 + 2 * k3 + k4)
+            np.maximum(states[:, 3], 0.0, out=states[:, 3])  # no reverse
+        return states
+
+    def rollout(self, states, controls, dt=0.05, substeps=1):
+        """
+        :param controls: the sequence of T controls, each for the N vehicles
+        :return: the (T+1,N,state_dim) states from the initial ones
+        """
+        import numpy as np
+
+        states = np.array(states, dtype=np.float64).reshape(-1, self.state_dim)
+        trajectory = np.empty((len(controls) + 1,) + states.shape)
+        trajectory[0] = states
+        for t, control in enumerate(controls):
+            trajectory[t + 1] = states = self.step(states, control, dt=dt, substeps=substeps)
+        return trajectory
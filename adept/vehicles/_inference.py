@@ -0,0 +1,209 @@
+# ==================================================================================================
+# -- imports ---------------------------------------------------------------------------------------
+# ==================================================================================================
+
+import logging
+import time
+import warnings
+
+
+# ==================================================================================================
+# -- classes ---------------------------------------------------------------------------------------
+# ==================================================================================================
+
+class InferenceEngine:
+    """
+    This is the class for running the vehicle model on the sensor frames, which:
+        1. converts the frames into the preallocated input tensors(one per input shape),
+        by one copy with the dtype cast and one in-place scale, instead of allocating new tensors per frame
+        2. runs the model under inference_mode, one frame or several frames(of several vehicles) in one batch
+        3. optionally traces the model by torch.jit at the first input(jit=True),
+        and freezes the traced model for inference on cpu
+        4. sets the intra-op(and inter-op) thread counts of torch if given, and warms the model up before the timing
+        5. counts the latencies of preparing the inputs and running the model, see stats()
+    note that:
+        1. the batch is the frames concatenated along the first axis, so each frame should carry the batch axis
+        the model expects(e.g. (1,C,H,W)), and the outputs are split back into the frames by the same axis
+        2. the prepared tensor is reused by the next prepare with the same shape,
+        so it is only valid until then, and has to be cloned if kept longer
+        3. the thread counts of torch are process-wide, so setting them(threads, interop_threads, set_threads)
+        also affects the other engines and any other torch work in the process, e.g. the attacks,
+        and they are left unchanged when not given
+    """
+
+    def __init__(self, model, device=None, jit=False, threads=None, interop_threads=None,
+                 warmup=0, input_shape=None, scale=1 / 255.):
+        """
+        :param model: the torch model mapping the input tensor to the outputs, e.g. the steering model
+        :param device: the torch device, None for cpu
+        :param jit: whether to trace the model by torch.jit at the first input
+        :param threads: the number of intra-op threads, None for the torch default
+        :param interop_threads: the number of inter-op threads, None for the torch default
+        :param warmup: the number of warm-up runs(not counted), done at init if input_shape is given,
+        otherwise at the first input
+        :param input_shape: the shape of one frame(with its batch axis) to preallocate and warm up at init
+        :param scale: the frames are multiplied by the scale after converted to float, e.g. 1/255 for images
+        """
+        import torch
+        from adept.utils import LatencyCounter
+
+        self.device = device if device is not None else torch.device("cpu")
+        self.model = model.eval() if hasattr(model, "eval") else model
+        self.jit = jit
+        self.warmup = warmup
+        self.scale = scale
+
+        self._traced = False
+        self._warmed = False
+        self._staging = {}  # the host tensors(pinned for cuda) with the frames' dtype, keyed by (shape, dtype)
+        self._inputs = {}  # the float tensors on the device, keyed by shape
+        self.prepare_latency = LatencyCounter()
+        self.infer_latency = LatencyCounter()
+
+        self.set_threads(threads, interop_threads)
+        if input_shape is not None:
+            self.warm_up(torch.zeros(tuple(input_shape), device=self.device))
+
+    @staticmethod
+    def set_threads(threads=None, interop_threads=None):
+        """
+        set the process-wide thread counts of torch, and the None ones are left unchanged
+        """
+        import torch
+
+        if threads is not None:
+            torch.set_num_threads(int(threads))
+        if interop_threads is not None:
+            try:  # the inter-op threads can only be set before any inter-op parallel work starts
+                torch.set_num_interop_threads(int(interop_threads))
+            except RuntimeError as e:
+                logging.warning('The inter-op threads are not set: %s', e)
+
+    def _get_input(self, shape):
+        import torch
+        if shape not in self._inputs:
+            self._inputs[shape] = torch.empty(shape, dtype=torch.float32, device=self.device)
+        return self._inputs[shape]
+
+    def _get_staging(self, shape, dtype):
+        import torch
+        key = (shape, dtype)
+        if key not in self._staging:
+            self._staging[key] = torch.empty(shape, dtype=dtype,
+                                             pin_memory=self.device.type == "cuda" and torch.cuda.is_available())
+        return self._staging[key]
+
+    def prepare(self, frames):
+        """
+        :param frames: one frame, or the list of frames concatenated as one batch,
+        each of which is the array-like(e.g. numpy array, carla image data) or tensor
+        :return: the float tensor on the device, scaled by self.scale
+        """
+        import numpy as np
+        import torch
+
+        start = time.perf_counter()
+        frames = [frames] if not isinstance(frames, (list, tuple)) else frames
+        with warnings.catch_warnings():  # the read-only frames(e.g. memory-mapped) are only copied from
+            warnings.filterwarnings("ignore", message="The given NumPy array is not writable")
+            frames = [frame if isinstance(frame, torch.Tensor) else torch.from_numpy(np.asarray(frame))
+                      for frame in frames]
+        shape = (sum(frame.shape[0] for frame in frames),) + tuple(frames[0].shape[1:]) \
+            if len(frames) > 1 else tuple(frames[0].shape)
+
+        inputs = self._get_input(shape)
+        if self.device.type == "cpu" or len(frames) == 1:
+            source = frames
+        else:  # gather the frames on the host, so that they are sent to the device in one copy
+            source = [self._get_staging(shape, frames[0].dtype)]
+            torch.cat(frames, dim=0, out=source[0])
+
+        if len(source) == 1:
+            inputs.copy_(source[0], non_blocking=True)  # cast the dtype while copying
+        else:
+            lo = 0
+            for frame in source:
+                inputs[lo:lo + frame.shape[0]].copy_(frame)
+                lo += frame.shape[0]
+        if self.scale != 1:
+            inputs.mul_(self.scale)
+
+        self.prepare_latency.add(time.perf_counter() - start)
+        return inputs
+
+    def _trace(self, inputs):
+        import torch
+
+        with torch.inference_mode(False), torch.no_grad():
+            model = torch.jit.trace(self.model, inputs.clone())
+        if self.device.type == "cpu":
+            try:  # fold the parameters and fuse the ops for cpu inference
+                model = torch.jit.optimize_for_inference(torch.jit.freeze(model))
+            except (RuntimeError, AttributeError) as e:
+                logging.warning('The traced model is not frozen: %s', e)
+        self.model = model
+        self._traced = True
+
+    def warm_up(self, inputs):
+        """
+        trace the model if jit, and run the model on the inputs for {warmup} times without counting
+        """
+        import torch
+
+        if self.jit and not self._traced:
+            self._trace(inputs)
+        with torch.inference_mode():
+            for _ in range(self.warmup):
+                self.model(inputs)
+        self._warmed = True
+
+    def run(self, inputs):
+        """
+        :param inputs: the prepared tensor
+        :return: the model outputs of the inputs
+        """
+        import torch
+
+        if not self._warmed:
+            self.warm_up(inputs)
+
+        start = time.perf_counter()
+        with torch.inference_mode():
+            outputs = self.model(inputs)
+        if self.device.type == "cuda":
+            torch.cuda.synchronize(self.device)
+        self.infer_latency.add(time.perf_counter() - start)
+        return outputs
+
+    def infer(self, frame, prepared=False):
+        """
+        :param frame: one frame, or the tensor returned by prepare if prepared
+        :param prepared: whether the frame is already prepared, otherwise it is prepared(converted and scaled)
+        here, even if it is a float tensor
+        :return: the model output of the frame as a float, e.g. the predicted steer
+        """
+        inputs = frame if prepared else self.prepare(frame)
+        return float(self.run(inputs))
+
+    def infer_batch(self, frames):
+        """
+        :param frames: the list of frames, e.g. the same camera of several vehicles
+        :return: the (N,k) numpy array of the model outputs, one row per frame
+        """
+        import numpy as np
+
+        if len(frames) == 0:
+            return np.empty((0, 1), dtype=np.float32)
+        counts = [np.shape(frame)[0] for frame in frames]
+        outputs = self.run(self.prepare(list(frames))).detach().cpu().numpy()
+        outputs = outputs.reshape(sum(counts), -1)
+        if all(count == 1 for count in counts):
+            return outputs
+        return np.stack([chunk.reshape(-1) for chunk in np.split(outputs, np.cumsum(counts)[:-1])])
+
+    def stats(self):
+        return {
+            "prepare": self.prepare_latency.summary(),
+            "infer": self.infer_latency.summary(),
+            "traced": self._traced,
+        }
@@ -2,6 +2,7 @@
 # -- imports ---------------------------------------------------------------------------------------
 # ==================================================================================================
 
+import numbers
 from abc import ABC, abstractmethod
 from adept.transforms import Coordinate2D, Coordinate3D, Point, SamplePath2D
 
@@ -36,32 +37,39 @@ class ReferencePlanner(Planner):
     """
     This the class for planner which only contains a reference path(read from files)
     and no computation or algorithm
+    note that: the text file is parsed block by block with numpy at the first load,
+    and the parsed points are cached as a binary sidecar file({ref_path_file}.npy) next to it if cache,
+    which is memory-mapped at the later loads as long as it is newer than the text file
     """
 
-    def __init__(self, ref_path_file, dim=2, split=' ', sample_rate=1):
+    def __init__(self, ref_path_file, dim=2, split=' ', sample_rate=1, cache=True):
         super().__init__()
 
         self.ref_path_file = ref_path_file
         self.dim = dim
+        self.cache = cache
 
         self._read_ref_path(split, sample_rate)
+        self._cursor = 0  # the index of the nearest point to the last given state, searched forward
 
     def _read_ref_path(self, split, sample_rate):
         if self.dim == 2:
-            self.path = SamplePath2D([])
+            points = load_ref_path(self.ref_path_file, dim=self.dim, split=split, cache=self.cache)
+            self.path = SamplePath2D(points[::sample_rate])  # a strided view, without copying the points
         elif self.dim == 3:  # TODO: SamplePath3D
             pass
 
-        cnt = 0
-        with open(self.ref_path_file, 'r') as f:
-            for line in f:
-                if cnt % sample_rate == 0:
-                    items = [float(i) for i in line.split(split)[:self.dim]]
-                    self.path.append(items)
-                cnt += 1
+    def in_final_states(self, state):
+        """
+        :param state: the vehicle state, or the index of the key point reached in the reference path
+        :return: True if the index is beyond the path, or the nearest point to the state is the last one
+        """
+        if isinstance(state, numbers.Integral):
+            return state >= len(self.path)
 
-    def in_final_states(self, idx):
-        return idx >= len(self.path)
+        _, idx = self.path.get_nearest_point(state["c"]["x"], state["c"]["y"], start=self._cursor)
+        self._cursor = max(idx, self._cursor)
+        return self._cursor >= len(self.path) - 1
 
     def get_target_path(self):
         return self.path
@@ -73,3 +81,50 @@ class ReferencePlanner(Planner):
 
     def dim(self):
         return self.dim
+
+
+# ==================================================================================================
+# -- functions -------------------------------------------------------------------------------------
+# ==================================================================================================
+
+def load_ref_path(ref_path_file, dim=2, split=' ', cache=True, block_size=1 << 24):
+    """
+    load the first {dim} columns of the reference path file, where each line is a point like "x y yaw"
+    :param cache: if True, memory-map the sidecar file({ref_path_file}.npy) if it is up to date,
+    otherwise parse the text file and write the sidecar file
+    :param block_size: the approximate number of bytes parsed at once
+    :return: the (N,dim) float array of the points, memory-mapped if loaded from the sidecar file
+    """
+    import os
+    import numpy as np
+
+    sidecar = ref_path_file + ".npy"
+    if cache and os.path.exists(sidecar) and os.path.getmtime(sidecar) >= os.path.getmtime(ref_path_file):
+        points = np.load(sidecar, mmap_mode='r')
+        if points.ndim == 2 and points.shape[1] == dim:
+            return points
+
+    ## parse the text block by block, each block is a batch of complete lines
+    blocks = []
+    delimiter = split if split.strip() else None  # None for any whitespace, ignoring the trailing one
+    with open(ref_path_file, 'r') as f:
+        for lines in iter(lambda: f.readlines(block_size), []):
+            lines = [line for line in lines if line.strip()]
+            if not lines:
+                continue
+            try:
+                values = np.loadtxt(lines, dtype=np.float64, delimiter=delimiter, usecols=range(dim), ndmin=2)
+            except ValueError as e:
+                raise ValueError("The reference path file " + ref_path_file + " should have at least "
+                                 + str(dim) + " numeric columns: " + str(e))
+            blocks.append(values)
+    points = np.concatenate(blocks) if blocks else np.empty((0, dim), dtype=np.float64)
+
+    if cache:
+        try:  # write to a temporary file first, so the sidecar file is never partially written
+            temp = sidecar + ".tmp.npy"
+            np.save(temp, points)
+            os.replace(temp, sidecar)
+        except OSError:  # the directory may be read-only
+            pass
+    return points
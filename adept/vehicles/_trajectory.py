@@ -0,0 +1,196 @@
+# ==================================================================================================
+# -- imports ---------------------------------------------------------------------------------------
+# ==================================================================================================
+
+from adept.transforms import WorldCoordinate, EulerAngle
+from ._dynamics import Vector3D
+from ._vehicle import SimpleDynamicsVehicleState
+
+
+# ==================================================================================================
+# -- classes ---------------------------------------------------------------------------------------
+# ==================================================================================================
+
+class Trajectory:
+    """
+    This is the class for a history of vehicle states in time order,
+    which stores each quantity as a column: time, x, y, z, pitch, yaw, roll, vx, vy, vz
+    note that:
+        1. the columns are the rows of one (10,N) float array (growing by doubling when appended),
+        so each column is contiguous, and the derived kinematics are computed on whole columns at once
+        2. the angles are in degree, the same as EulerAngle and the ego state in carla
+        3. the row layout [time, x, y, z, pitch, yaw, roll, vx, vy, vz] is the same as states.npy
+        written by EpisodeRecorder, so a recorded episode can be loaded by from_array directly
+    """
+
+    columns = ("time", "x", "y", "z", "pitch", "yaw", "roll", "vx", "vy", "vz")
+    _record_fields = (("c", "x"), ("c", "y"), ("c", "z"),  # the fields of the columns except time
+                      ("p", "p"), ("p", "y"), ("p", "r"),  # in SimpleDynamicsVehicleState dtype
+                      ("v", "x"), ("v", "y"), ("v", "z"))
+
+    def __init__(self, capacity=0):
+        import numpy as np
+        self._data = np.empty((len(self.columns), capacity), dtype=np.float64)
+        self._size = 0
+
+    @classmethod
+    def from_array(cls, array):
+        """
+        :param array: array-like with shape (N,10), each row is [time, x, y, z, pitch, yaw, roll, vx, vy, vz]
+        """
+        import numpy as np
+        array = np.asarray(array, dtype=np.float64).reshape(-1, len(cls.columns))
+        trajectory = cls()
+        trajectory._data = np.ascontiguousarray(array.T)
+        trajectory._size = len(array)
+        return trajectory
+
+    @classmethod
+    def from_states(cls, times, states):
+        """
+        :param times: the timestamps(s) of the states
+        :param states: the SimpleDynamicsVehicleStates, or the structured array of SimpleDynamicsVehicleState dtype
+        """
+        import numpy as np
+        times = np.asarray(times, dtype=np.float64)
+        if not isinstance(states, np.ndarray):
+            states = np.array([state.astuple() for state in states], dtype=SimpleDynamicsVehicleState.get_dtype())
+
+        trajectory = cls(capacity=len(states))
+        trajectory._size = len(states)
+        trajectory._data[0] = times
+        for i, (part, field) in enumerate(cls._record_fields):
+            trajectory._data[i + 1] = states[part][field]
+        return trajectory
+
+    def _reserve(self, capacity):
+        if capacity <= self._data.shape[1]:
+            return
+        import numpy as np
+        data = np.empty((len(self.columns), max(capacity, 2 * self._data.shape[1], 16)), dtype=np.float64)
+        data[:, :self._size] = self._data[:, :self._size]
+        self._data = data
+
+    def append(self, time, state):
+        """
+        append the SimpleDynamicsVehicleState at the time(s)
+        """
+        self._reserve(self._size + 1)
+        self._data[:, self._size] = (time,
+                                     state["c"]["x"], state["c"]["y"], state["c"]["z"],
+                                     state["p"]["p"], state["p"]["y"], state["p"]["r"],
+                                     state["v"]["x"], state["v"]["y"], state["v"]["z"])
+        self._size += 1
+
+    def __len__(self):
+        return self._size
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return Trajectory.from_array(self.to_array()[key])
+        t, x, y, z, pitch, yaw, roll, vx, vy, vz = self._data[:, range(self._size)[key]].tolist()
+        return SimpleDynamicsVehicleState(coord=WorldCoordinate(x=x, y=y, z=z),
+                                          pose=EulerAngle(pitch=pitch, yaw=yaw, roll=roll),
+                                          velocity=Vector3D(vx, vy, vz))
+
+    def column(self, name):
+        return self._data[self.columns.index(name), :self._size]
+
+    time = property(lambda self: self.column("time"))
+    x = property(lambda self: self.column("x"))
+    y = property(lambda self: self.column("y"))
+    z = property(lambda self: self.column("z"))
+    pitch = property(lambda self: self.column("pitch"))
+    yaw = property(lambda self: self.column("yaw"))
+    roll = property(lambda self: self.column("roll"))
+    vx = property(lambda self: self.column("vx"))
+    vy = property(lambda self: self.column("vy"))
+    vz = property(lambda self: self.column("vz"))
+
+    @property
+    def positions(self):
+        """
+        the (N,2) array of the (x,y) positions
+        """
+        return self._data[1:3, :self._size].T
+
+    def to_array(self):
+        return self._data[:, :self._size].T
+
+    def to_records(self):
+        """
+        the structured array of SimpleDynamicsVehicleState dtype
+        """
+        import numpy as np
+        records = np.empty(self._size, dtype=SimpleDynamicsVehicleState.get_dtype())
+        for i, (part, field) in enumerate(self._record_fields):
+            records[part][field] = self._data[i + 1, :self._size]
+        return records
+
+    def speed(self):
+        import numpy as np
+        return np.sqrt(self.vx ** 2 + self.vy ** 2 + self.vz ** 2)
+
+    def heading_rate(self):
+        """
+        the yaw rate(degree/s), with the yaw unwrapped across +-180 degrees
+        """
+        import numpy as np
+        if self._size < 2:
+            return np.zeros(self._size)
+        return np.degrees(np.gradient(np.unwrap(np.radians(self.yaw)), self.time))
+
+    def curvature(self):
+        """
+        the signed curvature(1/m) of the (x,y) path, i.e. (x'y'' - y'x'') / (x'^2 + y'^2)^1.5,
+        which is 0 where the vehicle stands still
+        """
+        import numpy as np
+        if self._size < 3:
+            return np.zeros(self._size)
+        dx, dy = np.gradient(self.x, self.time), np.gradient(self.y, self.time)
+        ddx, ddy = np.gradient(dx, self.time), np.gradient(dy, self.time)
+        speed3 = np.hypot(dx, dy) ** 3
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(speed3 > 1e-9, (dx * ddy - dy * ddx) / speed3, 0.0)
+
+    def arc_length(self):
+        """
+        the accumulated length(m) of the (x,y) path from the first state
+        """
+        import numpy as np
+        length = np.zeros(self._size)
+        np.cumsum(np.hypot(np.diff(self.x), np.diff(self.y)), out=length[1:])
+        return length
+
+    def cross_track_error(self, path, window=256, chunk=1024):
+        """
+        the signed distance(m) from each position to the reference path(SamplePath2D), positive on the left
+        in a right-handed frame(on the right in CARLA's left-handed frame),
+        see SamplePath2D.project for the window and chunk
+        """
+        offset, _, _ = path.project(self.positions, window=window, chunk=chunk)
+        return offset
+
+    def resample(self, dt):
+        """
+        resample the trajectory to the fixed time step dt(s) by linear interpolation,
+        with the angles interpolated along the shortest rotation
+        """
+        import numpy as np
+        if self._size == 0:
+            return Trajectory()
+
+        time = self.time
+        times = time[0] + dt * np.arange(int(np.floor((time[-1] - time[0]) / dt + 1e-9)) + 1)
+        data = np.empty((len(self.columns), len(times)), dtype=np.float64)
+        data[0] = times
+        for i in range(1, len(self.columns)):
+            column = self._data[i, :self._size]
+            if self.columns[i] in ("pitch", "yaw", "roll"):
+                column = np.degrees(np.unwrap(np.radians(column)))
+                data[i] = (np.interp(times, time, column) + 180.0) % 360.0 - 180.0
+            else:
+                data[i] = np.interp(times, time, column)
+
+        return Trajectory.from_array(data.T)
@@ -5,7 +5,9 @@
 from abc import ABC, abstractmethod
 from adept.envs.carla import retrieve_from, apply_control
 from adept.transforms import Coordinate, Pose, WorldCoordinate, EulerAngle
-from adept.vehicles import Vector, Vector3D
+from adept.utils._record import _SlotsRecord
+from ._dynamics import Vector, Vector3D
+from ._inference import InferenceEngine
 
 
 # ==================================================================================================
@@ -77,16 +79,19 @@ class Vehicle(ABC):
 class End2EndVehicle(Vehicle):
     """
     This is the basic class for end-to-end autonomous vehicle
+    note that: the model runs behind the InferenceEngine, configured by the keyword arguments
+    (jit, threads, interop_threads, warmup, input_shape), see InferenceEngine for details
     """
 
-    def __init__(self, env, model, device="gpu"):
+    def __init__(self, env, model, device="gpu", **engine_kwargs):
         super().__init__(env, model)
         import torch
         self.device = torch.device("cuda") \
             if torch.cuda.is_available() and device == "gpu" else torch.device("cpu")
+        self.engine = InferenceEngine(model, device=self.device, **engine_kwargs)
 
     def _init_config(self):
-        pass
+        self.config_map = {}  # no configuration file for the end-to-end vehicle yet
 
     def _init_state(self):
         x, y, z, p, y, r, vx, vy, vz = self._get_ego_vehicle_state()
@@ -104,37 +109,48 @@ class End2EndVehicle(Vehicle):
         return self.state
 
     def _get_ego_vehicle_state(self):
-        ego_vehicle = self.env.get_ego_actor()
-        location = retrieve_from(actor=ego_vehicle, about="location")
-        rotation = retrieve_from(actor=ego_vehicle, about="rotation")
-        velocity = retrieve_from(actor=ego_vehicle, about="velocity")
+        ego_vehicle, snapshot = self.env.get_ego_actor(), self.env.get_snapshot()
+        transform = retrieve_from(actor=ego_vehicle, about="transform", snapshot=snapshot)
+        velocity = retrieve_from(actor=ego_vehicle, about="velocity", snapshot=snapshot)
+        location, rotation = transform.location, transform.rotation
         return location.x, location.y, location.z, \
                rotation.pitch, rotation.yaw, rotation.roll, \
                velocity.x, velocity.y, velocity.z
 
     def get_sensor_output(self, phys_scene, sensor="camera", **kwargs):
-        import numpy as np
-        import torch
-        self.phys_scene = torch.from_numpy(np.array(phys_scene)).float().div_(255).to(self.device)
+        self.phys_scene = self.engine.prepare(phys_scene)
 
     def get_control_input(self):
-        import torch
-
         ## step1: get steering model's control output
         ## based on phys_scene from sensor output
-        with torch.no_grad():
-            predict_steer = float(self.model(self.phys_scene))
+        predict_steer = self.engine.infer(self.phys_scene, prepared=True)
 
         ## step2: get whole control input
-        ## from the predicted steer and current velocity
+        ## from the predicted steer and current speed(in the ground plane, like the controllers)
         ego_vehicle = self.env.get_ego_actor()
-        velocity = retrieve_from(actor=ego_vehicle, about="velocity")
+        velocity = retrieve_from(actor=ego_vehicle, about="velocity", snapshot=self.env.get_snapshot())
         return self.env.controller.get_control_from(
-            steer=predict_steer, velocity=velocity)
+            steer=predict_steer, velocity=(velocity.x ** 2 + velocity.y ** 2) ** 0.5)
+
+    def predict_steers(self, phys_scenes):
+        """
+        predict the steers of several frames(e.g. of several vehicles) in one batch
+        :return: the (N,) numpy array of the predicted steers
+        """
+        return self.engine.infer_batch(phys_scenes)[:, 0]
 
     def apply_control(self, control_input):
-        apply_control(self.env.get_ego_actor(),
-                      control_input)
+        batch = getattr(self.env, "batch", None)
+        if batch is None:  # no command batch in the environment, e.g. ReplayEnv
+            apply_control(self.env.get_ego_actor(),
+                          control_input)
+            return
+
+        ## queue the control, which is sent with the other commands of the tick by env.tick,
+        ## or sent at once without waiting for the response in the asynchronous mode
+        batch.apply_control(self.env.get_ego_actor(), control_input)
+        if not getattr(self.env, "sync", True):
+            batch.flush(sync=False)
 
     def get_perception_input(self):
         pass
@@ -156,6 +172,8 @@ class VehicleState(ABC):
     of several elements, and so, it has to be iterative
     """
 
+    __slots__ = ()
+
     def __init__(self):
         pass
 
@@ -164,31 +182,22 @@ class VehicleState(ABC):
         pass
 
 
-class BaseVehicleState(VehicleState):
+class BaseVehicleState(_SlotsRecord, VehicleState):
     """
     This is the basic state for vehicle, which only consists of two parts,
     one is position(coordinate), and the other is pose
     """
 
+    __slots__ = ("coord", "pose")
+    _keys = {0: "coord", 'c': "coord", 'coord': "coord",
+             1: "pose", 'p': "pose", 'pose': "pose"}
+    _types = {"coord": WorldCoordinate, "pose": EulerAngle}
+
     def __init__(self, coord: Coordinate, pose: Pose):
         super().__init__()
         self.coord = coord
         self.pose = pose
 
-    def _is_key_for_coord(self, key):
-        return key == 0 or key == 'c' or key == 'coord'
-
-    def _is_key_for_pose(self, key):
-        return key == 1 or key == 'p' or key == 'pose'
-
-    def __getitem__(self, key):
-        if self._is_key_for_coord(key):
-            return self.coord
-        elif self._is_key_for_pose(key):
-            return self.pose
-        else:
-            raise KeyError("The key " + key + " is unsupported")
-
 
 class SimpleDynamicsVehicleState(BaseVehicleState):
     """
@@ -196,22 +205,14 @@ class SimpleDynamicsVehicleState(BaseVehicleState):
     which only appends one dynamics property: velocity
     """
 
+    __slots__ = ("velocity",)
+    _keys = {**BaseVehicleState._keys, 2: "velocity", 'v': "velocity", 'velocity': "velocity"}
+    _types = {**BaseVehicleState._types, "velocity": Vector3D}
+
     def __init__(self, coord: Coordinate, pose: Pose, velocity: Vector):
         super().__init__(coord, pose)
         self.velocity = velocity
 
-    def _is_key_for_velocity(self, key):
-        return key == 2 or key == 'v' or key == 'velocity'
-
-    def __getitem__(self, key):
-        try:
-            return super().__getitem__(key)
-        except KeyError:
-            if self._is_key_for_velocity(key):
-                return self.velocity
-            else:
-                raise KeyError("The key " + key + " is unsupported")
-
 
 # ==================================================================================================
 # -- functions -------------------------------------------------------------------------------------
@@ -8,6 +8,7 @@ including integrated-gui, simple-image-show, simple-video-show, etc
 # ==================================================================================================
 from ._video import add_video_writer, save_video_frame
 from ._image import show_image, add_image_queue, get_image_from_queue, put_image_to_queue
+from ._pipeline import LatencyCounter, PipelineStage, LatestSlot, SensorPipeline
 
 # ==================================================================================================
 # -- all -------------------------------------------------------------------------------------------
@@ -16,4 +17,5 @@ from ._image import show_image, add_image_queue, get_image_from_queue, put_image
 __all__ = [  # user interface and other dependent packages
     "add_video_writer", "save_video_frame",
     "show_image", "add_image_queue", "get_image_from_queue", "put_image_to_queue",
+    "LatencyCounter", "PipelineStage", "LatestSlot", "SensorPipeline",
 ]
\ No newline at end of file
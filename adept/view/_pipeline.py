@@ -0,0 +1,244 @@
+# ==================================================================================================
+# -- imports ---------------------------------------------------------------------------------------
+# ==================================================================================================
+
+import queue
+import threading
+import time
+from adept.utils import LatencyCounter
+
+
+# ==================================================================================================
+# -- classes ---------------------------------------------------------------------------------------
+# ==================================================================================================
+
+class PipelineStage:
+    """
+    This is the class for one stage of the sensor pipeline,
+    which runs {func} on its own worker thread, consuming a bounded queue and feeding the outputs
+    note that: when the queue is full, the drop policy decides which item to drop:
+        1. "oldest": drop the oldest item in the queue, so the stage always works on the recent items
+        2. "newest": drop the incoming item
+        3. "block": never drop, the producer waits until the queue has room
+    """
+
+    _STOP = object()
+
+    def __init__(self, name, func, maxsize=2, drop="oldest", outputs=None):
+        self.name = name
+        self.func = func  # the function mapping the input item to the output item, None output is not fed
+        self.drop = drop
+        self.outputs = outputs if outputs is not None else []  # the stages or slots fed with the output
+
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.dropped = 0
+        self.wait_latency = LatencyCounter()  # time waiting in the queue
+        self.run_latency = LatencyCounter()  # time running the func
+
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self.queue.put(self._STOP)  # the stop signal is never dropped
+        self._thread.join(timeout)
+
+    def put(self, item):
+        """
+        put the item into the queue without blocking (except for the "block" policy)
+        :return: True if the item is queued, otherwise False
+        """
+        entry = (time.perf_counter(), item)
+        if self.drop == "block":
+            self.queue.put(entry)
+            return True
+
+        try:
+            self.queue.put_nowait(entry)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            if self.drop == "newest":
+                return False
+
+        try:  # drop the oldest and retry once
+            self.queue.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            self.queue.put_nowait(entry)
+        except queue.Full:
+            return False
+        return True
+
+    def _run(self):
+        while True:
+            entry = self.queue.get()
+            if entry is self._STOP:
+                break
+
+            enqueued, item = entry
+            start = time.perf_counter()
+            self.wait_latency.add(start - enqueued)
+            try:
+                result = self.func(item)
+            except Exception as e:  # keep the worker alive for the next items
+                print("~~the pipeline stage {} got something wrong~~".format(self.name), e)
+                continue
+            self.run_latency.add(time.perf_counter() - start)
+
+            if result is not None:
+                for output in self.outputs:
+                    output.put(result)
+
+    def stats(self):
+        return {
+            "queued": self.queue.qsize(),
+            "dropped": self.dropped,
+            "wait": self.wait_latency.summary(),
+            "run": self.run_latency.summary(),
+        }
+
+
+class LatestSlot:
+    """
+    This is the class for holding only the latest item, which never blocks the producer,
+    and the consumer can wait for the next item
+    """
+
+    def __init__(self):
+        self.item = None
+        self.count = 0
+        self._condition = threading.Condition()
+
+    def put(self, item):
+        with self._condition:
+            self.item = item
+            self.count += 1
+            self._condition.notify_all()
+        return True
+
+    def get(self, wait=False, timeout=None, after=0, with_count=False):
+        """
+        :param wait: if True, wait until the slot holds an item newer than the {after}-th item
+        :param after: the count returned with the last consumed item, so that the same item is never got twice
+        :param with_count: if True, return (count, item), where the count is passed as {after} for the next item
+        :return: the latest item, or None if no item, or no newer item before timeout when wait
+        """
+        with self._condition:
+            if wait and not self._condition.wait_for(lambda: self.count > after, timeout=timeout):
+                return (after, None) if with_count else None
+            return (self.count, self.item) if with_count else self.item
+
+
+class SensorPipeline:
+    """
+    This is the class for asynchronous sensor pipeline, in which the sensor callback only enqueues the raw image,
+    and the color conversion and video encoding run on worker threads with bounded queues, i.e.
+        callback => [decode: one stage per camera] => latest slot (for the consumer like the attack)
+                                                   => [video: one stage per camera]
+                                                   => display slot (shown by show() on the main thread)
+    note that:
+        1. each camera has its own decode and video stages,
+        so the camera feeding the attack never waits behind the video encoding or the other cameras
+        2. the gui of cv2(imshow, waitKey) is not thread-safe and has to run on the main thread on some platforms,
+        so the display only keeps the latest decoded image of each camera, and the main loop calls show() to draw them
+    """
+
+    def __init__(self, queue_size=2, drop="oldest"):
+        self.queue_size = queue_size
+        self.drop = drop
+
+        self.cameras = {}  # {camera: {"decode": stage, "video": stage, "latest": slot}}
+        self.display = {}  # {camera: (display slot, width, height)}
+        self._shown = {}  # {camera: the count of the last shown image}
+
+    def add_camera(self, camera, format="bgr", video_writer=None, show=False, width=None, height=None, roi=None):
+        """
+        :param roi: the region of interest (top, bottom, left, right) of the image for the consumer,
+        which is cropped before the color conversion(see get_raw_image), while the video and display get the whole image
+        """
+        ## step1: init the stages after decoding
+        latest, outputs = LatestSlot(), []
+        video = None
+        if video_writer is not None:
+            from ._video import save_video_frame
+            video = PipelineStage(camera + ".video",
+                                  lambda item: save_video_frame(video_writer, frame=item[2]),
+                                  maxsize=self.queue_size, drop=self.drop)
+            outputs.append(video)
+        if show:
+            display = LatestSlot()
+            outputs.append(display)
+            self.display[camera], self._shown[camera] = (display, width, height), 0
+
+        ## step2: init the decode stage, whose output is (camera, frame_id, image)
+        ## and the image for the consumer(in the roi) is put into the latest slot first
+        def decode(carla_img):
+            from adept.envs.carla import get_raw_image
+            if roi is not None:  # only the roi is converted for the consumer
+                latest.put((camera, carla_img.frame, get_raw_image(carla_img, format=format, roi=roi)))
+                if not outputs:
+                    return None
+            item = (camera, carla_img.frame, get_raw_image(carla_img, format=format))
+            if roi is None:
+                latest.put(item)
+            return item
+
+        self.cameras[camera] = {
+            "decode": PipelineStage(camera + ".decode", decode, maxsize=self.queue_size,
+                                    drop=self.drop, outputs=outputs),
+            "video": video,
+            "latest": latest,
+        }
+        return self.listener(camera)
+
+    def show(self, delta_time=1):
+        """
+        show the latest image of each displayed camera not shown yet, which has to be called on the main thread
+        :return: the number of the images shown
+        """
+        from ._image import show_image
+
+        shown = 0
+        for camera, (display, width, height) in self.display.items():
+            count, item = display.get(with_count=True)
+            if count > self._shown[camera]:
+                show_image(item[2], window_name=camera, width=width, height=height, delta_time=delta_time)
+                self._shown[camera] = count
+                shown += 1
+        return shown
+
+    def listener(self, camera):
+        """
+        the sensor callback for the camera, which only enqueues the raw image
+        """
+        decode = self.cameras[camera]["decode"]
+        return lambda carla_img: decode.put(carla_img)
+
+    def get_latest(self, camera, wait=False, timeout=None, after=0, with_count=False):
+        """
+        :return: the latest (camera, frame_id, image) of the camera, or None if no image yet(or no newer image
+        than the {after}-th one before timeout when wait), see LatestSlot.get for {after} and {with_count}
+        """
+        return self.cameras[camera]["latest"].get(wait=wait, timeout=timeout, after=after, with_count=with_count)
+
+    def _stages(self):
+        for camera in self.cameras:
+            yield self.cameras[camera]["decode"]
+            if self.cameras[camera]["video"] is not None:
+                yield self.cameras[camera]["video"]
+
+    def start(self):
+        for stage in self._stages():
+            stage.start()
+        return self
+
+    def close(self, timeout=None):
+        for stage in self._stages():  # stop in order, so the downstream stages get the remaining items
+            stage.stop(timeout)
+
+    def stats(self):
+        return {stage.name: stage.stats() for stage in self._stages()}
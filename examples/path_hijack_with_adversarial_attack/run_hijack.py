@@ -7,17 +7,16 @@ as a controlled experiment
 # -- imports ---------------------------------------------------------------------------------------
 # ==================================================================================================
 
-from adept.envs import BaseCarlaEnv
-from adept.envs.carla import add_actor, set_weather, set_spectator, \
-    get_location_relative_to, get_rotation_relative_to, get_raw_image, \
+from adept.envs import BaseCarlaEnv, EpisodeRecorder
+from adept.envs.carla import set_weather, set_spectator, \
+    get_location_relative_to, get_rotation_relative_to, \
     CarlaVersion, WorldName, CameraAttr, SensorType, VehicleType, WeatherType, \
     ActorAddMode, TransformAddMode
 from adept.attacks import DefaultContinuousLoop, DefaultPhysicalLoop, PGDAttacker
 from adept.vehicles import ReferencePlanner, PurePursuitController, End2EndVehicle, \
     load_vehicle_model
 from adept.transforms import Point, Box2D, WorldCoordinate, img_transfer
-from adept.view import add_video_writer, save_video_frame, \
-    show_image, add_image_queue, get_image_from_queue, put_image_to_queue
+from adept.view import add_video_writer, SensorPipeline
 
 
 # ==================================================================================================
@@ -63,17 +62,17 @@ class HijackCarlaEnv(BaseCarlaEnv):
         super().__init__(root, world_name, version)
 
     def _init_actors(self):
-        ## step1: init ego vehicle
-        self.actor_map["ego"] = add_actor(
-            world=self.world, key=VehicleType.model3.value,
+        ## step1: queue the ego vehicle
+        self.batch.add_actor(
+            "ego", key=VehicleType.model3.value,
             mode=ActorAddMode.filter.value, choose=0,
             transform=0,
         )
-        ## step2: init cameras
+        ## step2: queue the cameras attached to the ego vehicle
         for camera in self.camera_info:
             info = self.camera_info[camera]
-            self.actor_map[camera] = add_actor(
-                world=self.world, key=SensorType.rgb_camera.value,
+            self.batch.add_actor(
+                camera, key=SensorType.rgb_camera.value,
                 mode=ActorAddMode.filter.value, choose=0,
                 transform=TransformAddMode.location_and_rotation,
                 x=info["x"], y=info["y"], z=info["z"],
@@ -82,8 +81,10 @@ class HijackCarlaEnv(BaseCarlaEnv):
                     CameraAttr.width.value: info["width"],
                     CameraAttr.height.value: info["height"],
                     CameraAttr.horizontal_field.value: info["fov"]
-                }, attach_to=self.actor_map["ego"], listen=info["listen"]
+                }, attach_to="ego", listen=info["listen"]
             )
+        ## step3: spawn them in batch
+        self.actor_map.update(self.batch.apply())
 
     def _init_before_actors(self):
         self.ref_path_file = ref_path_file
@@ -137,7 +138,6 @@ class HijackCarlaEnv(BaseCarlaEnv):
                 "x": 1.5, "y": 0.0, "z": 2.4,
                 "pitch": 0.0, "yaw": 0.0, "roll": 0.0,
                 "video_writer": front_writer, "video_save_path": front_save_path,
-                "queue": add_image_queue()
             },
             "back_camera": {
                 "width": 1920, "height": 1080, "fov": 110,
@@ -152,10 +152,31 @@ class HijackCarlaEnv(BaseCarlaEnv):
                 "video_writer": top_writer, "video_save_path": top_save_path
             },
         }
-        ## step3: define the camera listener
-        self.camera_info["front_camera"]["listen"] = lambda carla_img: self._front_listener(carla_img)
-        self.camera_info["back_camera"]["listen"] = lambda carla_img: self._back_listener(carla_img)
-        self.camera_info["top_camera"]["listen"] = lambda carla_img: self._top_listener(carla_img)
+        ## step3: define the camera listener, which only enqueues the raw image into the sensor pipeline
+        ## and the decoding and video encoding run on the pipeline's worker threads,
+        ## while the display is drawn on the main thread by sensor_pipeline.show()
+        self.sensor_pipeline = SensorPipeline(queue_size=2, drop="oldest")
+        self._front_count, self._front_scene = 0, None  # the count and scene of the last retrieved front image
+        for camera in self.camera_info:
+            self.camera_info[camera]["listen"] = self.sensor_pipeline.add_camera(
+                camera, video_writer=self.camera_info[camera]["video_writer"],
+                show=True, width=240, height=135,
+                roi=(75, 75 + 66, None, None) if camera == "front_camera" else None  # crop to fit the model input
+            )
+        self.sensor_pipeline.start()
+
+        ## step4: record the raw front images and the ego states losslessly for the offline replay(ReplayEnv)
+        front_info = self.camera_info["front_camera"]
+        self.recorder = EpisodeRecorder('../../outputs/episodes/hijack',
+                                        {"front_camera": (front_info["height"], front_info["width"])},
+                                        capacity=3600, step_length=0.05)
+        front_listen = front_info["listen"]
+
+        def record_and_listen(carla_img):
+            self.recorder.record_carla_image("front_camera", carla_img)
+            front_listen(carla_img)
+
+        front_info["listen"] = record_and_listen
 
     def _load_billboard_info(self):
         # TODO: use configuration file to read/write in the future
@@ -167,24 +188,10 @@ class HijackCarlaEnv(BaseCarlaEnv):
             bottom_left=Point(coord=WorldCoordinate(*[-6.9, 166.1, 2.5])),
         )
 
-    def _listener(self, carla_img, camera):
-        bgr_img = get_raw_image(carla_img)
-        if camera == "front_camera":  # put into queue for adversarial attack in the next
-            put_image_to_queue(self.camera_info[camera]["queue"], bgr_img)
-
-        save_video_frame(self.camera_info[camera]["video_writer"], frame=bgr_img)
-        show_image(bgr_img, window_name=camera, width=240, height=135)
-
-    def _front_listener(self, carla_img):
-        self._listener(carla_img, camera="front_camera")
-
-    def _back_listener(self, carla_img):
-        self._listener(carla_img, camera="back_camera")
-
-    def _top_listener(self, carla_img):
-        self._listener(carla_img, camera="top_camera")
-
     def _close_others(self):
+        ## step0: stop the sensor pipeline after the queued frames are processed, and save the recorded episode
+        self.sensor_pipeline.close()
+        self.recorder.close()
         ## step1: release all the video writers
         for camera in self.camera_info:
             info = self.camera_info[camera]
@@ -199,17 +206,29 @@ class HijackCarlaEnv(BaseCarlaEnv):
         self.conti_loop.loop()
 
     def _hold_on(self):
-        self.tick(times=30, sleep=0.05)
+        for _ in range(30):
+            self.tick(sleep=0.05)
+            self.sensor_pipeline.show()
 
     def scene_retrieve(self):
-        ## step0: retrieve image from queue
-        bgr_img = get_image_from_queue(
-            self.actor_map["front_camera"]["queue"]
-        )
-        ## step1: crop image to fit the model input
-        bgr_img = bgr_img[0:200][75:75 + 66]
-        ## step2: from bgr image to nrgb
-        return img_transfer(bgr_img, fro="bgr", to="nrgb")
+        ## step0: show the latest images on the main thread, and retrieve the image newer than
+        ## the last retrieved one from the sensor pipeline
+        self.sensor_pipeline.show()
+        count, item = self.sensor_pipeline.get_latest("front_camera", wait=True, timeout=1.0,
+                                                      after=self._front_count, with_count=True)
+        if item is None:  # timeout, reuse the last scene if any
+            if self._front_scene is None:
+                raise TimeoutError("no front camera image received in 1.0s")
+            print("~~no new front camera image in 1.0s, reuse the last one~~")
+            return self._front_scene
+        self._front_count = count
+        _, frame_id, bgr_img = item  # already cropped to fit the model input by the pipeline
+        ## record the ego state at the frame of the image, aligned with the recorded image by frame id
+        self.recorder.record_state(frame_id, self.get_snapshot().get().timestamp.elapsed_seconds,
+                                   self.vehicle.get_state())
+        ## step1: from bgr image to nrgb
+        self._front_scene = img_transfer(bgr_img, fro="bgr", to="nrgb")
+        return self._front_scene
 
     def get_ego_actor(self):
         return self.actor_map["ego"]
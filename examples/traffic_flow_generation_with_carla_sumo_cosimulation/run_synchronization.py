@@ -14,7 +14,10 @@ Script to integrate CARLA and SUMO simulations
 # ==================================================================================================
 
 import argparse
+import collections
+import contextlib
 import logging
+import threading
 import time
 
 # ==================================================================================================
@@ -46,10 +49,98 @@ else:
 # -- sumo integration imports ----------------------------------------------------------------------
 # ==================================================================================================
 
-from sumo_integration.bridge_helper import BridgeHelper  # pylint: disable=wrong-import-position
+import carla  # pylint: disable=import-error, wrong-import-position
+import numpy as np  # pylint: disable=wrong-import-position
+
 from sumo_integration.carla_simulation import CarlaSimulation  # pylint: disable=wrong-import-position
-from sumo_integration.constants import INVALID_ACTOR_ID  # pylint: disable=wrong-import-position
-from sumo_integration.sumo_simulation import SumoSimulation  # pylint: disable=wrong-import-position
+
+from adept.envs.sumo import DoubleBufferedSteps, SumoControlledActors, TickScheduler  # pylint: disable=wrong-import-position
+from adept.envs.sumo._bridge_helper import BridgeHelper  # pylint: disable=wrong-import-position
+from adept.envs.sumo._constants import INVALID_ACTOR_ID, SPAWN_OFFSET_Z  # pylint: disable=wrong-import-position
+from adept.envs.sumo._sumo_simulation import SumoSimulation  # pylint: disable=wrong-import-position
+
+# ==================================================================================================
+# -- transform arrays ------------------------------------------------------------------------------
+# ==================================================================================================
+
+# The array conversions of adept/envs/sumo/_bridge_helper.py. Only a bridge helper older than them
+# (e.g. an outdated adept checkout) has none, in which case the transforms are converted actor by
+# actor.
+_ARRAY_BRIDGE = all(
+    hasattr(BridgeHelper, name) for name in ('get_carla_transforms', 'get_sumo_transforms',
+                                             'get_transforms', 'get_apply_transform_commands'))
+
+
+def _get_transform_arrays(transforms):
+    """
+    Returns (N, 3) arrays of the locations and rotations (pitch, yaw, roll) of the given transforms.
+    """
+    locations = np.array([(t.location.x, t.location.y, t.location.z) for t in transforms],
+                         dtype=np.float64).reshape(-1, 3)
+    rotations = np.array([(t.rotation.pitch, t.rotation.yaw, t.rotation.roll) for t in transforms],
+                         dtype=np.float64).reshape(-1, 3)
+    return locations, rotations
+
+
+# ==================================================================================================
+# -- phase timer -----------------------------------------------------------------------------------
+# ==================================================================================================
+
+
+class PhaseTimer(object):
+    """
+    PhaseTimer accumulates the wall time spent in each phase of the synchronization tick.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()  # The phases may be timed from the sumo and carla steps at once.
+        self.totals = collections.defaultdict(float)
+        self.counts = collections.defaultdict(int)
+        self.maxima = collections.defaultdict(float)
+        self.last = {}
+
+    @contextlib.contextmanager
+    def __call__(self, phase):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.totals[phase] += elapsed
+                self.counts[phase] += 1
+                self.maxima[phase] = max(self.maxima[phase], elapsed)
+                self.last[phase] = elapsed
+
+    def summary(self):
+        """
+        Returns {phase: {'mean_ms', 'max_ms', 'last_ms', 'count'}} for the phases timed so far.
+        """
+        with self._lock:
+            return {
+                phase: {
+                    'mean_ms': 1000.0 * self.totals[phase] / self.counts[phase],
+                    'max_ms': 1000.0 * self.maxima[phase],
+                    'last_ms': 1000.0 * self.last[phase],
+                    'count': self.counts[phase],
+                } for phase in self.counts
+            }
+
+
+# ==================================================================================================
+# -- snapshots -------------------------------------------------------------------------------------
+# ==================================================================================================
+
+# State of the sumo actors not controlled by carla, read after the sumo tick. The arrays
+# (locations, rotations, extents) and signals are aligned with actor_ids.
+SumoSnapshot = collections.namedtuple(
+    'SumoSnapshot',
+    'spawned_actors destroyed_actors actor_ids locations rotations extents signals tl_states')
+
+# State of the carla actors not controlled by sumo, read after the carla tick. The spawned actors
+# are (carla_actor_id, sumo type_id, color, half length) tuples. The rejected actors are the sumo
+# actors without any carla blueprint, which the sumo step unsubscribes.
+CarlaSnapshot = collections.namedtuple(
+    'CarlaSnapshot', 'world_snapshot spawned_actors destroyed_actors lights tl_states rejected_actors')
 
 # ==================================================================================================
 # -- synchronization_loop --------------------------------------------------------------------------
@@ -66,7 +157,8 @@ class SimulationSynchronization(object):
                  carla_simulation,
                  tls_manager='none',
                  sync_vehicle_color=False,
-                 sync_vehicle_lights=False):
+                 sync_vehicle_lights=False,
+                 staleness=0):
 
         self.sumo = sumo_simulation
         self.carla = carla_simulation
@@ -83,10 +175,24 @@ class SimulationSynchronization(object):
         # Mapped actor ids.
         self.sumo2carla_ids = {}  # Contains only actors controlled by sumo.
         self.carla2sumo_ids = {}  # Contains only actors controlled by carla.
+        self._carla_extents = {}  # Half lengths of the actors controlled by carla.
+        self._sumo_controlled = SumoControlledActors(self.sumo.unsubscribe)  # Owned by the sumo step.
+        self._carla_controlled = frozenset()  # Copy of the carla2sumo_ids keys for the carla step.
+
+        # Double-buffered snapshots (see tick).
+        self.staleness = staleness
+        self._steps = DoubleBufferedSteps(self._sumo_step, self._carla_step, staleness)
+
+        # Wall time of each phase of the tick.
+        self.timer = PhaseTimer()
 
         BridgeHelper.blueprint_library = self.carla.world.get_blueprint_library()
         BridgeHelper.offset = self.sumo.get_net_offset()
 
+        # Traffic lights of the other side, read by each step without querying it.
+        self._sumo_traffic_light_ids = set(self.sumo.traffic_light_ids)
+        self._carla_traffic_light_ids = set(self.carla.traffic_light_ids)
+
         # Configuring carla simulation in sync mode.
         settings = self.carla.world.get_settings()
         settings.synchronous_mode = True
@@ -99,118 +205,334 @@ class SimulationSynchronization(object):
     def tick(self):
         """
         Tick to simulation synchronization
+
+        Each side is stepped by one "step" function, which applies the snapshot of the other side,
+        ticks its simulator and returns its own snapshot:
+
+            * sumo step: carla snapshot --> sumo sync, sumo tick, sumo snapshot.
+            * carla step: sumo snapshot --> carla sync, carla tick, carla snapshot.
+
+        With staleness 0 the steps run one after the other. With staleness 1 they run concurrently,
+        each one applying the snapshot of the other side from the previous tick, so that the wall
+        time of a tick drops toward the slower step instead of their sum (see DoubleBufferedSteps).
         """
-        # -----------------
-        # sumo-->carla sync
-        # -----------------
-        self.sumo.tick()
+        with self.timer('tick'):
+            self._steps.tick()
 
-        # Spawning new sumo actors in carla (i.e, not controlled by carla).
-        sumo_spawned_actors = self.sumo.spawned_actors - set(self.carla2sumo_ids.values())
-        for sumo_actor_id in sumo_spawned_actors:
-            self.sumo.subscribe(sumo_actor_id)
-            sumo_actor = self.sumo.get_actor(sumo_actor_id)
+    # -----------------
+    # sumo step
+    # -----------------
 
-            carla_blueprint = BridgeHelper.get_carla_blueprint(sumo_actor, self.sync_vehicle_color)
-            if carla_blueprint is not None:
-                carla_transform = BridgeHelper.get_carla_transform(sumo_actor.transform,
-                                                                   sumo_actor.extent)
+    def _sumo_step(self, carla_snapshot):
+        """
+        Applies the carla snapshot to sumo, ticks sumo and returns the sumo snapshot.
 
-                carla_actor_id = self.carla.spawn_actor(carla_blueprint, carla_transform)
-                if carla_actor_id != INVALID_ACTOR_ID:
-                    self.sumo2carla_ids[sumo_actor_id] = carla_actor_id
-            else:
-                self.sumo.unsubscribe(sumo_actor_id)
+        Only this step uses traci and modifies carla2sumo_ids.
+        """
+        if carla_snapshot is not None:
+            self._sync_carla_in_sumo(carla_snapshot)
 
-        # Destroying sumo arrived actors in carla.
-        for sumo_actor_id in self.sumo.destroyed_actors:
-            if sumo_actor_id in self.sumo2carla_ids:
-                self.carla.destroy_actor(self.sumo2carla_ids.pop(sumo_actor_id))
+        with self.timer('sumo.tick'):
+            self.sumo.tick()
 
-        # Updating sumo actors in carla.
-        for sumo_actor_id in self.sumo2carla_ids:
-            carla_actor_id = self.sumo2carla_ids[sumo_actor_id]
+        with self.timer('sumo.snapshot'):
+            return self._get_sumo_snapshot()
 
-            sumo_actor = self.sumo.get_actor(sumo_actor_id)
-            carla_actor = self.carla.get_actor(carla_actor_id)
+    def _get_sumo_snapshot(self):
+        """
+        Returns the snapshot of the sumo actors not controlled by carla.
+        """
+        carla_controlled = set(self.carla2sumo_ids.values())
+        spawned_actors = {}
+        for sumo_actor_id in self.sumo.spawned_actors - carla_controlled:
+            self.sumo.subscribe(sumo_actor_id)
+            spawned_actors[sumo_actor_id] = self.sumo.get_actor(sumo_actor_id)
 
-            carla_transform = BridgeHelper.get_carla_transform(sumo_actor.transform,
-                                                               sumo_actor.extent)
-            if self.sync_vehicle_lights:
-                carla_lights = BridgeHelper.get_carla_lights_state(carla_actor.get_light_state(),
-                                                                   sumo_actor.signals)
-            else:
-                carla_lights = None
+        self._sumo_controlled.update(spawned_actors, self.sumo.destroyed_actors)
+        self._carla_controlled = frozenset(self.carla2sumo_ids)  # Read by the carla step.
 
-            self.carla.synchronize_vehicle(carla_actor_id, carla_transform, carla_lights)
+        sumo_actor_ids = list(self._sumo_controlled)
+        if sumo_actor_ids:
+            locations, rotations, extents, signals = self._get_sumo_states(sumo_actor_ids)
+        else:
+            locations = rotations = extents = np.zeros((0, 3))
+            signals = []
 
-        # Updates traffic lights in carla based on sumo information.
+        tl_states = {}
         if self.tls_manager == 'sumo':
-            common_landmarks = self.sumo.traffic_light_ids & self.carla.traffic_light_ids
-            for landmark_id in common_landmarks:
-                sumo_tl_state = self.sumo.get_traffic_light_state(landmark_id)
-                carla_tl_state = BridgeHelper.get_carla_traffic_light_state(sumo_tl_state)
+            for landmark_id in self.sumo.traffic_light_ids & self._carla_traffic_light_ids:
+                tl_states[landmark_id] = self.sumo.get_traffic_light_state(landmark_id)
 
-                self.carla.synchronize_traffic_light(landmark_id, carla_tl_state)
+        return SumoSnapshot(spawned_actors, set(self.sumo.destroyed_actors), sumo_actor_ids, locations,
+                            rotations, extents, signals, tl_states)
 
-        # -----------------
-        # carla-->sumo sync
-        # -----------------
-        self.carla.tick()
+    def _get_sumo_states(self, sumo_actor_ids):
+        """
+        Returns the (N, 3) locations, rotations and extents of the given sumo actors, read from the
+        bulk vehicle states of sumo if available.
+        """
+        vehicle_states = getattr(self.sumo, 'vehicle_states', None)
+        if vehicle_states is not None:
+            rows = [vehicle_states.index.get(sumo_actor_id) for sumo_actor_id in sumo_actor_ids]
+            if None not in rows:
+                rows = np.array(rows, dtype=np.int64)
+                return (vehicle_states.locations[rows], vehicle_states.rotations[rows],
+                        vehicle_states.extents[rows], vehicle_states.signals[rows].tolist())
+
+        sumo_actors = [self.sumo.get_actor(sumo_actor_id) for sumo_actor_id in sumo_actor_ids]
+        locations, rotations = _get_transform_arrays([sumo_actor.transform for sumo_actor in sumo_actors])
+        extents = np.array([(a.extent.x, a.extent.y, a.extent.z) for a in sumo_actors],
+                           dtype=np.float64).reshape(-1, 3)
+        return locations, rotations, extents, [sumo_actor.signals for sumo_actor in sumo_actors]
+
+    def _sync_carla_in_sumo(self, carla_snapshot):
+        """
+        Spawns, destroys and moves the sumo actors controlled by carla, based on the carla snapshot.
+        """
+        # Unsubscribing the sumo actors which carla could not spawn.
+        self._sumo_controlled.reject(carla_snapshot.rejected_actors)
 
         # Spawning new carla actors (not controlled by sumo)
-        carla_spawned_actors = self.carla.spawned_actors - set(self.sumo2carla_ids.values())
-        for carla_actor_id in carla_spawned_actors:
-            carla_actor = self.carla.get_actor(carla_actor_id)
-
-            type_id = BridgeHelper.get_sumo_vtype(carla_actor)
-            color = carla_actor.attributes.get('color', None) if self.sync_vehicle_color else None
-            if type_id is not None:
+        with self.timer('sumo.spawn'):
+            for carla_actor_id, type_id, color, extent in carla_snapshot.spawned_actors:
+                if carla_actor_id in self.carla2sumo_ids:
+                    continue
                 sumo_actor_id = self.sumo.spawn_actor(type_id, color)
                 if sumo_actor_id != INVALID_ACTOR_ID:
                     self.carla2sumo_ids[carla_actor_id] = sumo_actor_id
+                    self._carla_extents[carla_actor_id] = extent
                     self.sumo.subscribe(sumo_actor_id)
 
         # Destroying required carla actors in sumo.
-        for carla_actor_id in self.carla.destroyed_actors:
-            if carla_actor_id in self.carla2sumo_ids:
-                self.sumo.destroy_actor(self.carla2sumo_ids.pop(carla_actor_id))
+        with self.timer('sumo.destroy'):
+            for carla_actor_id in carla_snapshot.destroyed_actors:
+                if carla_actor_id in self.carla2sumo_ids:
+                    self.sumo.destroy_actor(self.carla2sumo_ids.pop(carla_actor_id))
+                    self._carla_extents.pop(carla_actor_id, None)
 
         # Updating carla actors in sumo.
-        for carla_actor_id in self.carla2sumo_ids:
-            sumo_actor_id = self.carla2sumo_ids[carla_actor_id]
+        with self.timer('sumo.update'):
+            self._update_carla_actors_in_sumo(carla_snapshot)
 
-            carla_actor = self.carla.get_actor(carla_actor_id)
-            sumo_actor = self.sumo.get_actor(sumo_actor_id)
+        # Updates traffic lights in sumo based on carla information.
+        if self.tls_manager == 'carla':
+            with self.timer('sumo.traffic_lights'):
+                for landmark_id, carla_tl_state in carla_snapshot.tl_states.items():
+                    sumo_tl_state = BridgeHelper.get_sumo_traffic_light_state(carla_tl_state)
 
-            sumo_transform = BridgeHelper.get_sumo_transform(carla_actor.get_transform(),
-                                                             carla_actor.bounding_box.extent)
-            if self.sync_vehicle_lights:
-                carla_lights = self.carla.get_actor_light_state(carla_actor_id)
-                if carla_lights is not None:
-                    sumo_lights = BridgeHelper.get_sumo_lights_state(sumo_actor.signals,
-                                                                     carla_lights)
-                else:
-                    sumo_lights = None
+                    # Updates all the sumo links related to this landmark.
+                    self.sumo.synchronize_traffic_light(landmark_id, sumo_tl_state)
+
+    def _update_carla_actors_in_sumo(self, carla_snapshot):
+        """
+        Moves the sumo actors controlled by carla, converted from the carla transforms of the world
+        snapshot in one numpy pass (or one by one without the array conversions).
+        """
+        carla_actor_ids, transforms = [], []
+        for carla_actor_id in self.carla2sumo_ids:
+            actor_snapshot = carla_snapshot.world_snapshot.find(carla_actor_id)
+            if actor_snapshot is not None:
+                carla_actor_ids.append(carla_actor_id)
+                transforms.append(actor_snapshot.get_transform())
+        if not carla_actor_ids:
+            return
+
+        extents = [self._carla_extents.get(carla_actor_id, 0.0) for carla_actor_id in carla_actor_ids]
+        if _ARRAY_BRIDGE:
+            locations, rotations = _get_transform_arrays(transforms)
+            locations, rotations = BridgeHelper.get_sumo_transforms(locations, rotations,
+                                                                    np.array(extents, dtype=np.float64))
+            sumo_transforms = BridgeHelper.get_transforms(locations, rotations)
+        else:
+            sumo_transforms = [
+                BridgeHelper.get_sumo_transform(transform, carla.Vector3D(extent, 0.0, 0.0))
+                for transform, extent in zip(transforms, extents)
+            ]
+
+        for carla_actor_id, sumo_transform in zip(carla_actor_ids, sumo_transforms):
+            sumo_actor_id = self.carla2sumo_ids[carla_actor_id]
+            carla_lights = carla_snapshot.lights.get(carla_actor_id)
+            if carla_lights is not None:
+                sumo_actor = self.sumo.get_actor(sumo_actor_id)
+                sumo_lights = BridgeHelper.get_sumo_lights_state(sumo_actor.signals, carla_lights)
             else:
                 sumo_lights = None
 
             self.sumo.synchronize_vehicle(sumo_actor_id, sumo_transform, sumo_lights)
 
-        # Updates traffic lights in sumo based on carla information.
+    # -----------------
+    # carla step
+    # -----------------
+
+    def _carla_step(self, sumo_snapshot):
+        """
+        Applies the sumo snapshot to carla, ticks carla and returns the carla snapshot.
+
+        Only this step uses the carla client and modifies sumo2carla_ids.
+        """
+        rejected_actors = self._sync_sumo_in_carla(sumo_snapshot) if sumo_snapshot is not None else []
+
+        with self.timer('carla.tick'):
+            self.carla.tick()
+
+        with self.timer('carla.snapshot'):
+            return self._get_carla_snapshot(rejected_actors)
+
+    def _get_carla_snapshot(self, rejected_actors):
+        """
+        Returns the snapshot of the carla actors not controlled by sumo, passing on the sumo actors
+        rejected by the sync.
+        """
+        world_snapshot = self.carla.world.get_snapshot()
+
+        spawned_actors = []
+        carla_spawned_actors = list(self.carla.spawned_actors - set(self.sumo2carla_ids.values()))
+        if carla_spawned_actors:
+            for carla_actor in self.carla.world.get_actors(carla_spawned_actors):
+                type_id = BridgeHelper.get_sumo_vtype(carla_actor)
+                color = carla_actor.attributes.get('color', None) if self.sync_vehicle_color else None
+                if type_id is not None:
+                    spawned_actors.append(
+                        (carla_actor.id, type_id, color, carla_actor.bounding_box.extent.x))
+
+        lights = {}
+        if self.sync_vehicle_lights:
+            for carla_actor_id in self._carla_controlled:
+                carla_lights = self.carla.get_actor_light_state(carla_actor_id)
+                if carla_lights is not None:
+                    lights[carla_actor_id] = carla_lights
+
+        tl_states = {}
         if self.tls_manager == 'carla':
-            common_landmarks = self.sumo.traffic_light_ids & self.carla.traffic_light_ids
-            for landmark_id in common_landmarks:
-                carla_tl_state = self.carla.get_traffic_light_state(landmark_id)
-                sumo_tl_state = BridgeHelper.get_sumo_traffic_light_state(carla_tl_state)
+            for landmark_id in self._sumo_traffic_light_ids & self.carla.traffic_light_ids:
+                tl_states[landmark_id] = self.carla.get_traffic_light_state(landmark_id)
+
+        return CarlaSnapshot(world_snapshot, spawned_actors, set(self.carla.destroyed_actors), lights,
+                             tl_states, rejected_actors)
+
+    def _sync_sumo_in_carla(self, sumo_snapshot):
+        """
+        Spawns, destroys and moves the carla actors controlled by sumo, based on the sumo snapshot.
+
+        The new actors are spawned with one synchronous batch of commands, and the others are
+        destroyed, moved and have their lights set with one asynchronous batch. Returns the sumo
+        actors without any carla blueprint.
+        """
+        # Spawning new sumo actors in carla (i.e, not controlled by carla).
+        with self.timer('carla.spawn'):
+            rejected_actors = self._spawn_sumo_actors_in_carla(sumo_snapshot.spawned_actors)
+
+        # Destroying sumo arrived actors and updating sumo actors in carla.
+        with self.timer('carla.update'):
+            commands = [
+                carla.command.DestroyActor(self.sumo2carla_ids.pop(sumo_actor_id))
+                for sumo_actor_id in sumo_snapshot.destroyed_actors
+                if sumo_actor_id in self.sumo2carla_ids
+            ]
+            commands.extend(self._get_carla_update_commands(sumo_snapshot))
+            if commands:
+                self.carla.client.apply_batch(commands)
+
+        # Updates traffic lights in carla based on sumo information.
+        if self.tls_manager == 'sumo':
+            with self.timer('carla.traffic_lights'):
+                for landmark_id, sumo_tl_state in sumo_snapshot.tl_states.items():
+                    carla_tl_state = BridgeHelper.get_carla_traffic_light_state(sumo_tl_state)
 
-                # Updates all the sumo links related to this landmark.
-                self.sumo.synchronize_traffic_light(landmark_id, sumo_tl_state)
+                    self.carla.synchronize_traffic_light(landmark_id, carla_tl_state)
+
+        return rejected_actors
+
+    def _spawn_sumo_actors_in_carla(self, sumo_actors):
+        """
+        Spawns the given sumo actors ({sumo_actor_id: SumoActor}) in carla with one synchronous batch
+        of SpawnActor commands, and returns the ones without any carla blueprint. These are
+        unsubscribed by the sumo step, as traci belongs to it.
+        """
+        sumo_actor_ids, commands, rejected_actors = [], [], []
+        for sumo_actor_id, sumo_actor in sumo_actors.items():
+            carla_blueprint = BridgeHelper.get_carla_blueprint(sumo_actor, self.sync_vehicle_color)
+            if carla_blueprint is None:
+                rejected_actors.append(sumo_actor_id)
+                continue
+
+            carla_transform = BridgeHelper.get_carla_transform(sumo_actor.transform,
+                                                               sumo_actor.extent)
+            carla_transform = carla.Transform(
+                carla_transform.location + carla.Location(0, 0, SPAWN_OFFSET_Z),
+                carla_transform.rotation)
+            sumo_actor_ids.append(sumo_actor_id)
+            commands.append(
+                carla.command.SpawnActor(carla_blueprint, carla_transform).then(
+                    carla.command.SetSimulatePhysics(carla.command.FutureActor, False)))
+
+        if not commands:
+            return rejected_actors
+        for sumo_actor_id, response in zip(sumo_actor_ids,
+                                           self.carla.client.apply_batch_sync(commands, False)):
+            if response.error:
+                logging.error('Spawn carla actor failed. %s', response.error)
+            else:
+                self.sumo2carla_ids[sumo_actor_id] = response.actor_id
+        return rejected_actors
+
+    def _get_carla_update_commands(self, sumo_snapshot):
+        """
+        Returns the ApplyTransform (and SetVehicleLightState) commands moving the carla actors
+        controlled by sumo, converted from the sumo snapshot in one numpy pass (or one by one
+        without the array conversions).
+        """
+        rows = [row for row, sumo_actor_id in enumerate(sumo_snapshot.actor_ids)
+                if sumo_actor_id in self.sumo2carla_ids]
+        if not rows:
+            return []
+        carla_actor_ids = [self.sumo2carla_ids[sumo_snapshot.actor_ids[row]] for row in rows]
+
+        if _ARRAY_BRIDGE:
+            locations, rotations = BridgeHelper.get_carla_transforms(sumo_snapshot.locations[rows],
+                                                                     sumo_snapshot.rotations[rows],
+                                                                     sumo_snapshot.extents[rows])
+            commands = BridgeHelper.get_apply_transform_commands(carla_actor_ids, locations, rotations)
+        else:
+            commands = []
+            for carla_actor_id, row in zip(carla_actor_ids, rows):
+                (x, y, z), (pitch, yaw, roll) = (sumo_snapshot.locations[row].tolist(),
+                                                 sumo_snapshot.rotations[row].tolist())
+                sumo_transform = carla.Transform(carla.Location(x, y, z), carla.Rotation(pitch, yaw, roll))
+                carla_transform = BridgeHelper.get_carla_transform(
+                    sumo_transform, carla.Vector3D(*sumo_snapshot.extents[row].tolist()))
+                commands.append(carla.command.ApplyTransform(carla_actor_id, carla_transform))
+
+        if self.sync_vehicle_lights:
+            carla_actors = {actor.id: actor for actor in self.carla.world.get_actors(carla_actor_ids)}
+            for carla_actor_id, row in zip(carla_actor_ids, rows):
+                carla_actor = carla_actors.get(carla_actor_id)
+                if carla_actor is None:
+                    continue
+                current_lights = carla_actor.get_light_state()
+                carla_lights = BridgeHelper.get_carla_lights_state(current_lights,
+                                                                   sumo_snapshot.signals[row])
+                if carla_lights != current_lights:
+                    commands.append(carla.command.SetVehicleLightState(carla_actor_id, carla_lights))
+
+        return commands
+
+    def set_rendering(self, enabled):
+        """
+        Switches the carla rendering on or off, e.g. off while the loop catches up.
+        """
+        settings = self.carla.world.get_settings()
+        if settings.no_rendering_mode != (not enabled):
+            settings.no_rendering_mode = not enabled
+            self.carla.world.apply_settings(settings)
 
     def close(self):
         """
         Cleans synchronization.
         """
+        self._steps.close()
+        self.set_rendering(True)
+
         # Configuring carla simulation in async mode.
         settings = self.carla.world.get_settings()
         settings.synchronous_mode = False
@@ -218,8 +540,8 @@ class SimulationSynchronization(object):
         self.carla.world.apply_settings(settings)
 
         # Destroying synchronized actors.
-        for carla_actor_id in self.sumo2carla_ids.values():
-            self.carla.destroy_actor(carla_actor_id)
+        self.carla.client.apply_batch_sync(
+            [carla.command.DestroyActor(carla_actor_id) for carla_actor_id in self.sumo2carla_ids.values()])
 
         for sumo_actor_id in self.carla2sumo_ids.values():
             self.sumo.destroy_actor(sumo_actor_id)
@@ -233,27 +555,39 @@ def synchronization_loop(args):
     """
     Entry point for sumo-carla co-simulation.
     """
+    if _ARRAY_BRIDGE:
+        logging.info('Converting the transforms in numpy arrays (%s)', BridgeHelper.__module__)
+    else:
+        logging.warning('The bridge helper of %s has no array conversions, converting the transforms '
+                        'actor by actor', BridgeHelper.__module__)
+
     sumo_simulation = SumoSimulation(args.sumo_cfg_file, args.step_length, args.sumo_host,
-                                     args.sumo_port, args.sumo_gui, args.client_order)
+                                     args.sumo_port, args.sumo_gui, args.client_order, args.sumo_bulk)
     carla_simulation = CarlaSimulation(args.carla_host, args.carla_port, args.step_length)
 
     synchronization = SimulationSynchronization(sumo_simulation, carla_simulation, args.tls_manager,
-                                                args.sync_vehicle_color, args.sync_vehicle_lights)
+                                                args.sync_vehicle_color, args.sync_vehicle_lights,
+                                                args.staleness)
+    scheduler = TickScheduler(args.step_length,
+                              realtime=args.pacing == 'realtime',
+                              catch_up=args.catch_up,
+                              on_lag=(lambda lagging: synchronization.set_rendering(not lagging))
+                              if args.skip_rendering else None)
     try:
-        while True:
-            start = time.time()
-
-            synchronization.tick()
-
-            end = time.time()
-            elapsed = end - start
-            if elapsed < args.step_length:
-                time.sleep(args.step_length - elapsed)
+        scheduler.run(synchronization.tick, args.max_ticks)
 
     except KeyboardInterrupt:
         logging.info('Cancelled by user.')
 
     finally:
+        metrics = scheduler.metrics()
+        logging.info('%d ticks in %.2f s (%.2fx real time), drift %.3f s (max %.3f s), '
+                     '%d overruns, %d skipped, %d realigned', metrics['ticks'], metrics['wall_time'],
+                     metrics['realtime_factor'], metrics['drift'], metrics['max_drift'],
+                     metrics['overruns'], metrics['skipped'], metrics['realigned'])
+        logging.info('overrun histogram: %s', metrics['overrun_histogram'])
+        for phase, timing in synchronization.timer.summary().items():
+            logging.info('%s: mean %.2f ms, max %.2f ms', phase, timing['mean_ms'], timing['max_ms'])
         logging.info('Cleaning synchronization')
 
         synchronization.close()
@@ -281,6 +615,10 @@ if __name__ == '__main__':
                            type=int,
                            help='TCP port to listen to (default: 8813)')
     argparser.add_argument('--sumo-gui', action='store_true', help='run the gui version of sumo')
+    argparser.add_argument('--sumo-bulk',
+                           action='store_true',
+                           help='read the states of all the sumo vehicles in bulk by one context '
+                           'subscription (default: False)')
     argparser.add_argument('--step-length',
                            default=0.05,
                            type=float,
@@ -304,6 +642,30 @@ if __name__ == '__main__':
                            choices=['none', 'sumo', 'carla'],
                            help="select traffic light manager (default: none)",
                            default='none')
+    argparser.add_argument('--staleness',
+                           type=int,
+                           choices=[0, 1],
+                           default=0,
+                           help='steps by which each simulator may lag the other, 1 to step sumo and '
+                           'carla concurrently (default: 0)')
+    argparser.add_argument('--pacing',
+                           type=str,
+                           choices=['realtime', 'fast'],
+                           default='realtime',
+                           help='pace the ticks in real time, or as fast as possible (default: realtime)')
+    argparser.add_argument('--catch-up',
+                           type=str,
+                           choices=['none', 'burst', 'skip'],
+                           default='none',
+                           help='policy when a real-time tick overruns: realign, tick back to back '
+                           'until caught up, or skip the missed frames (default: none)')
+    argparser.add_argument('--skip-rendering',
+                           action='store_true',
+                           help='switch off carla rendering while the loop lags behind (default: False)')
+    argparser.add_argument('--max-ticks',
+                           type=int,
+                           default=None,
+                           help='stop after the given number of ticks (default: run forever)')
     argparser.add_argument('--debug', action='store_true', help='enable debug messages')
     arguments = argparser.parse_args()
 
@@ -0,0 +1,58 @@
+import unittest
+import torch
+from adept.attacks import FGSMAttacker, PGDAttacker
+
+
+class SumModel(torch.nn.Module):
+    """
+    the model summing the inputs, which counts the rows of each forward pass
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.weight = torch.nn.Parameter(torch.ones(1), requires_grad=False)
+        self.rows = []
+
+    def forward(self, x):
+        self.rows.append(x.shape[0])
+        return (x * self.weight).flatten(1).sum(1, keepdim=True)
+
+
+class PGDAttackerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.model = SumModel()
+        self.x = torch.full((2, 4), 0.5)
+
+    def test_finished_samples_leave_the_batch(self):
+        attacker = PGDAttacker(self.model, epsilon=0.1, alpha=0.025, max_iter=10, tolerance=1e-4)
+        done, perb = attacker.attack(self.x, torch.tensor([2.0, 2.2]))
+        self.assertTrue(done)
+        self.assertEqual(self.model.rows, [2, 1, 1])  # the first sample succeeds without perturbation
+        self.assertTrue(torch.equal(perb[0], torch.zeros(4)))
+        torch.testing.assert_close(perb[1], torch.full((4,), 0.05))
+
+    def test_unreachable_target(self):
+        attacker = PGDAttacker(self.model, epsilon=0.1, alpha=0.05, max_iter=5, restarts=3, tolerance=1e-4)
+        done, perb = attacker.attack(self.x, torch.tensor([3.0, 1.0]))
+        self.assertFalse(done)
+        self.assertEqual(self.model.rows, [6] * 6)  # all the restarts of both samples, max_iter + 1 passes
+        torch.testing.assert_close(perb, torch.tensor([[0.1] * 4, [-0.1] * 4]))
+
+    def test_mask(self):
+        mask = torch.tensor([1.0, 1.0, 0.0, 0.0])
+        attacker = PGDAttacker(self.model, epsilon=0.1, alpha=0.05, max_iter=5, tolerance=1e-4)
+        _, perb = attacker.attack(self.x, 3.0, mask=mask)
+        torch.testing.assert_close(perb, torch.tensor([[0.1, 0.1, 0.0, 0.0]] * 2))
+
+
+class FGSMAttackerTestCase(unittest.TestCase):
+    def test_single_step(self):
+        model = SumModel()
+        done, perb = FGSMAttacker(model, epsilon=0.05, tolerance=1e-4).attack(torch.full((1, 4), 0.5), 2.2)
+        self.assertTrue(done)
+        self.assertEqual(model.rows, [1, 1])  # one step, then the evaluation
+        torch.testing.assert_close(perb, torch.full((1, 4), 0.05))
+
+
+if __name__ == '__main__':
+    unittest.main()
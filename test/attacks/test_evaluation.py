@@ -0,0 +1,42 @@
+import unittest
+import numpy as np
+from adept.attacks import HijackEvaluator
+from adept.transforms import SamplePath2D
+
+
+def make_states(y, dt=0.1):
+    n = len(y)
+    states = np.zeros((n, 10))
+    states[:, 0] = np.arange(n) * dt  # time
+    states[:, 1], states[:, 2] = np.linspace(0, 50, n), y  # x, y
+    return states
+
+
+class HijackEvaluatorTestCase(unittest.TestCase):
+    def setUp(self):
+        self.path = SamplePath2D(np.stack([np.linspace(0, 100, 1001), np.zeros(1001)], axis=1))
+        self.evaluator = HijackEvaluator(self.path, departure=1.5, side=1, processes=0)
+
+    def test_left_handed_lateral(self):
+        ## in CARLA, +y is on the right when driving along +x
+        result = self.evaluator.evaluate(make_states(np.linspace(0, -3, 31)))
+        self.assertTrue(result["success"])
+        self.assertAlmostEqual(result["time_to_departure"], 1.6)
+        self.assertAlmostEqual(result["max_lateral"], 3.0)
+        np.testing.assert_allclose(result["lateral"], np.linspace(0, 3, 31), atol=1e-12)
+        self.assertFalse(self.evaluator.evaluate(make_states(np.linspace(0, 3, 31)))["success"])
+        right_handed = HijackEvaluator(self.path, side=1, left_handed=False)
+        self.assertTrue(right_handed.evaluate(make_states(np.linspace(0, 3, 31)))["success"])
+
+    def test_evaluate_all_in_workers(self):
+        episodes = [make_states(np.full(11, -float(k))) for k in range(4)]
+        local, summary = self.evaluator.evaluate_all(episodes)
+        self.evaluator.processes = 2
+        results, parallel = self.evaluator.evaluate_all(episodes)
+        self.assertEqual(summary, parallel)
+        self.assertEqual([result["success"] for result in results], [False, False, True, True])
+        self.assertAlmostEqual(summary["success_rate"], 0.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
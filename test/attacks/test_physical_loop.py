@@ -0,0 +1,198 @@
+import unittest
+import numpy as np
+import torch
+from adept.attacks import PhysicalLoop, DefaultPhysicalLoop, PGDAttacker
+from adept.transforms import Coordinate2D, Point, Box2D
+
+
+class SumModel(torch.nn.Module):
+    """
+    the model summing the inputs, which counts the forward passes
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.weight = torch.nn.Parameter(torch.ones(1), requires_grad=False)
+        self.calls = 0
+
+    def forward(self, x):
+        self.calls += 1
+        return (x * self.weight).flatten(1).sum(1, keepdim=True)
+
+
+class ArrayPhysicalLoop(PhysicalLoop):
+    """
+    the physical loop on (1,H,W,C) float scenes, with identity sensor and physics and a fixed target box
+    """
+
+    def __init__(self, attacker, box, **kwargs):
+        super().__init__(vehicle=None, attacker=attacker, **kwargs)
+        self.box = box
+        self.captures = 0
+
+    def inner_loop_failed(self):
+        return self.attacker.attack_failed()
+
+    def inner_loop_succeeded(self):
+        return self.attacker.attack_succeeded()
+
+    def inner_loop_update(self):
+        self.attacker.attack_update()
+
+    def sensor_capture(self, phys_scene):
+        self.captures += 1
+        return phys_scene + 0.01  # a brightness offset, which the residual of the proxy models exactly
+
+    def mask_target_generate(self, scene):
+        mask = np.zeros(scene.shape[1:3], dtype=bool)
+        mask[self.box] = True
+        return mask
+
+    def region_extract(self, scene, mask):
+        return scene * mask[..., np.newaxis]
+
+    def mask_adv_generate(self, scene):
+        return np.any(scene != 0, axis=(0, -1))[..., np.newaxis]
+
+    def dig_replace(self, dig_scene, adv_target, mask):
+        return np.where(mask[..., np.newaxis], adv_target, dig_scene)
+
+    def phys_replace(self, dig_scene):
+        return dig_scene
+
+    def perb_apply(self, target, mask, perb):
+        return target + perb.numpy() * mask
+
+
+class RecordingPhysicalLoop(ArrayPhysicalLoop):
+    """
+    the physical loop recording the scenes handed to perb_optimize, and their copies at the time
+    """
+
+    def __init__(self, attacker, box, **kwargs):
+        super().__init__(attacker, box, **kwargs)
+        self.scenes, self.copies = [], []
+
+    def perb_optimize(self, adv_dig_scene, target_output):
+        self.scenes.append(adv_dig_scene)
+        self.copies.append(adv_dig_scene.copy())
+        return super().perb_optimize(adv_dig_scene, target_output)
+
+
+class BoxPhysicalLoop(DefaultPhysicalLoop):
+    """
+    the default physical loop with the perspective target box given frame by frame
+    """
+
+    def __init__(self):
+        super().__init__(vehicle=None, attacker=None, target_box=None)
+        self.pixel_box = None
+
+    def _get_perspective_target_box(self):
+        if self.pixel_box is None:
+            return None
+        x0, y0, x1, y1 = self.pixel_box
+        return Box2D(*[Point(Coordinate2D(x, y)) for x, y in [(x0, y0), (x1, y0), (x1, y1), (x0, y1)]])
+
+
+class PhysicalLoopTestCase(unittest.TestCase):
+    def setUp(self):
+        self.model = SumModel()
+        self.scene = np.full((1, 4, 4, 1), 0.5)
+        self.box = (slice(1, 3), slice(1, 3))
+
+    def test_perturbation_round(self):
+        attacker = PGDAttacker(self.model, epsilon=0.2, alpha=0.05, max_iter=10, tolerance=1e-4)
+        loop = ArrayPhysicalLoop(attacker, self.box)
+        adv_scene = loop.loop(self.scene, np.array([8.72]))  # 8 + 2 * 0.16 offsets + 4 pixels * 0.05 * 2 steps
+
+        self.assertTrue(attacker.attack_succeeded())
+        self.assertEqual((self.model.calls, loop.captures), (3, 4))  # 3 optimizing rounds + the last scene
+        expected = self.scene + 0.01
+        expected[0, 1:3, 1:3] += 0.1
+        np.testing.assert_allclose(adv_scene, expected, atol=1e-6)
+        torch.testing.assert_close(attacker.attack_retrieve()[0, 1:3, 1:3], torch.full((2, 2, 1), 0.1))
+
+    def test_unreachable_target(self):
+        attacker = PGDAttacker(self.model, epsilon=0.1, alpha=0.05, max_iter=4, tolerance=1e-4)
+        adv_scene = ArrayPhysicalLoop(attacker, self.box).loop(self.scene, 10.0)
+
+        self.assertFalse(attacker.attack_succeeded())
+        self.assertEqual(self.model.calls, 5)  # max_iter steps + the last evaluation
+        self.assertAlmostEqual(float(adv_scene.sum()), 8.56, places=5)  # 8 + 0.16 offset + 0.4, clipped to the epsilon-ball
+
+    def run_loop(self, **kwargs):
+        attacker = PGDAttacker(SumModel(), epsilon=0.2, alpha=0.01, max_iter=8, tolerance=1e-4)
+        loop = RecordingPhysicalLoop(attacker, self.box, **kwargs)
+        scene = self.scene.copy()
+        scene[0, 2, 1] = 0.0  # the target is not uniform
+        adv_scene = loop.loop(scene, 10.0)
+        return loop, adv_scene
+
+    def test_incremental_matches_full(self):
+        full, full_scene = self.run_loop()
+        for capture_every in (1, 3):
+            loop, adv_scene = self.run_loop(incremental=True, capture_every=capture_every)
+            self.assertEqual(len(loop.scenes), len(full.scenes))
+            for scene, expected in zip(loop.scenes, full.scenes):
+                np.testing.assert_allclose(scene, expected, atol=1e-6)
+            np.testing.assert_allclose(adv_scene, full_scene, atol=1e-6)
+            ## 1st capture + real captures every {capture_every} inner loops
+            self.assertEqual(loop.captures, 1 + (len(loop.scenes) + capture_every - 1) // capture_every)
+
+    def test_handed_out_scenes_are_not_mutated(self):
+        loop, _ = self.run_loop(incremental=True, capture_every=3)
+        for scene, copy in zip(loop.scenes, loop.copies):
+            np.testing.assert_array_equal(scene, copy)
+
+
+class DefaultPhysicalLoopTestCase(unittest.TestCase):
+    def setUp(self):
+        self.loop = BoxPhysicalLoop()
+        rng = np.random.default_rng(0)
+        self.scenes = rng.integers(1, 256, (2, 6, 8, 3), dtype=np.uint8)
+
+    def extract(self, scene, pixel_box):
+        self.loop.pixel_box = pixel_box
+        target_mask, bgr_mask = self.loop.mask_target_generate(scene)
+        target = self.loop.region_extract(scene, (target_mask, bgr_mask))
+        return target_mask, bgr_mask, target, self.loop.mask_adv_generate(target)
+
+    def check_frame(self, frame, scene, rows, cols):
+        target_mask, bgr_mask, target, adv_mask = frame
+        expected = np.zeros(scene.shape[:2], dtype=bool)
+        expected[rows, cols] = True
+        np.testing.assert_array_equal(target_mask, expected)
+        np.testing.assert_array_equal(bgr_mask, ~expected)
+        np.testing.assert_array_equal(adv_mask, expected)
+        np.testing.assert_array_equal(target, scene * expected[..., np.newaxis])
+
+    def test_buffers_reused_across_frames(self):
+        first = self.extract(self.scenes[0], (1, 1, 4, 3))
+        self.check_frame(first, self.scenes[0], slice(1, 4), slice(1, 5))
+        first_copy = [x.copy() for x in first]
+
+        second = self.extract(self.scenes[1], (5, 2, 7, 5))
+        self.check_frame(second, self.scenes[1], slice(2, 6), slice(5, 8))
+        ## the arrays of the first frame are overwritten by the second one
+        for old, new, old_copy in zip(first, second, first_copy):
+            self.assertTrue(np.shares_memory(old, new))
+            np.testing.assert_array_equal(old, new)
+            self.assertFalse(np.array_equal(old, old_copy))
+
+    def test_target_out_of_view(self):
+        self.extract(self.scenes[0], (1, 1, 4, 3))
+        target_mask, bgr_mask, target, adv_mask = self.extract(self.scenes[1], None)
+        self.assertFalse(target_mask.any() or adv_mask.any() or target.any())
+        self.assertTrue(bgr_mask.all())
+
+    def test_buffers_follow_the_frame_shape(self):
+        self.extract(self.scenes[0], (1, 1, 4, 3))
+        scene = self.scenes[1, :4, :5].astype(np.float32)
+        frame = self.extract(scene, (0, 0, 2, 2))
+        self.check_frame(frame, scene, slice(0, 3), slice(0, 3))
+        self.assertEqual(frame[2].dtype, np.float32)
+
+
+if __name__ == '__main__':
+    unittest.main()
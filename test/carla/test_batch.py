@@ -0,0 +1,142 @@
+import sys
+import types
+import unittest
+from collections import namedtuple
+from unittest import mock
+import torch
+from adept.envs import BaseCarlaEnv
+from adept.envs.carla import CommandBatch, SnapshotCache
+from adept.transforms import WorldCoordinate, EulerAngle
+from adept.vehicles import ControlInput, End2EndVehicle, Vector3D
+
+Response = namedtuple('Response', 'error actor_id')
+Actor = namedtuple('Actor', 'id')
+Transform = namedtuple('Transform', 'location rotation')
+
+
+class EgoActor(Actor):
+    def get_transform(self):
+        return Transform(WorldCoordinate(1.0, 2.0, 0.0), EulerAngle(0.0, 90.0, 0.0))
+
+    def get_velocity(self):
+        return Vector3D(0.0, 3.0, 0.0)
+
+
+class VehicleControl:
+    pass
+
+
+def fake_carla():
+    command = types.SimpleNamespace(
+        ApplyVehicleControl=namedtuple('ApplyVehicleControl', 'actor_id control'),
+        DestroyActor=namedtuple('DestroyActor', 'actor_id'),
+        SpawnActor=lambda *args: ('SpawnActor',) + args,
+    )
+    return types.SimpleNamespace(command=command, VehicleControl=VehicleControl)
+
+
+class FakeClient:
+    def __init__(self, errors=None):
+        self.errors = errors or {}  # {index of the command: error}
+        self.calls = []
+
+    def apply_batch_sync(self, commands, do_tick=False):
+        self.calls.append(("sync", list(commands), do_tick))
+        return [Response(self.errors.get(i, ""), 0) for i in range(len(commands))]
+
+    def apply_batch(self, commands):
+        self.calls.append(("async", list(commands)))
+
+
+class FakeWorld:
+    def __init__(self):
+        self.frame = 10
+        self.snapshots = 0
+
+    def tick(self):
+        self.frame += 1
+        return self.frame
+
+    def get_snapshot(self):
+        self.snapshots += 1
+        return types.SimpleNamespace(frame=self.frame)
+
+
+class CommandBatchTestCase(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.dict(sys.modules, {"carla": fake_carla()})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client, self.world = FakeClient(), FakeWorld()
+        self.cache = SnapshotCache(self.world)
+        self.batch = CommandBatch(self.client, self.world, self.cache)
+
+    def queue_controls(self, n):
+        for actor_id in range(n):
+            self.batch.apply_control(Actor(actor_id), ControlInput(steer=0.1 * actor_id, throttle=0.5))
+
+    def test_queue_and_flush(self):
+        self.queue_controls(3)
+        self.assertEqual((len(self.batch), self.client.calls), (3, []))  # nothing sent while queued
+
+        self.assertEqual(self.batch.flush(), 3)
+        self.assertEqual(len(self.client.calls), 1)  # one round-trip for all the controls
+        kind, commands, do_tick = self.client.calls[0]
+        self.assertEqual((kind, do_tick), ("sync", False))
+        self.assertEqual([command.actor_id for command in commands], [0, 1, 2])
+        control = commands[2].control
+        self.assertEqual((control.steer, control.throttle, control.brake), (0.2, 0.5, 0.0))
+        self.assertEqual(len(self.batch), 0)
+        self.assertEqual(self.batch.flush(), 0)
+        self.assertEqual(len(self.client.calls), 1)  # nothing left to send
+
+    def test_flush_with_tick(self):
+        self.cache.get()
+        self.queue_controls(2)
+        self.batch.flush(do_tick=True)
+        self.assertEqual(self.client.calls[0][2], True)  # the tick goes with the controls
+        self.assertIsNone(self.cache.snapshot)  # the next read gets the new frame
+        self.batch.flush(do_tick=True)  # no command, so the world ticks alone
+        self.assertEqual((len(self.client.calls), self.world.frame), (1, 11))
+
+    def test_async(self):
+        self.queue_controls(2)
+        self.assertEqual(self.batch.flush(sync=False), 2)
+        self.assertEqual(self.client.calls, [("async", self.client.calls[0][1])])
+        self.assertEqual(len(self.client.calls[0][1]), 2)
+        self.assertEqual(self.batch.errors, [])
+        self.batch.flush(sync=False)
+        self.assertEqual(len(self.client.calls), 1)
+
+    def test_error_responses(self):
+        self.client.errors = {1: "actor 1 not found"}
+        self.queue_controls(3)
+        with mock.patch("builtins.print"):
+            self.assertEqual(self.batch.flush(), 3)
+        self.assertEqual(self.batch.errors, [("command", "actor 1 not found")])
+        self.assertEqual(len(self.batch), 0)  # the failed command does not stop or stay queued
+
+    def test_env_tick_sends_the_queued_controls(self):
+        env = types.SimpleNamespace(batch=self.batch, world=self.world, snapshot_cache=self.cache)
+        BaseCarlaEnv.tick(env)  # nothing queued, a plain tick
+        self.assertEqual((self.client.calls, self.cache.frame), ([], 11))
+        self.queue_controls(2)
+        BaseCarlaEnv.tick(env)
+        self.assertEqual(len(self.client.calls), 1)
+        self.assertEqual(self.client.calls[0][2], True)
+
+    def test_vehicle_queues_its_control(self):
+        env = types.SimpleNamespace(batch=self.batch, sync=True, get_ego_actor=lambda: EgoActor(7),
+                                    get_snapshot=lambda: None)
+        vehicle = End2EndVehicle(env, torch.nn.Identity(), device="cpu")
+        vehicle.apply_control(ControlInput(steer=0.3))
+        self.assertEqual((len(self.batch), self.client.calls), (1, []))  # sent by the next tick
+
+        env.sync = False  # nobody ticks in the asynchronous mode, so it is sent at once
+        vehicle.apply_control(ControlInput(steer=0.4))
+        self.assertEqual([call[0] for call in self.client.calls], ["async"])
+        self.assertEqual([command.actor_id for command in self.client.calls[0][1]], [7, 7])
+
+
+if __name__ == '__main__':
+    unittest.main()
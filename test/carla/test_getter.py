@@ -0,0 +1,35 @@
+import unittest
+from collections import namedtuple
+import cv2
+import numpy as np
+from adept.envs.carla import get_raw_image, get_raw_image_shape
+
+FakeImage = namedtuple('FakeImage', 'raw_data height width frame')
+
+
+class GetRawImageTestCase(unittest.TestCase):
+    def setUp(self):
+        self.bgra = np.random.RandomState(0).randint(0, 256, (20, 30, 4)).astype(np.uint8)
+        self.image = FakeImage(self.bgra.tobytes(), 20, 30, 1)
+
+    def test_formats(self):
+        np.testing.assert_array_equal(get_raw_image(self.image, "bgr"), self.bgra[..., :3])
+        np.testing.assert_array_equal(get_raw_image(self.image, "rgb"), cv2.cvtColor(self.bgra, cv2.COLOR_BGRA2RGB))
+        np.testing.assert_array_equal(get_raw_image(self.image, "gray"), cv2.cvtColor(self.bgra, cv2.COLOR_BGRA2GRAY))
+        np.testing.assert_array_equal(get_raw_image(self.image, "hsv"),
+                                      cv2.cvtColor(self.bgra[..., :3].copy(), cv2.COLOR_BGR2HSV))
+
+    def test_unknown_format_falls_back_to_bgra(self):
+        np.testing.assert_array_equal(get_raw_image(self.image, "unknown"), self.bgra)
+        self.assertEqual(get_raw_image_shape(20, 30, "unknown"), (20, 30, 4))
+
+    def test_roi_and_out(self):
+        roi = (5, 11, None, 20)
+        out = np.empty(get_raw_image_shape(20, 30, "rgb", roi), dtype=np.uint8)
+        result = get_raw_image(self.image, "rgb", roi=roi, out=out)
+        self.assertIs(result, out)
+        np.testing.assert_array_equal(out, self.bgra[5:11, :20, 2::-1])
+
+
+if __name__ == '__main__':
+    unittest.main()
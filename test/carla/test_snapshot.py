@@ -0,0 +1,92 @@
+import unittest
+from adept.envs.carla import SnapshotCache, retrieve_from
+
+
+class FakeActor:
+    def __init__(self, actor_id, transform):
+        self.id = actor_id
+        self.transform = transform
+        self.requests = 0
+
+    def get_transform(self):
+        self.requests += 1
+        return self.transform
+
+    def get_velocity(self):
+        self.requests += 1
+        return "live velocity"
+
+
+class FakeSnapshot:
+    def __init__(self, frame, actor_ids):
+        self.frame = frame
+        self.actors = {actor_id: FakeActor(actor_id, ("snapshot", frame)) for actor_id in actor_ids}
+
+    def find(self, actor_id):
+        return self.actors.get(actor_id)
+
+
+class FakeWorld:
+    def __init__(self, actor_ids=(1, 2)):
+        self.frame = 100
+        self.actor_ids = actor_ids
+        self.snapshots = 0
+        self.callbacks = []
+
+    def tick(self):
+        self.frame += 1
+        return self.frame
+
+    def get_snapshot(self):
+        self.snapshots += 1
+        return FakeSnapshot(self.frame, self.actor_ids)
+
+    def on_tick(self, callback):
+        self.callbacks.append(callback)
+        return len(self.callbacks)
+
+    def remove_on_tick(self, callback_id):
+        self.callbacks[callback_id - 1] = None
+
+
+class SnapshotCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.world = FakeWorld()
+        self.cache = SnapshotCache(self.world)
+
+    def test_one_request_per_frame(self):
+        for actor_id in (1, 2, 1):
+            self.assertEqual(retrieve_from(FakeActor(actor_id, "live"), snapshot=self.cache), ("snapshot", 100))
+        self.assertEqual(self.world.snapshots, 1)
+        self.assertEqual((self.cache.hits, self.cache.misses), (2, 1))
+
+    def test_new_tick_refreshes(self):
+        self.cache.get()
+        self.cache.invalidate(self.world.frame)  # the same frame keeps the snapshot
+        self.cache.get()
+        self.assertEqual(self.world.snapshots, 1)
+
+        self.cache.invalidate(self.world.tick())
+        self.assertEqual(retrieve_from(FakeActor(1, "live"), snapshot=self.cache), ("snapshot", 101))
+        self.assertEqual(self.world.snapshots, 2)
+        self.assertEqual(self.cache.stats()["frame"], 101)
+
+    def test_missing_actor_falls_back_to_the_live_actor(self):
+        actor = FakeActor(3, "live")  # e.g. spawned after the snapshot
+        self.assertEqual(retrieve_from(actor, about="transform", snapshot=self.cache), "live")
+        self.assertEqual(retrieve_from(actor, about="velocity", snapshot=self.cache), "live velocity")
+        self.assertEqual((actor.requests, self.world.snapshots), (2, 1))
+
+    def test_listen(self):
+        cache = SnapshotCache(self.world, listen=True)
+        push = self.world.callbacks[0]
+        push(FakeSnapshot(105, (1,)))
+        push(FakeSnapshot(104, (1,)))  # the older snapshot arriving late is ignored
+        self.assertEqual(cache.get().frame, 105)
+        self.assertEqual(self.world.snapshots, 0)
+        cache.close()
+        self.assertEqual(self.world.callbacks, [None])
+
+
+if __name__ == '__main__':
+    unittest.main()
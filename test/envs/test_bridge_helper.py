@@ -0,0 +1,93 @@
+import importlib
+import json
+import os
+import sys
+import tempfile
+import types
+import unittest
+from collections import namedtuple
+from unittest import mock
+import numpy as np
+
+Location = namedtuple('Location', 'x y z')
+Rotation = namedtuple('Rotation', 'pitch yaw roll')
+Transform = namedtuple('Transform', 'location rotation')
+Vector3D = namedtuple('Vector3D', 'x y z')
+
+
+def fake_carla():
+    command = types.SimpleNamespace(ApplyTransform=namedtuple('ApplyTransform', 'actor_id transform'))
+    return types.SimpleNamespace(Location=Location, Rotation=Rotation, Transform=Transform, Vector3D=Vector3D,
+                                 command=command)
+
+
+class BridgeHelperTestCase(unittest.TestCase):
+    def setUp(self):
+        traci = types.SimpleNamespace(constants=mock.MagicMock())
+        patcher = mock.patch.dict(sys.modules, {"carla": fake_carla(), "traci": traci, "sumolib": mock.MagicMock()})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.BridgeHelper = importlib.import_module("adept.envs.sumo._bridge_helper").BridgeHelper
+        self.BridgeHelper.offset = (12.5, -7.25)
+
+        rng = np.random.default_rng(0)
+        n = 50
+        self.locations = rng.uniform(-200.0, 200.0, (n, 3))
+        self.rotations = np.column_stack([rng.uniform(-10.0, 10.0, n), rng.uniform(-180.0, 360.0, n),
+                                          rng.uniform(-5.0, 5.0, n)])
+        self.extents = rng.uniform(0.5, 6.0, (n, 3))
+
+    def get_transforms(self):
+        return [Transform(Location(*location), Rotation(*rotation))
+                for location, rotation in zip(self.locations.tolist(), self.rotations.tolist())]
+
+    def assert_transforms(self, locations, rotations, transforms):
+        np.testing.assert_allclose(locations, [tuple(t.location) for t in transforms], atol=1e-9)
+        np.testing.assert_allclose(rotations, [tuple(t.rotation) for t in transforms], atol=1e-9)
+
+    def test_carla_transforms(self):
+        transforms = [self.BridgeHelper.get_carla_transform(transform, Vector3D(*extent))
+                      for transform, extent in zip(self.get_transforms(), self.extents.tolist())]
+        locations, rotations = self.BridgeHelper.get_carla_transforms(self.locations, self.rotations, self.extents)
+        self.assert_transforms(locations, rotations, transforms)
+
+        # only the half lengths are used
+        half_lengths = self.BridgeHelper.get_carla_transforms(self.locations, self.rotations, self.extents[:, 0])
+        np.testing.assert_array_equal(half_lengths[0], locations)
+
+    def test_sumo_transforms(self):
+        transforms = [self.BridgeHelper.get_sumo_transform(transform, Vector3D(*extent))
+                      for transform, extent in zip(self.get_transforms(), self.extents.tolist())]
+        locations, rotations = self.BridgeHelper.get_sumo_transforms(self.locations, self.rotations, self.extents)
+        self.assert_transforms(locations, rotations, transforms)
+
+    def test_round_trip(self):
+        locations, rotations = self.BridgeHelper.get_sumo_transforms(self.locations, self.rotations, self.extents)
+        locations, rotations = self.BridgeHelper.get_carla_transforms(locations, rotations, self.extents)
+        np.testing.assert_allclose(rotations, self.rotations, atol=1e-9)
+        np.testing.assert_allclose(locations[:, :2], self.locations[:, :2], atol=1e-9)
+
+    def test_transforms_and_commands(self):
+        transforms = self.BridgeHelper.get_transforms(self.locations, self.rotations)
+        self.assertEqual(transforms, self.get_transforms())
+        locations, rotations = self.BridgeHelper.get_transform_arrays(transforms)
+        np.testing.assert_array_equal(locations, self.locations)
+        np.testing.assert_array_equal(rotations, self.rotations)
+
+        commands = self.BridgeHelper.get_apply_transform_commands([3, 5], self.locations[:2], self.rotations[:2])
+        self.assertEqual([(c.actor_id, c.transform) for c in commands], list(zip([3, 5], transforms[:2])))
+        self.assertEqual(self.BridgeHelper.get_transform_arrays([])[0].shape, (0, 3))
+
+    def test_vtypes_read_once(self):
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, 'vtypes.json')
+            with open(path, 'w') as f:
+                json.dump({'carla_blueprints': {'vehicle.audi.tt': {'vClass': 'passenger'}}}, f)
+            with mock.patch.object(self.BridgeHelper, 'vtypes_path', path):
+                self.assertEqual(self.BridgeHelper._get_vtypes(), {'vehicle.audi.tt': {'vClass': 'passenger'}})
+            os.remove(path)
+            self.assertIn('vehicle.audi.tt', self.BridgeHelper._get_vtypes())
+
+
+if __name__ == '__main__':
+    unittest.main()
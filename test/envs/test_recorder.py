@@ -0,0 +1,63 @@
+import shutil
+import tempfile
+import threading
+import unittest
+import numpy as np
+from adept.envs import EpisodeRecorder
+from adept.transforms import WorldCoordinate, EulerAngle
+from adept.vehicles import SimpleDynamicsVehicleState, Vector3D, ControlInput
+
+
+class EpisodeRecorderTestCase(unittest.TestCase):
+    def setUp(self):
+        self.episode_dir = tempfile.mkdtemp()
+        self.recorder = EpisodeRecorder(self.episode_dir, {"front_camera": (8, 8)}, capacity=4)
+
+    def tearDown(self):
+        self.recorder.close()
+        shutil.rmtree(self.episode_dir)
+
+    def record(self, frame_id):
+        self.recorder.record_frame("front_camera", frame_id, np.full((8, 8, 4), frame_id % 256, dtype=np.uint8))
+        state = SimpleDynamicsVehicleState(coord=WorldCoordinate(x=float(frame_id), y=0.0, z=0.0),
+                                           pose=EulerAngle(pitch=0.0, yaw=0.0, roll=0.0),
+                                           velocity=Vector3D(0.0, 0.0, 0.0))
+        self.recorder.record_state(frame_id, 0.05 * frame_id, state, ControlInput(steer=(frame_id % 10) / 10))
+
+    def test_ring(self):
+        for frame_id in range(6):
+            self.record(frame_id)
+        self.assertIsNone(self.recorder.get_frame("front_camera", 1))  # overwritten by the frame 5
+        self.assertEqual(int(self.recorder.get_frame("front_camera", 5)[0, 0, 0]), 5)
+        state, control = self.recorder.get_state(4)
+        self.assertEqual((state[1], control[0]), (4.0, 0.4))
+        np.testing.assert_array_equal(self.recorder.state_ids, [4, 5, 2, 3])
+
+    def test_reader_during_write(self):
+        n, errors, done = 3000, [], threading.Event()
+
+        def read():
+            while not done.is_set():
+                for frame_id in range(self.recorder.state_count - 4, self.recorder.state_count + 1):
+                    frame = self.recorder.get_frame("front_camera", frame_id)
+                    if frame is not None and not (frame == frame_id % 256).all():
+                        errors.append(("frame", frame_id))
+                    record = self.recorder.get_state(frame_id)
+                    if record is not None and (record[0][1] != frame_id
+                                               or record[1][0] != (frame_id % 10) / 10):
+                        errors.append(("state", frame_id))
+
+        reader = threading.Thread(target=read)
+        reader.start()
+        try:
+            for frame_id in range(n):
+                self.record(frame_id)
+        finally:
+            done.set()
+            reader.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(self.recorder.state_count, n)
+
+
+if __name__ == '__main__':
+    unittest.main()
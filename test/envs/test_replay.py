@@ -0,0 +1,88 @@
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import torch
+from adept.attacks import DefaultContinuousLoop
+from adept.envs import EpisodeRecorder, ReplayEnv
+from adept.transforms import WorldCoordinate, EulerAngle
+from adept.vehicles import SimpleDynamicsVehicleState, Vector3D, End2EndVehicle, ReferencePlanner, \
+    PurePursuitController
+
+
+class BrightnessSteerModel(torch.nn.Module):
+    """
+    the steering model predicting the mean of the frame as the steer, which records the predictions
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.steers = []
+
+    def forward(self, x):
+        steer = x.flatten(1).mean(1, keepdim=True)
+        self.steers.append(float(steer))
+        return steer
+
+
+class ReplayEnvTestCase(unittest.TestCase):
+    def setUp(self):
+        self.episode_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.episode_dir)
+
+    def _record(self, n, capacity=10, auto_tick=False, frame_policy="time", **kwargs):
+        recorder = EpisodeRecorder(self.episode_dir, {"front_camera": (4, 6)}, capacity=capacity)
+        for k in range(n):
+            frame_id = 100 + k
+            recorder.record_frame("front_camera", frame_id, np.full((4, 6, 4), k, dtype=np.uint8))
+            state = SimpleDynamicsVehicleState(coord=WorldCoordinate(x=float(k), y=0.0, z=0.0),
+                                               pose=EulerAngle(pitch=0.0, yaw=0.0, roll=0.0),
+                                               velocity=Vector3D(20.0, 0.0, 0.0))
+            recorder.record_state(frame_id, 0.05 * k, state)
+        recorder.close()
+        return ReplayEnv(self.episode_dir, auto_tick=auto_tick, frame_policy=frame_policy, **kwargs)
+
+    def test_partly_filled_ring(self):
+        env = self._record(3)
+        self.assertEqual(env.length, 3)
+        np.testing.assert_array_equal(env._frame_slots, [0, 1, 2])
+        np.testing.assert_array_equal(env._state_slots, [0, 1, 2])
+        np.testing.assert_allclose(env.states[:, 1], [0.0, 1.0, 2.0])
+
+    def test_wrapped_ring(self):
+        env = self._record(25)
+        self.assertEqual(env.length, 10)
+        np.testing.assert_allclose(env.states[:, 1], np.arange(15, 25))  # the latest records in time order
+        self.assertEqual(int(env.frames[env._frame_slots[0]][0, 0, 0]), 15)
+        self.assertTrue(((env._frame_slots >= 0) & (env._frame_slots < 10)).all())
+
+    def test_closed_loop(self):
+        ## the frame k recorded at x = k (1m apart at 20m/s) is filled by k, so the model predicts k/255
+        env = self._record(20, capacity=20, auto_tick=True, frame_policy="nearest",
+                           preprocess=lambda frame: frame[np.newaxis])
+        ref_path_file = os.path.join(self.episode_dir, "path.txt")
+        np.savetxt(ref_path_file, np.stack([np.arange(20.0), np.zeros(20)], axis=1))
+
+        model = BrightnessSteerModel()
+        vehicle = End2EndVehicle(env, model, device="cpu")
+        vehicle.config_map["wheel_base"] = 2.9
+        planner = ReferencePlanner(ref_path_file, cache=False)
+        env.controller = PurePursuitController(vehicle=vehicle, planner=planner)
+        loop = DefaultContinuousLoop(None, env, vehicle, planner, env.controller, max_time=100)
+
+        self.assertTrue(loop.loop())  # reached the end of the path
+        self.assertEqual(env.frame, loop.time + 1)  # one tick per applied control
+        self.assertLess(env.frame, 25)
+        ## the served frames went forward with the ego vehicle, and each prediction was applied as the steer
+        self.assertEqual(model.steers[0], 0.0)
+        self.assertTrue(np.all(np.diff(model.steers) >= 0) and model.steers[-1] > 0.05)
+        self.assertAlmostEqual(env.ego_control[0], model.steers[-1], places=6)
+        self.assertEqual(env.ego_control[1], 0.2)  # the throttle of the speed above 1m/s
+        self.assertGreater(env.ego_state[0], 18.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import unittest
+from adept.envs.sumo import TickScheduler
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += max(seconds, 0.0)
+
+
+class TickSchedulerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.lags = []
+
+    def run_ticks(self, durations, **kwargs):
+        scheduler = TickScheduler(0.05, on_lag=self.lags.append, clock=self.clock, sleep=self.clock.sleep,
+                                  **kwargs)
+        ticks = iter(durations)
+
+        def tick():
+            self.clock.now += next(ticks)
+
+        scheduler.run(tick, max_ticks=len(durations))
+        return scheduler
+
+    def test_deadlines(self):
+        scheduler = self.run_ticks([0.02, 0.04, 0.01])
+        self.assertAlmostEqual(self.clock.now, 0.15)
+        for sleep, expected in zip(self.clock.sleeps, [0.03, 0.01, 0.04]):
+            self.assertAlmostEqual(sleep, expected)
+        self.assertAlmostEqual(scheduler.drift, 0.0)
+        self.assertEqual((scheduler.overruns, self.lags), (0, []))
+
+    def test_skip(self):
+        scheduler = self.run_ticks([0.02, 0.17, 0.02], catch_up='skip')
+        self.assertEqual(scheduler.skipped, 3)  # the deadlines at 0.10, 0.15 and 0.20
+        self.assertAlmostEqual(self.clock.now, 0.30)
+        self.assertEqual(self.lags, [True, False])
+        metrics = scheduler.metrics()
+        self.assertEqual(metrics['overruns'], 1)
+        self.assertEqual(metrics['overrun_histogram']['100-200ms'], 1)
+        self.assertEqual(sum(metrics['overrun_histogram'].values()), 1)
+
+    def test_none_realigns_and_reports_the_lag(self):
+        scheduler = self.run_ticks([0.02, 0.08, 0.02])
+        self.assertEqual(scheduler.realigned, 1)
+        self.assertEqual(self.lags, [True, False])
+        self.assertAlmostEqual(self.clock.now, 0.18)
+        self.assertAlmostEqual(scheduler.max_drift, 0.03)
+        self.assertEqual(scheduler.metrics()['overrun_histogram']['20-50ms'], 1)
+
+    def test_burst(self):
+        scheduler = self.run_ticks([0.02, 0.08, 0.01], catch_up='burst')
+        self.assertEqual(len(self.clock.sleeps), 2)  # no sleep after the overrun
+        self.assertAlmostEqual(self.clock.now, 0.15)
+        self.assertAlmostEqual(scheduler.drift, 0.0)
+        self.assertEqual((scheduler.realigned, scheduler.skipped), (0, 0))
+        self.assertEqual(self.lags, [True, False])
+
+    def test_fast(self):
+        scheduler = self.run_ticks([0.02, 0.08, 0.01], realtime=False)
+        self.assertEqual((self.clock.sleeps, self.lags), ([], []))
+        self.assertAlmostEqual(scheduler.metrics()['realtime_factor'], 0.15 / 0.11)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,178 @@
+import importlib
+import sys
+import types
+import unittest
+from collections import namedtuple
+from unittest import mock
+import numpy as np
+
+constants = types.SimpleNamespace(
+    VAR_TYPE=0x4f, VAR_VEHICLECLASS=0x49, VAR_COLOR=0x45, VAR_LENGTH=0x44, VAR_WIDTH=0x4d,
+    VAR_HEIGHT=0xbc, VAR_POSITION3D=0x39, VAR_ANGLE=0x43, VAR_SLOPE=0x36, VAR_SPEED=0x40,
+    VAR_SPEED_LAT=0x32, VAR_SIGNALS=0x5b, CMD_GET_VEHICLE_VARIABLE=0xa4,
+    TL_CURRENT_PROGRAM=0x29, TL_CURRENT_PHASE=0x28,
+)
+DYNAMIC = ('VAR_POSITION3D', 'VAR_ANGLE', 'VAR_SLOPE', 'VAR_SPEED', 'VAR_SPEED_LAT', 'VAR_SIGNALS')
+
+
+def fake_carla():
+    return types.SimpleNamespace(
+        Location=namedtuple('Location', 'x y z'),
+        Rotation=namedtuple('Rotation', 'pitch yaw roll'),
+        Transform=namedtuple('Transform', 'location rotation'),
+        Vector3D=namedtuple('Vector3D', 'x y z'),
+    )
+
+
+class FakeVehicles:
+    """
+    the traci.vehicle domain over a dict of vehicles {actor_id: {variable name: value}}
+    """
+
+    def __init__(self):
+        self.vehicles = {}
+
+    def add(self, actor_id, rng):
+        self.vehicles[actor_id] = {
+            'VAR_TYPE': 'vehicle.' + actor_id, 'VAR_VEHICLECLASS': 'passenger', 'VAR_COLOR': (255, 0, 0, 255),
+            'VAR_LENGTH': rng.uniform(2.0, 6.0), 'VAR_WIDTH': rng.uniform(1.5, 2.5),
+            'VAR_HEIGHT': rng.uniform(1.2, 3.0),
+        }
+        self.move(actor_id, rng)
+
+    def move(self, actor_id, rng):
+        self.vehicles[actor_id].update({
+            'VAR_POSITION3D': tuple(rng.uniform(-100.0, 100.0, 3)), 'VAR_ANGLE': rng.uniform(0.0, 360.0),
+            'VAR_SLOPE': rng.uniform(-5.0, 5.0), 'VAR_SPEED': rng.uniform(0.0, 20.0),
+            'VAR_SPEED_LAT': rng.uniform(-1.0, 1.0), 'VAR_SIGNALS': int(rng.integers(0, 1 << 14)),
+        })
+
+    def results(self, names, actor_ids=None):
+        actor_ids = self.vehicles if actor_ids is None else actor_ids
+        return {actor_id: {getattr(constants, name): self.vehicles[actor_id][name] for name in names}
+                for actor_id in actor_ids}
+
+    def getSubscriptionResults(self, actor_id):
+        return self.results([name for name in vars(constants) if name.startswith('VAR_')], [actor_id])[actor_id]
+
+    def __getattr__(self, method):
+        name = {'getTypeID': 'VAR_TYPE', 'getVehicleClass': 'VAR_VEHICLECLASS', 'getColor': 'VAR_COLOR',
+                'getLength': 'VAR_LENGTH', 'getWidth': 'VAR_WIDTH', 'getHeight': 'VAR_HEIGHT',
+                'getPosition3D': 'VAR_POSITION3D', 'getAngle': 'VAR_ANGLE', 'getSlope': 'VAR_SLOPE',
+                'getSpeed': 'VAR_SPEED', 'getLateralSpeed': 'VAR_SPEED_LAT', 'getSignals': 'VAR_SIGNALS'}[method]
+        return lambda actor_id: self.vehicles[actor_id][name]
+
+
+class FakeTraci(types.SimpleNamespace):
+    """
+    the traci module of a sumo net with one junction, whose context subscription covers all the vehicles
+    """
+
+    def __init__(self):
+        super().__init__(constants=constants, vehicle=FakeVehicles(), departed=[], arrived=[])
+        self.trafficlight = types.SimpleNamespace(getIDList=lambda: [])
+        self.simulation = types.SimpleNamespace(getDepartedIDList=lambda: self.departed,
+                                                getArrivedIDList=lambda: self.arrived)
+        self.junction = types.SimpleNamespace(
+            getIDList=lambda: ['j0'], subscribeContext=lambda *args: None,
+            getContextSubscriptionResults=lambda junction_id: self.vehicle.results(DYNAMIC))
+
+    def start(self, *args, **kwargs):
+        pass
+
+    def setOrder(self, order):
+        pass
+
+    def simulationStep(self):
+        pass
+
+
+class SumoVehicleStatesTestCase(unittest.TestCase):
+    def setUp(self):
+        self.traci = FakeTraci()
+        sumolib = types.SimpleNamespace(checkBinary=lambda name: name)
+        patcher = mock.patch.dict(sys.modules, {"carla": fake_carla(), "traci": self.traci, "sumolib": sumolib})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.module = importlib.import_module("adept.envs.sumo._sumo_simulation")
+        self.rng = np.random.default_rng(0)
+
+    def make_simulation(self, bulk):
+        with mock.patch.object(self.module, "_get_sumo_net", return_value=None):
+            return self.module.SumoSimulation("test.sumocfg", 0.05, bulk=bulk)
+
+    def step(self, simulation, departed=(), arrived=()):
+        for actor_id in departed:
+            self.traci.vehicle.add(actor_id, self.rng)
+        for actor_id in self.traci.vehicle.vehicles:
+            self.traci.vehicle.move(actor_id, self.rng)
+        for actor_id in arrived:
+            del self.traci.vehicle.vehicles[actor_id]
+        self.traci.departed, self.traci.arrived = list(departed), list(arrived)
+        simulation.tick()
+
+    def assert_same_actor(self, actual, expected):
+        self.assertEqual((actual.type_id, actual.vclass, actual.signals, actual.color),
+                         (expected.type_id, expected.vclass, expected.signals, expected.color))
+        self.assertIsInstance(actual.signals, int)
+        for a, b in [(actual.transform.location, expected.transform.location),
+                     (actual.transform.rotation, expected.transform.rotation), (actual.extent, expected.extent)]:
+            np.testing.assert_allclose(tuple(a), tuple(b))
+
+    def test_row_mapping(self):
+        states = self.module.SumoVehicleStates(capacity=4)
+        for actor_id in ['a', 'b', 'c']:
+            self.traci.vehicle.add(actor_id, self.rng)
+            states.register(actor_id)
+        self.assertEqual(states.index, {'a': 0, 'b': 1, 'c': 2})
+
+        results = self.traci.vehicle.results(DYNAMIC, ['c', 'a'])  # not in the row order, b not moved
+        states.update(results)
+        for actor_id in ['a', 'c']:
+            row, vehicle = states.index[actor_id], self.traci.vehicle.vehicles[actor_id]
+            np.testing.assert_allclose(states.locations[row], vehicle['VAR_POSITION3D'])
+            np.testing.assert_allclose(states.rotations[row], [vehicle['VAR_SLOPE'], vehicle['VAR_ANGLE'], 0.0])
+            np.testing.assert_allclose(states.speeds[row], [vehicle['VAR_SPEED'], vehicle['VAR_SPEED_LAT']])
+        rows = np.array([states.index['c'], states.index['a']])
+        self.assertEqual(states.signals[rows].tolist(),
+                         [self.traci.vehicle.vehicles[actor_id]['VAR_SIGNALS'] for actor_id in ['c', 'a']])
+        self.assertEqual(states.signals[states.index['b']], 0)
+
+        self.traci.vehicle.add('d', self.rng)  # departed before the bulk subscription, and beyond the capacity
+        self.traci.vehicle.add('e', self.rng)
+        states.update(self.traci.vehicle.results(DYNAMIC))
+        self.assertEqual((states.index['d'], states.index['e'], len(states)), (3, 4, 5))
+        np.testing.assert_allclose(states.locations[4], self.traci.vehicle.vehicles['e']['VAR_POSITION3D'])
+
+    def test_leaving_vehicles(self):
+        simulation = self.make_simulation(bulk=True)
+        states = simulation.vehicle_states
+        self.step(simulation, departed=['a', 'b', 'c'])  # registered in the set order of the departed ids
+        self.assertEqual(sorted(states.index.values()), [0, 1, 2])
+        rows = dict(states.index)
+
+        self.step(simulation, arrived=['b'])
+        self.assertEqual(states.index, {'a': rows['a'], 'c': rows['c']})
+        self.assertFalse(states.alive[rows['b']])
+        self.assertIsNone(states.actor_ids[rows['b']])
+
+        self.step(simulation, departed=['d'], arrived=['a'])  # d reuses the row released last, i.e. of a
+        self.assertEqual(states.index, {'c': rows['c'], 'd': rows['a']})
+        self.assertEqual(states.alive[:3].sum(), 2)
+        self.assertEqual(states.type_ids[rows['a']], 'vehicle.d')
+        for actor_id in ['c', 'd']:
+            row = states.index[actor_id]
+            np.testing.assert_allclose(states.locations[row], self.traci.vehicle.vehicles[actor_id]['VAR_POSITION3D'])
+            self.assertEqual(states.signals[row], self.traci.vehicle.vehicles[actor_id]['VAR_SIGNALS'])
+
+    def test_matches_the_per_vehicle_actors(self):
+        bulk, single = self.make_simulation(bulk=True), self.make_simulation(bulk=False)
+        self.step(bulk, departed=['a', 'b', 'c'])
+        self.step(bulk, departed=['d'], arrived=['b'])
+        self.assertEqual(sorted(bulk.vehicle_states.index), ['a', 'c', 'd'])
+        for actor_id in self.traci.vehicle.vehicles:
+            self.assert_same_actor(bulk.get_actor(actor_id), single.get_actor(actor_id))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import threading
+import unittest
+from adept.envs.sumo import DoubleBufferedSteps, SumoControlledActors
+
+
+class FakeCoSimulation:
+    """
+    the sumo and carla steps of the co-simulation: sumo departs the given actors at each tick,
+    and carla rejects the ones without any blueprint(the bikes)
+    """
+
+    def __init__(self, departures):
+        self.departures = iter(departures)
+        self.unsubscribed = []
+        self.controlled = SumoControlledActors(self.unsubscribed.append)
+        self.threads = set()
+
+    def sumo_step(self, carla_snapshot):
+        self.threads.add(("sumo", threading.current_thread().name))
+        if carla_snapshot is not None:
+            self.controlled.reject(carla_snapshot)
+        self.controlled.update(next(self.departures), ())
+        return sorted(self.controlled)
+
+    def carla_step(self, sumo_snapshot):
+        self.threads.add(("carla", threading.current_thread().name))
+        return [actor_id for actor_id in sumo_snapshot or () if actor_id.startswith("bike")]
+
+
+class SumoControlledActorsTestCase(unittest.TestCase):
+    def test_update_and_reject(self):
+        unsubscribed = []
+        controlled = SumoControlledActors(unsubscribed.append)
+        controlled.update(["car0", "bike0", "bike1"], [])
+        controlled.update(["car1"], ["bike1"])
+        self.assertEqual(sorted(controlled), ["bike0", "car0", "car1"])
+
+        self.assertEqual(controlled.reject(["bike0", "bike1"]), ["bike0"])  # bike1 already destroyed
+        self.assertEqual(controlled.reject(["bike0"]), [])  # rejected twice, e.g. by a stale snapshot
+        self.assertEqual(unsubscribed, ["bike0"])
+        self.assertEqual((len(controlled), "bike0" in controlled), (2, False))
+
+
+class DoubleBufferedStepsTestCase(unittest.TestCase):
+    def run_ticks(self, staleness):
+        simulation = FakeCoSimulation([["car0", "bike0"], ["car1"], [], []])
+        steps = DoubleBufferedSteps(simulation.sumo_step, simulation.carla_step, staleness)
+        snapshots = []
+        for _ in range(4):
+            steps.tick()
+            snapshots.append(steps.sumo_snapshot)
+        steps.close()
+        self.assertEqual(simulation.unsubscribed, ["bike0"])
+        return snapshots, simulation
+
+    def test_staleness_0(self):
+        snapshots, simulation = self.run_ticks(0)
+        self.assertEqual(snapshots, [["bike0", "car0"], ["car0", "car1"], ["car0", "car1"], ["car0", "car1"]])
+        self.assertEqual({name for _, name in simulation.threads}, {threading.current_thread().name})
+
+    def test_staleness_1(self):
+        # the carla step reads the sumo snapshot of the previous tick, so the rejection is one tick later
+        snapshots, simulation = self.run_ticks(1)
+        self.assertEqual(snapshots, [["bike0", "car0"], ["bike0", "car0", "car1"], ["car0", "car1"],
+                                     ["car0", "car1"]])
+        self.assertNotIn(("sumo", threading.current_thread().name), simulation.threads)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import math
+import unittest
+import numpy as np
+from adept.transforms import CoordinateTransformer, WorldCoordinate, Point, Box2D
+
+
+def world2pixel_per_point(points, x, y, z, pitch, yaw, roll, h, w):
+    """
+    the original per-point transform, as the reference of the vectorized one
+    """
+    def trans_vector(vector):
+        vx, vy, vz = vector
+        vx, vz = vx * math.cos(p) - vz * math.sin(p), vx * math.sin(p) + vz * math.cos(p)
+        vx, vy = vx * math.cos(yw) - vy * math.sin(yw), vx * math.sin(yw) + vy * math.cos(yw)
+        vy, vz = vz * math.sin(r) + vy * math.cos(r), vz * math.cos(r) - vy * math.sin(r)
+        return [vx, vy, vz]
+
+    p, yw, r = math.radians(pitch), math.radians(yaw), math.radians(roll)
+    front_vec, left_vec, up_vec = trans_vector([1, 0, 0]), trans_vector([0, 1, 0]), trans_vector([0, 0, 1])
+    pixels = []
+    for point in points:
+        vec = [point[0] - x, point[1] - y, point[2] - z]
+        f, tx, ty = np.dot(vec, front_vec), np.dot(vec, left_vec), np.dot(vec, up_vec)
+        if f < 0:
+            return None
+        pixels.append([(tx / f * 0.5 * w) + w / 2, -(ty / f * 0.5 * h) + h / 2])
+    return np.array(pixels)
+
+
+class CoordinateTransformerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.transformer = CoordinateTransformer()
+        self.corners = np.array([
+            [10.0, 1.0, 1.0], [10.0, -1.0, 1.0],
+            [10.0, -1.0, -1.0], [10.0, 1.0, -1.0]
+        ])
+        self.box = Box2D(*[Point(coord=WorldCoordinate(*c)) for c in self.corners])
+
+    def test_world2pixel_by_hand(self):
+        ## tan = 0.1 on both axes => 0.1 * 100 px to the right/left, 0.1 * 50 px up/down of the center (100, 50)
+        box = self.transformer._transform_world2pixel(self.box, 0, 0, 0, 0, 0, 0, h=100, w=200)
+        expected = [[110.0, 45.0], [90.0, 45.0], [90.0, 55.0], [110.0, 55.0]]
+        for i in range(4):
+            self.assertAlmostEqual(box[i]["c"]["x"], expected[i][0])
+            self.assertAlmostEqual(box[i]["c"]["y"], expected[i][1])
+
+    def test_world2pixel_batch_matches_per_point(self):
+        rng = np.random.default_rng(0)
+        poses = np.column_stack([rng.uniform(-2, 2, (20, 3)), rng.uniform(-20, 20, (20, 3))])
+        pixels, visible = self.transformer.project_world2pixel(self.corners, poses, h=100, w=200)
+        for pose, pose_pixels, pose_visible in zip(poses, pixels, visible):
+            expected = world2pixel_per_point(self.corners, *pose, h=100, w=200)
+            self.assertTrue(pose_visible.all())
+            np.testing.assert_allclose(pose_pixels, expected, rtol=1e-10)
+
+    def test_world2pixel_batch_visibility(self):
+        poses = np.array([[0, 0, 0, 0, 0, 0], [0, 0, 0, 0, 180, 0]])
+        pixels, visible = self.transformer.transform(self.corners, fro="world", to="pixel", batch=True,
+                                                     state=poses, image_height=100, image_width=200)
+        self.assertEqual(pixels.shape, (2, 4, 2))
+        self.assertTrue(visible[0].all())
+        self.assertFalse(visible[1].any())
+        self.assertTrue(np.isnan(pixels[1]).all())
+        self.assertIsNone(self.transformer._transform_world2pixel(self.box, 0, 0, 0, 0, 180, 0, h=100, w=200))
+
+    def test_camera_plane_is_invisible(self):
+        pixels, visible = self.transformer.project_world2pixel([[0.0, 1.0, 0.0], [1.0, 0.0, 0.0]],
+                                                               [0, 0, 0, 0, 0, 0], h=100, w=200)
+        self.assertEqual(visible.tolist(), [[False, True]])
+        self.assertTrue(np.isnan(pixels[0, 0]).all())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import unittest
+import numpy as np
+from adept.transforms import SamplePath2D
+
+
+class SamplePath2DTestCase(unittest.TestCase):
+    def setUp(self):
+        self.points = np.stack([np.arange(100, dtype=np.float64), np.zeros(100)], axis=1)
+        self.path = SamplePath2D(self.points)
+
+    def test_nearest_point_by_cursor(self):
+        point, idx = self.path.get_nearest_point(10.2, 1.0)
+        self.assertEqual(idx, 10)
+        _, idx = self.path.get_nearest_point(10.2, 1.0, away_from=5.0, start=12, window=8)
+        self.assertEqual(idx, 16)
+        _, idx = self.path.get_nearest_point(500.0, 0.0, away_from=1e6)
+        self.assertEqual(idx, -1)
+
+    def test_integral_keys(self):
+        self.assertEqual(self.path[np.int64(3)]["c"]["x"], 3.0)
+        self.assertEqual(self.path[-1]["c"]["x"], 99.0)
+        with self.assertRaises(KeyError):
+            self.path[100]
+
+    def test_plist_is_read_only(self):
+        with self.assertRaises(AttributeError):
+            self.path.plist.append(None)
+        self.path.append((100.0, 0.0))
+        self.assertEqual(len(self.path.plist), 101)
+
+    def test_project_matches_all_segments(self):
+        path = SamplePath2D(np.stack([np.linspace(0, 60, 300), 5 * np.sin(np.linspace(0, 6, 300))], axis=1))
+        rng = np.random.default_rng(0)
+        x = np.linspace(0, 60, 120)
+        points = np.stack([x, 5 * np.sin(x / 10) + rng.normal(0, 1, len(x))], axis=1)
+        offset, segment, t = path.project(points, window=16)
+        offset_all, segment_all, t_all = path.project(points, window=None, chunk=7)
+        np.testing.assert_allclose(offset, offset_all)
+        np.testing.assert_array_equal(segment, segment_all)
+        np.testing.assert_allclose(t, t_all)
+
+        ## the brute force distance to every segment
+        a, d = path.points[:-1], np.diff(path.points, axis=0)
+        q = points[:, None, :] - a
+        tt = np.clip((q * d).sum(-1) / (d * d).sum(-1), 0, 1)
+        distance = np.linalg.norm(q - tt[..., None] * d, axis=-1).min(axis=1)
+        np.testing.assert_allclose(np.abs(offset), distance)
+
+    def test_project_sign_and_degenerate_segments(self):
+        path = SamplePath2D(np.array([[0.0, 0.0], [1.0, 0.0], [1.0, 0.0], [2.0, 0.0]]))
+        offset, segment, t = path.project([[0.5, 1.0], [1.5, -2.0], [3.0, 0.0]])
+        np.testing.assert_allclose(offset, [1.0, -2.0, 1.0])
+        np.testing.assert_array_equal(segment, [0, 2, 2])
+        np.testing.assert_allclose(t, [0.5, 0.5, 1.0])
+        offset, _, _ = SamplePath2D(np.array([[1.0, 1.0]])).project([[1.0, 4.0]])
+        np.testing.assert_allclose(np.abs(offset), [3.0])
+
+    def test_project_long_path_memory(self):
+        import tracemalloc
+        s = np.linspace(0, 2000, 20000)
+        path = SamplePath2D(np.stack([s, 10 * np.sin(s / 100)], axis=1))
+        x = np.linspace(0, 1900, 500)
+        tracemalloc.start()
+        try:
+            offset, _, _ = path.project(np.stack([x, 10 * np.sin(x / 100) + 0.5], axis=1))
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        self.assertLess(peak, 16 * 2 ** 20)  # projecting onto all the segments takes hundreds of MB
+        self.assertTrue(np.all(np.abs(offset) < 0.6))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+import math
+import unittest
+import numpy as np
+import torch
+from adept.transforms import RandomPerspective, RandomBrightnessContrast, RandomGaussianBlur, \
+    RandomNoise, PrintabilityMap, TransformStack
+
+
+def bilinear_border(image, u, v):
+    """
+    sample the (C,H,W) image at the pixel coordinate (u,v), with the border padding
+    """
+    _, h, w = image.shape
+    u, v = min(max(u, 0.0), w - 1.0), min(max(v, 0.0), h - 1.0)
+    x0, y0 = min(int(math.floor(u)), w - 2), min(int(math.floor(v)), h - 2)
+    fx, fy = u - x0, v - y0
+    return (image[:, y0, x0] * (1 - fx) * (1 - fy) + image[:, y0, x0 + 1] * fx * (1 - fy) +
+            image[:, y0 + 1, x0] * (1 - fx) * fy + image[:, y0 + 1, x0 + 1] * fx * fy)
+
+
+def solve_homography(fro, to):
+    """
+    solve the 3x3 homography mapping the 4 points fro to the 4 points to by the direct linear transform
+    """
+    a, b = [], []
+    for (x, y), (u, v) in zip(fro, to):
+        a.append([x, y, 1, 0, 0, 0, -u * x, -u * y])
+        a.append([0, 0, 0, x, y, 1, -v * x, -v * y])
+        b.extend([u, v])
+    return np.append(np.linalg.solve(np.array(a), np.array(b)), 1.0).reshape(3, 3)
+
+
+class ImageTransformTestCase(unittest.TestCase):
+    def setUp(self):
+        self.images = torch.rand(2, 3, 5, 6, generator=torch.Generator().manual_seed(0), dtype=torch.float64)
+
+    def test_perspective_matches_per_pixel(self):
+        distortion = 0.1
+        output = RandomPerspective(distortion)(self.images, generator=torch.Generator().manual_seed(1))
+
+        ## the same moved corners as sampled by the transform
+        src = np.array([[-1., -1.], [1., -1.], [1., 1.], [-1., 1.]])
+        dst = src + (torch.rand(2, 4, 2, generator=torch.Generator().manual_seed(1)).numpy() * 2 - 1) \
+            * 2 * distortion
+        n, _, h, w = self.images.shape
+        images = self.images.numpy()
+        for k in range(n):
+            homography = solve_homography(dst[k], src)
+            for i in range(h):
+                for j in range(w):
+                    x, y = -1 + 2 * j / (w - 1), -1 + 2 * i / (h - 1)
+                    u, v, s = homography @ [x, y, 1.0]
+                    expected = bilinear_border(images[k], (u / s + 1) / 2 * (w - 1), (v / s + 1) / 2 * (h - 1))
+                    np.testing.assert_allclose(output[k, :, i, j].numpy(), expected, atol=1e-5)
+
+    def test_blur_matches_per_pixel(self):
+        sigma = 0.8
+        output = RandomGaussianBlur(min_sigma=sigma, max_sigma=sigma)(self.images).numpy()
+
+        radius = int(math.ceil(3 * sigma))
+        offsets = np.arange(-radius, radius + 1)
+        weights = np.exp(-offsets ** 2 / (2 * sigma ** 2))
+        weights /= weights.sum()
+        images = self.images.numpy()
+        n, c, h, w = images.shape
+        for k in range(n):
+            for i in range(h):
+                for j in range(w):
+                    expected = np.zeros(c)
+                    for di, wi in zip(offsets, weights):
+                        for dj, wj in zip(offsets, weights):
+                            ii, jj = min(max(i + di, 0), h - 1), min(max(j + dj, 0), w - 1)  # replicate
+                            expected += wi * wj * images[k, :, ii, jj]
+                    np.testing.assert_allclose(output[k, :, i, j], expected, atol=1e-10)
+
+    def test_brightness_contrast_matches_per_pixel(self):
+        output = RandomBrightnessContrast(0.1, 0.2)(self.images, generator=torch.Generator().manual_seed(2))
+        generator = torch.Generator().manual_seed(2)
+        brightness = torch.rand(2, generator=generator).numpy() * 0.2 - 0.1
+        contrast = torch.rand(2, generator=generator).numpy() * 0.4 + 0.8
+        images = self.images.numpy()
+        for k in range(2):
+            mean = images[k].mean()
+            for index in np.ndindex(*images.shape[1:]):
+                expected = (images[k][index] - mean) * contrast[k] + mean + brightness[k]
+                self.assertAlmostEqual(output[k][index].item(), expected, places=6)
+
+    def test_printability_matches_per_pixel(self):
+        palette = np.array([[0.0, 0.0, 0.0], [1.0, 1.0, 1.0], [1.0, 0.0, 0.0]])
+        transform = PrintabilityMap(palette, temperature=0.05)
+        output, score = transform(self.images).numpy(), transform.score(self.images).numpy()
+        images = self.images.numpy()
+        for k in range(2):
+            nps = 0.0
+            for i in range(5):
+                for j in range(6):
+                    distance = ((images[k, :, i, j] - palette) ** 2).sum(axis=1)
+                    weights = np.exp(-distance / 0.05)
+                    np.testing.assert_allclose(output[k, :, i, j], weights @ palette / weights.sum(), atol=1e-10)
+                    nps += np.prod(np.sqrt(distance))
+            self.assertAlmostEqual(score[k], nps, places=8)
+
+    def test_stack_layout(self):
+        images = self.images.permute(0, 2, 3, 1)  # (B,H,W,C)
+        output = TransformStack([RandomNoise(std=0.05)], channels_last=True, seed=3)(images, n=3)
+        self.assertEqual(output.shape, (6, 5, 6, 3))
+        ## the row i * B + b is the image b with the i-th sampled noise, in the channels-last layout
+        noise = torch.randn((6, 3, 5, 6), generator=torch.Generator().manual_seed(3)).double() * 0.05
+        for row in range(6):
+            for i, j, c in np.ndindex(5, 6, 3):
+                expected = min(max(self.images[row % 2, c, i, j].item() + noise[row, c, i, j].item(), 0.0), 1.0)
+                self.assertAlmostEqual(output[row, i, j, c].item(), expected, places=10)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import unittest
+import numpy as np
+from adept.transforms import SamplePath2D, WorldCoordinate, EulerAngle
+from adept.vehicles import PurePursuitController, ILQRController, ControlInput, SimpleDynamicsVehicleState, Vector3D
+
+
+class FakeVehicle:
+    def __init__(self, x=0.0, y=0.5, yaw=0.0, vx=2.0):
+        self.state = SimpleDynamicsVehicleState(WorldCoordinate(x, y, 0), EulerAngle(0, 0, yaw), Vector3D(vx, 0, 0))
+
+    def get_state(self):
+        return self.state
+
+    def get_config(self, key):
+        return {"wheel_base": 2.9}.get(key)
+
+
+class UnconfiguredVehicle(FakeVehicle):
+    def get_config(self, key):
+        return None
+
+
+class FakePlanner:
+    def __init__(self, path):
+        self.path = path
+
+    def get_target_path(self):
+        return self.path
+
+
+class BrakingController(PurePursuitController):
+    def get_control_from(self, steer, velocity):
+        return ControlInput(steer, 0.0, 1.0)
+
+
+class PurePursuitControllerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.planner = FakePlanner(SamplePath2D(np.stack([np.arange(50.0), np.zeros(50)], axis=1)))
+
+    def test_scalar_matches_batch(self):
+        controller = PurePursuitController(FakeVehicle(), self.planner)
+        control = controller.path_following()
+        controls, idx = controller.path_following_batch([[0.0, 0.5, 0.0, 2.0], [3.0, -1.0, 10.0, 0.5]])
+        self.assertAlmostEqual(control.steer, controls["s"][0])
+        self.assertLess(control.steer, 0.0)  # steer back to the path
+        self.assertEqual(controller.start, idx[0])
+        for i, v in enumerate([2.0, 0.5]):
+            self.assertEqual(controls["t"][i], controller.get_control_from(0.0, v).throttle)
+
+    def test_overridden_control_rule(self):
+        control = BrakingController(FakeVehicle(), self.planner).path_following()
+        self.assertEqual((control.throttle, control.brake), (0.0, 1.0))
+
+
+
+class ILQRControllerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.planner = FakePlanner(SamplePath2D(np.stack([np.arange(100.0), np.zeros(100)], axis=1)))
+
+    def test_wheel_base_is_read_once(self):
+        with self.assertRaises(ValueError):
+            ILQRController(UnconfiguredVehicle(), self.planner)
+        controller = ILQRController(UnconfiguredVehicle(), self.planner, wheel_base=2.9, budget=1.0)
+        control = controller.path_following()
+        self.assertLess(control.steer, 0.0)  # steer back to the path
+        self.assertGreater(control.throttle, 0.0)  # speed up to the target speed
+        self.assertEqual(controller.stats()["count"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
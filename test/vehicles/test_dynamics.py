@@ -0,0 +1,45 @@
+import unittest
+import numpy as np
+from adept.vehicles import BicycleModel, ControlInput
+
+
+class BicycleModelTestCase(unittest.TestCase):
+    def setUp(self):
+        self.model = BicycleModel(wheel_base=2.5, max_steer=30.0, max_accel=4.0, max_decel=8.0)
+
+    def test_constant_acceleration(self):
+        ## RK4 is exact for the quadratic motion
+        trajectory = self.model.rollout([0.0, 0.0, 0.0, 5.0], [ControlInput(throttle=0.5)] * 10, dt=0.1)
+        np.testing.assert_allclose(trajectory[-1, 0], [6.0, 0.0, 0.0, 7.0], atol=1e-12)
+
+    def test_constant_turn(self):
+        steer, v, duration = 0.5, 4.0, 2.0
+        radius = 2.5 / np.tan(np.radians(15.0))
+        states = self.model.rollout([0.0, 0.0, 0.0, v], [ControlInput(steer=steer)] * 40, dt=duration / 40)
+        yaw = v * duration / radius
+        np.testing.assert_allclose(states[-1, 0], [radius * np.sin(yaw), radius * (1 - np.cos(yaw)), yaw, v],
+                                   atol=1e-6)
+
+    def test_brake_never_reverses(self):
+        states = self.model.rollout([0.0, 0.0, 0.0, 1.0], [ControlInput(brake=1.0)] * 20, dt=0.05)
+        self.assertTrue(np.all(states[:, 0, 3] >= 0.0))
+        self.assertEqual(states[-1, 0, 3], 0.0)
+        self.assertTrue(np.all(np.diff(states[:, 0, 0]) >= 0.0))
+
+    def test_batch_matches_single_steps(self):
+        states = np.array([[0.0, 0.0, 0.0, 5.0], [10.0, -2.0, 0.3, 2.0], [1.0, 1.0, -1.0, 0.0]])
+        controls = np.array([(0.2, 0.5, 0.0), (-1.0, 0.0, 0.3), (0.0, 1.0, 0.0)], dtype=ControlInput.get_dtype())
+        batch = self.model.step(states, controls, dt=0.1, substeps=2)
+        for i in range(3):
+            single = self.model.step(states[i], ControlInput.from_record(controls[i]), dt=0.1, substeps=2)
+            np.testing.assert_allclose(batch[i], single[0])
+        np.testing.assert_allclose(self.model.step(states, controls.view((np.float64, 3)), dt=0.1, substeps=2), batch)
+
+    def test_dynamic_straight(self):
+        model = BicycleModel(wheel_base=2.5, model="dynamic")
+        states = model.rollout([0.0, 0.0, 0.0, 5.0, 0.0, 0.0], [ControlInput(throttle=0.5)] * 10, dt=0.1)
+        np.testing.assert_allclose(states[-1, 0], [6.0, 0.0, 0.0, 7.0, 0.0, 0.0], atol=1e-12)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+from unittest import mock
+import numpy as np
+import torch
+from adept.vehicles import InferenceEngine
+
+
+class MeanModel(torch.nn.Module):
+    def forward(self, x):
+        return x.flatten(1).mean(dim=1, keepdim=True)
+
+
+class InferenceEngineTestCase(unittest.TestCase):
+    def setUp(self):
+        self.engine = InferenceEngine(MeanModel())
+
+    def test_float_frames_are_prepared(self):
+        frame = torch.full((1, 3, 4, 4), 255.0)  # a float32 frame is not a prepared tensor
+        self.assertAlmostEqual(self.engine.infer(frame), 1.0, places=6)
+        self.assertAlmostEqual(self.engine.infer(np.full((1, 3, 4, 4), 51, dtype=np.uint8)), 0.2, places=6)
+
+    def test_prepared_frames_are_not_scaled_again(self):
+        inputs = self.engine.prepare(np.full((1, 3, 4, 4), 255, dtype=np.uint8))
+        self.assertAlmostEqual(self.engine.infer(inputs, prepared=True), 1.0, places=6)
+        self.assertEqual(self.engine.stats()["prepare"]["count"], 1)
+
+    def test_infer_batch(self):
+        frames = [np.full((1, 3, 4, 4), 255 * k // 4, dtype=np.uint8) for k in range(3)]
+        outputs = self.engine.infer_batch(frames)
+        self.assertEqual(outputs.shape, (3, 1))
+        np.testing.assert_allclose(outputs[:, 0], [0.0, 63 / 255, 127 / 255], rtol=1e-6)
+
+    def test_threads_only_set_when_given(self):
+        threads = torch.get_num_threads()
+        with mock.patch("torch.set_num_threads") as set_num_threads, \
+                mock.patch("torch.set_num_interop_threads") as set_num_interop_threads:
+            InferenceEngine(MeanModel())
+            self.assertFalse(set_num_threads.called or set_num_interop_threads.called)
+            InferenceEngine(MeanModel(), threads=2)
+            set_num_threads.assert_called_once_with(2)
+        self.assertEqual(torch.get_num_threads(), threads)
+
+    def test_interop_threads_failure_is_logged(self):
+        with mock.patch("torch.set_num_interop_threads", side_effect=RuntimeError("already started")), \
+                self.assertLogs(level="WARNING") as logs:
+            InferenceEngine.set_threads(interop_threads=2)
+        self.assertIn("already started", logs.output[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
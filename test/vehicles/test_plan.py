@@ -0,0 +1,50 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+from adept.vehicles import ReferencePlanner, load_ref_path
+
+
+class LoadRefPathTestCase(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.points = np.stack([np.arange(50) * 0.5, np.arange(50) * -0.25, np.arange(50) * 3.0], axis=1)
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def write(self, name, lines):
+        path = os.path.join(self.dir.name, name)
+        with open(path, 'w') as f:
+            f.writelines(lines)
+        return path
+
+    def test_trailing_separator(self):
+        file = self.write("path.txt", ["%g %g %g \n" % tuple(p) for p in self.points] + ["\n"])
+        points = load_ref_path(file, cache=False, block_size=64)  # several blocks
+        np.testing.assert_allclose(points, self.points[:, :2])
+        file = self.write("path.csv", ["%g,%g,%g,\n" % tuple(p) for p in self.points])
+        np.testing.assert_allclose(load_ref_path(file, split=',', cache=False), self.points[:, :2])
+
+    def test_too_few_columns(self):
+        file = self.write("bad.txt", ["1 2\n", "3\n"])
+        with self.assertRaises(ValueError):
+            load_ref_path(file, cache=False)
+
+    def test_cached_strided_path_is_not_copied(self):
+        file = self.write("path.txt", ["%g %g %g\n" % tuple(p) for p in self.points])
+        load_ref_path(file)
+        points = load_ref_path(file)
+        self.assertIsInstance(points, np.memmap)
+        planner = ReferencePlanner(file, sample_rate=4)
+        path = planner.get_target_path()
+        self.assertEqual(len(path), 13)
+        self.assertFalse(path.points.flags.writeable)  # still the strided view of the memory map
+        self.assertFalse(path.points.flags.c_contiguous)
+        np.testing.assert_allclose(path.points, self.points[::4, :2])
+        path.append((100.0, 0.0))  # the read-only memory map is copied when growing
+        self.assertEqual(path[-1]["c"]["x"], 100.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,39 @@
+import unittest
+import numpy as np
+from adept.transforms import WorldCoordinate, EulerAngle
+from adept.vehicles import ControlInput, SimpleDynamicsVehicleState, Vector3D
+
+
+class SlotsRecordTestCase(unittest.TestCase):
+    def setUp(self):
+        self.state = SimpleDynamicsVehicleState(WorldCoordinate(1, 2, 3), EulerAngle(4, 5, 6), Vector3D(7, 8, 9))
+
+    def test_keys(self):
+        self.assertEqual(self.state["c"]["x"], 1)
+        self.assertEqual(self.state[1]["yaw"], 6)
+        self.state["v"]["Z"] = 10.0
+        self.assertEqual(self.state.velocity.z, 10.0)
+        with self.assertRaises(KeyError):
+            self.state["q"]
+        with self.assertRaises(KeyError):
+            self.state[[0]]
+
+    def test_structured_roundtrip(self):
+        states = np.array([self.state.astuple()] * 2, dtype=SimpleDynamicsVehicleState.get_dtype())
+        self.assertEqual(states["p"]["y"].tolist(), [6.0, 6.0])
+        self.assertEqual(states["velocity"]["x"].tolist(), [7.0, 7.0])
+        state = SimpleDynamicsVehicleState.from_record(states[1])
+        self.assertEqual(state.astuple(), self.state.astuple())
+        self.assertEqual(EulerAngle.from_record((1, 2, 3)).tolist(), [1.0, 2.0, 3.0])
+
+    def test_control_input_clips_arrays(self):
+        control = ControlInput(np.array([2.0, -0.5]), np.array([0.5, 1.5]), -1)
+        np.testing.assert_array_equal(control.steer, [1.0, -0.5])
+        np.testing.assert_array_equal(control.throttle, [0.5, 1.0])
+        self.assertEqual(control.brake, 0.0)
+        self.assertEqual(ControlInput(0.3, 2.0)["t"], 1.0)
+        self.assertEqual(ControlInput.get_dtype().names, ("steer", "throttle", "brake"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import threading
+import unittest
+from collections import namedtuple
+from unittest import mock
+import numpy as np
+from adept.view import LatestSlot, PipelineStage, SensorPipeline
+
+FakeCarlaImage = namedtuple("FakeCarlaImage", "frame height width raw_data")
+
+
+class LatestSlotTestCase(unittest.TestCase):
+    def test_never_gets_the_same_item_twice(self):
+        slot = LatestSlot()
+        slot.put("a")
+        count, item = slot.get(wait=True, timeout=0.1, with_count=True)
+        self.assertEqual((count, item), (1, "a"))
+        self.assertEqual(slot.get(wait=True, timeout=0.05, after=count, with_count=True), (1, None))
+        self.assertIsNone(slot.get(wait=True, timeout=0.05, after=count))
+
+        threading.Timer(0.05, slot.put, args=("b",)).start()
+        self.assertEqual(slot.get(wait=True, timeout=1.0, after=count, with_count=True), (2, "b"))
+
+    def test_no_item_without_wait(self):
+        self.assertIsNone(LatestSlot().get())
+
+
+class PipelineStageTestCase(unittest.TestCase):
+    def test_drop_oldest(self):
+        slot = LatestSlot()
+        stage = PipelineStage("double", lambda x: 2 * x, maxsize=2, drop="oldest", outputs=[slot])
+        for x in range(5):  # not started, so the queue keeps the last 2 items only
+            stage.put(x)
+        self.assertEqual(stage.dropped, 3)
+        stage.start()
+        stage.stop(timeout=1.0)
+        self.assertEqual(slot.item, 8)
+        self.assertEqual(slot.count, 2)
+
+
+class SensorPipelineTestCase(unittest.TestCase):
+    def test_display_on_the_calling_thread(self):
+        pipeline = SensorPipeline(queue_size=4, drop="block")
+        listen = pipeline.add_camera("front", show=True, width=4, height=2, roi=(0, 1, None, None))
+        pipeline.start()
+        shown = []
+        with mock.patch("adept.view._image.show_image",
+                        side_effect=lambda image, **kwargs: shown.append((threading.current_thread(), image.shape,
+                                                                          int(image[0, 0, 0]), kwargs))):
+            self.assertEqual(pipeline.show(), 0)  # nothing decoded yet
+            for frame in range(3):
+                listen(FakeCarlaImage(frame, 2, 4, np.full((2, 4, 4), frame, dtype=np.uint8).tobytes()))
+            pipeline.get_latest("front", wait=True, timeout=1.0, after=2)
+            pipeline.close(timeout=1.0)
+
+            self.assertEqual(pipeline.show(), 1)  # only the latest image
+            self.assertEqual(pipeline.show(), 0)  # and only once
+        self.assertEqual(len(shown), 1)
+        thread, shape, value, kwargs = shown[0]
+        self.assertIs(thread, threading.current_thread())
+        self.assertEqual((shape, value), ((2, 4, 3), 2))  # the whole image, not the roi
+        self.assertEqual((kwargs["window_name"], kwargs["width"], kwargs["height"]), ("front", 4, 2))
+        self.assertEqual(pipeline.get_latest("front")[2].shape, (1, 4, 3))
+
+
+if __name__ == '__main__':
+    unittest.main()